@@ -0,0 +1,107 @@
+#  analysis_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from apis.db_connection import get_connection_manager
+from apis.analysis_result import ANALYSIS_FIELDS, is_reusable_analysis, normalize_analysis
+
+
+# LLM 分析結果快取：以（內文雜湊、模型、提示詞版本）為鍵，記憶體 LRU + SQLite 兩層；只保存完整的分析結果
+class AnalysisCache:
+    def __init__(self, db_name="./data/analysis_cache.db", memory_items: int = 1024):
+        """
+        建構函式，初始化快取資料庫與記憶體 LRU。
+        輸入：db_name (str)、memory_items (int) - 記憶體層最多保留筆數。
+        """
+        self.db_name = db_name
+        self.db = get_connection_manager(db_name)  # 共用的每執行緒連線（WAL 模式）
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.init_db()
+
+    def init_db(self):
+        """
+        建立分析快取資料表（若尚未存在）。
+        """
+        with self.db.transaction() as c:
+            c.execute('''CREATE TABLE IF NOT EXISTS analysis_cache (
+                            content_hash TEXT,
+                            model TEXT,
+                            prompt_version TEXT,
+                            summary TEXT,
+                            sentiment TEXT,
+                            ner TEXT,
+                            created_at REAL,
+                            PRIMARY KEY (content_hash, model, prompt_version)
+                        )''')
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """
+        計算內文的 SHA-256 雜湊（去除首尾空白後）。
+        輸入：text (str)；輸出：雜湊字串 (str)。
+        """
+        return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+    def _remember(self, key: tuple, value: dict):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, content: str, model: str, prompt_version: str):
+        """
+        查詢快取；先查記憶體，再查 SQLite（不完整的舊資料視為未命中）。
+        輸入：content (str)、model (str)、prompt_version (str)；輸出：dict（summary, sentiment, ner）或 None。
+        """
+        key = (self.content_hash(content), model, prompt_version)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return dict(self._memory[key])
+
+        row = self.db.connection().execute("SELECT summary, sentiment, ner FROM analysis_cache "
+                                           "WHERE content_hash = ? AND model = ? AND prompt_version = ?",
+                                           key).fetchone()
+        if not row:
+            return None
+        value = dict(zip(ANALYSIS_FIELDS, row))
+        if not is_reusable_analysis(value):
+            return None
+        self._remember(key, value)
+        return dict(value)
+
+    def put(self, content: str, model: str, prompt_version: str, analysis: dict):
+        """
+        寫入分析結果至記憶體與 SQLite；欄位不完整或為分析失敗的預設結果時不寫入。
+        輸入：content (str)、model (str)、prompt_version (str)、analysis (dict)；無輸出。
+        """
+        if not is_reusable_analysis(analysis):
+            return
+        key = (self.content_hash(content), model, prompt_version)
+        value = normalize_analysis(analysis)
+        with self.db.transaction() as c:
+            c.execute("INSERT OR REPLACE INTO analysis_cache "
+                      "(content_hash, model, prompt_version, summary, sentiment, ner, created_at) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                      key + (value["summary"], value["sentiment"], value["ner"], time.time()))
+        self._remember(key, value)
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """
+    取得程序內共用的分析快取（首次呼叫時建立），讓記憶體層跨請求保留。
+    輸出：AnalysisCache。
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = AnalysisCache()
+        return _shared_cache
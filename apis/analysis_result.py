@@ -0,0 +1,29 @@
+# analysis_result.py
+# LLM 分析結果的欄位定義與完整性檢查（不依賴 LLM 套件，供快取、去重、檢索與匯入共用）
+
+ANALYSIS_FIELDS = ("summary", "sentiment", "ner")
+FALLBACK_ANALYSIS = {"summary": "無法生成摘要", "sentiment": "未知", "ner": "無"}
+
+
+def is_reusable_analysis(analysis: dict) -> bool:
+    """
+    判斷分析結果是否完整可用（各欄位皆有值且不是分析失敗時的預設結果）。
+    輸入：analysis (dict)；輸出：bool。
+    """
+    return all(analysis.get(field) for field in ANALYSIS_FIELDS) and \
+        analysis.get("summary") != FALLBACK_ANALYSIS["summary"]
+
+
+def normalize_analysis(analysis: dict) -> dict:
+    """
+    整理 LLM 回傳的分析結果：各欄位轉為字串（清單以逗號連接），缺少或空白的欄位以預設結果補上。
+    輸入：analysis (dict)；輸出：dict（summary, sentiment, ner）。
+    """
+    result = {}
+    for field in ANALYSIS_FIELDS:
+        value = analysis.get(field)
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(item) for item in value)
+        value = "" if value is None else str(value).strip()
+        result[field] = value or FALLBACK_ANALYSIS[field]
+    return result
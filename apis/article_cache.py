@@ -0,0 +1,171 @@
+#  article_cache.py
+import threading
+import time
+import urllib.parse
+from apis.db_connection import get_connection_manager
+
+ACCESS_FLUSH_ITEMS = 64  # 累積多少筆最後存取時間後批次寫回（淘汰前也會寫回）
+
+
+# 新聞文章磁碟快取：以正規化 URL 為鍵，保存解析後內容與 ETag / Last-Modified
+class ArticleCache:
+    def __init__(self, db_name="./data/article_cache.db", ttl: float = 24 * 3600,
+                 max_bytes: int = 200 * 1024 * 1024):
+        """
+        建構函式，初始化快取資料庫。
+        輸入：db_name (str)、ttl (float) - 免重新驗證的有效秒數、max_bytes (int) - 快取容量上限。
+        """
+        self.db_name = db_name
+        self.db = get_connection_manager(db_name)  # 共用的每執行緒連線（WAL 模式）
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "revalidated": 0,
+                       "bytes_saved": 0, "bytes_downloaded": 0}
+        self._pending_access = {}  # {正規化 URL: 最後存取時間}：命中時先記在記憶體，批次寫回
+        self.init_db()
+
+    def init_db(self):
+        """
+        建立快取資料表與 LRU 淘汰用索引（若尚未存在）。
+        """
+        with self.db.transaction() as c:
+            c.execute('''CREATE TABLE IF NOT EXISTS article_cache (
+                            url TEXT PRIMARY KEY,
+                            title TEXT,
+                            publish_date TEXT,
+                            content TEXT,
+                            etag TEXT,
+                            last_modified TEXT,
+                            fetched_at REAL,
+                            accessed_at REAL,
+                            size INTEGER,
+                            response_bytes INTEGER
+                        )''')
+            c.execute("CREATE INDEX IF NOT EXISTS idx_article_cache_accessed ON article_cache (accessed_at)")
+
+    @staticmethod
+    def canonical_url(url: str) -> str:
+        """
+        正規化 URL：統一大小寫、移除錨點與 utm_* 追蹤參數、去除結尾斜線。
+        輸入：url (str)；輸出：正規化後的 URL (str)。
+        """
+        parts = urllib.parse.urlsplit(url.strip())
+        query = urllib.parse.urlencode(sorted(
+            (k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+            if not k.lower().startswith("utm_")
+        ))
+        path = parts.path.rstrip("/") or "/"
+        return urllib.parse.urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def get(self, url: str):
+        """
+        讀取快取項目（唯讀，不開啟寫入交易）；查無項目計為未命中，項目已過期計為 expired。
+        最後存取時間由 record_hit / touch 更新。
+        輸入：url (str)；輸出：dict（含 article、etag、last_modified、fresh）或 None。
+        """
+        key = self.canonical_url(url)
+        row = self.db.connection().execute(
+            "SELECT title, publish_date, content, etag, last_modified, fetched_at, response_bytes "
+            "FROM article_cache WHERE url = ?", (key,)).fetchone()
+        if not row:
+            self._count("misses")
+            return None
+
+        title, publish_date, content, etag, last_modified, fetched_at, response_bytes = row
+        fresh = time.time() - fetched_at < self.ttl
+        if not fresh:
+            self._count("expired")
+        return {
+            "article": {"title": title, "publish_date": publish_date, "content": content, "url": url},
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": fresh,
+            "response_bytes": response_bytes or 0,
+        }
+
+    def record_hit(self, entry: dict, revalidated: bool = False):
+        """
+        記錄一次快取命中（revalidated=True 表示經條件式請求確認未變更，存取時間已由 touch 更新）；
+        其餘命中的最後存取時間先記在記憶體，累積 ACCESS_FLUSH_ITEMS 筆後批次寫回。
+        """
+        self._count("hits")
+        self._count("bytes_saved", entry["response_bytes"])
+        if revalidated:
+            self._count("revalidated")
+            return
+        with self._lock:
+            self._pending_access[self.canonical_url(entry["article"]["url"])] = time.time()
+            flush = len(self._pending_access) >= ACCESS_FLUSH_ITEMS
+        if flush:
+            self.flush_access()
+
+    def flush_access(self):
+        """
+        將記憶體中累積的最後存取時間批次寫回資料庫。
+        """
+        with self._lock:
+            pending, self._pending_access = self._pending_access, {}
+        if pending:
+            with self.db.transaction() as c:
+                c.executemany("UPDATE article_cache SET accessed_at = MAX(accessed_at, ?) WHERE url = ?",
+                              [(accessed_at, url) for url, accessed_at in pending.items()])
+
+    def touch(self, url: str):
+        """
+        伺服器回應 304 時，更新抓取時間以延長有效期限。
+        """
+        now = time.time()
+        with self.db.transaction() as c:
+            c.execute("UPDATE article_cache SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                      (now, now, self.canonical_url(url)))
+
+    def put(self, url: str, article: dict, etag: str = None, last_modified: str = None, response_bytes: int = 0):
+        """
+        寫入（或覆寫）快取項目，並在超過容量上限時淘汰最久未使用的項目。
+        輸入：url (str)、article (dict)、etag (str)、last_modified (str)、response_bytes (int)；無輸出。
+        """
+        self._count("bytes_downloaded", response_bytes)
+        now = time.time()
+        size = sum(len((article.get(k) or "").encode("utf-8")) for k in ("title", "publish_date", "content"))
+        with self.db.transaction() as c:
+            c.execute("INSERT OR REPLACE INTO article_cache "
+                      "(url, title, publish_date, content, etag, last_modified, fetched_at, accessed_at, size, response_bytes) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                      (self.canonical_url(url), article["title"], article["publish_date"], article["content"],
+                       etag, last_modified, now, now, size, response_bytes))
+        self.evict()
+
+    def evict(self):
+        """
+        依最後存取時間淘汰項目，直到總容量不超過 max_bytes（先寫回尚未寫入的存取時間）。
+        """
+        self.flush_access()
+        with self.db.transaction() as c:
+            total = c.execute("SELECT COALESCE(SUM(size), 0) FROM article_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            c.execute("SELECT url, size FROM article_cache ORDER BY accessed_at ASC")
+            expired = []
+            for url, size in c.fetchall():
+                if total <= self.max_bytes:
+                    break
+                expired.append((url,))
+                total -= size or 0
+            c.executemany("DELETE FROM article_cache WHERE url = ?", expired)
+
+    def stats(self) -> dict:
+        """
+        回傳快取統計（命中、未命中、過期、重新驗證次數、節省 / 下載位元組數，以及項目數與容量）。
+        輸出：dict。
+        """
+        entries, stored = self.db.connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM article_cache").fetchone()
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({"entries": entries, "stored_bytes": stored})
+        return stats
@@ -0,0 +1,92 @@
+#  db_connection.py
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# 連線層級的效能設定：WAL 讓讀取不被寫入阻擋，NORMAL 同步在 WAL 下仍可確保一致性
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+    "cache_size": -16000,    # 約 16 MB 頁面快取
+    "mmap_size": 268435456,  # 256 MB 記憶體映射讀取
+    "foreign_keys": "ON",
+}
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+# SQLite 連線管理：每個執行緒一條長期連線，寫入以 BEGIN IMMEDIATE 交易進行
+class SQLiteConnectionManager:
+    def __init__(self, db_name: str, pragmas: dict = None):
+        """
+        建構函式。
+        輸入：db_name (str) - 資料庫檔案路徑、pragmas (dict) - 連線設定。
+        """
+        self.db_name = db_name
+        self.pragmas = pragmas or DEFAULT_PRAGMAS
+        self._connections = {}  # {執行緒 id: 連線}
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        取得目前執行緒專用的連線（首次呼叫時建立並套用 PRAGMA）。
+        輸出：sqlite3.Connection（autocommit 模式，交易由 transaction() 管理）。
+        """
+        ident = threading.get_ident()
+        conn = self._connections.get(ident)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, timeout=30, isolation_level=None, check_same_thread=False)
+            for name, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {name} = {value}")
+            with self._lock:
+                self._connections[ident] = conn
+                self._close_dead_threads()
+        return conn
+
+    def _close_dead_threads(self):
+        """關閉已結束執行緒遺留的連線（Streamlit 每次重新執行可能使用新的執行緒）。"""
+        alive = {thread.ident for thread in threading.enumerate()}
+        for ident in [ident for ident in self._connections if ident not in alive]:
+            self._connections.pop(ident).close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        以 with 語法執行寫入交易；一開始即取得寫入鎖，避免讀轉寫時的鎖衝突。
+        輸出：sqlite3.Cursor；正常結束時提交，發生例外時回滾。
+        """
+        conn = self.connection()
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            yield c
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+    def close_all(self):
+        """關閉所有執行緒建立的連線。"""
+        with self._lock:
+            connections, self._connections = self._connections, {}
+        for conn in connections.values():
+            conn.close()
+
+
+def get_connection_manager(db_name: str) -> SQLiteConnectionManager:
+    """
+    取得指定資料庫檔案的共用連線管理器（同一路徑共用一個）。
+    輸入：db_name (str)；輸出：SQLiteConnectionManager。
+    """
+    key = os.path.abspath(db_name)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = SQLiteConnectionManager(db_name)
+            _managers[key] = manager
+        return manager
@@ -1,44 +1,140 @@
 # llm_api.py
 from dotenv import load_dotenv
 import os
+import threading
+import requests
 from langchain_openai import AzureChatOpenAI
 from langchain_community.llms import Ollama
 
+# 內部 Ollama API 伺服器位址，可由環境變數 OLLAMA_API_BASE 覆寫（例如指向離線基準測試用的模擬伺服器）
+INTERNAL_API_BASE = os.getenv("OLLAMA_API_BASE", "http://10.5.61.81:11437")
+
+# 可用的內部模型清單
+INTERNAL_MODEL_NAMES = {
+    "Taiwan-Llama3-16f": "cwchang/llama-3-taiwan-8b-instruct:f16",
+    "Gemma2:27b": "gemma2:27b-instruct-q5_0",
+}
+
+OLLAMA_KEEP_ALIVE = "30m"  # 模型權重在 Ollama 記憶體中保留的時間
+# Ollama 的上下文長度（未指定時 Ollama 採用較小的預設值並默默截斷長提示詞），與提示詞預算共用同一設定
+OLLAMA_NUM_CTX = int(os.getenv("LLM_CONTEXT_TOKENS", "8192"))
+
 # LLM API 工具類別，根據模式提供內部或外部 LLM 實例
 class LLMAPI:
+    _clients = {}  # 依 (mode, llm_option) 保存的長期 LLM 實例
+    _clients_lock = threading.Lock()
+    _env_loaded = False
+
     @staticmethod
     def get_llm(mode, llm_option):
         """
         根據傳入的模式 (mode) 及模型選項 (llm_option)，
         返回內部 Ollama 模型或外部 Azure OpenAI 模型實例。
+        同一組 (mode, llm_option) 只建立一次，之後重用同一實例與其連線。
         輸入：mode (str)、llm_option (str)；輸出：LLM 實例。
         """
-        if mode == '內部LLM':
-            return LLMAPI._get_internal_llm(llm_option)
-        else:
-            return LLMAPI._get_external_llm(llm_option)
+        key = (mode, llm_option)
+        with LLMAPI._clients_lock:
+            llm = LLMAPI._clients.get(key)
+            if llm is None:
+                if mode == '內部LLM':
+                    llm = LLMAPI._get_internal_llm(llm_option)
+                else:
+                    llm = LLMAPI._get_external_llm(llm_option)
+                LLMAPI._clients[key] = llm
+            return llm
 
     @staticmethod
-    def _get_internal_llm(llm_option):
+    def evict(mode, llm_option):
         """
-        建立並回傳內部 LLM (透過 Ollama API) 實例。
-        輸入：llm_option (str) 模型代稱；輸出：Ollama LLM 實例。
+        移除已快取的 LLM 實例，下次 get_llm 時重新建立。
+        輸入：mode (str)、llm_option (str)；無輸出。
         """
-        api_base = "http://10.5.61.81:11437"  # 內部 Ollama API 伺服器位址
+        with LLMAPI._clients_lock:
+            LLMAPI._clients.pop((mode, llm_option), None)
 
-        # 可用的內部模型清單
-        llm_model_names = {
-            "Taiwan-Llama3-16f": "cwchang/llama-3-taiwan-8b-instruct:f16",
-            "Gemma2:27b": "gemma2:27b-instruct-q5_0",
-        }
+    @staticmethod
+    def health_check(mode, llm_option, timeout: float = 5) -> bool:
+        """
+        檢查 LLM 服務是否可用；內部模式確認 Ollama 伺服器已提供該模型，
+        外部模式確認 Azure 設定齊全。檢查失敗時移除快取實例。
+        輸入：mode (str)、llm_option (str)、timeout (float)；輸出：bool。
+        """
+        try:
+            if mode == '內部LLM':
+                model = LLMAPI._resolve_internal_model(llm_option)
+                response = requests.get(f"{INTERNAL_API_BASE}/api/tags", timeout=timeout)
+                response.raise_for_status()
+                available = {m.get("name") for m in response.json().get("models", [])}
+                healthy = model in available
+            else:
+                LLMAPI._load_env()
+                healthy = all(os.getenv(k) for k in
+                              ("AZURE_OPENAI_API_KEY", "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_API_VERSION"))
+        except Exception as e:
+            print(f"⚠️ LLM 健康檢查失敗：{e}")
+            healthy = False
 
-        # 根據傳入模型選項取得實際模型名稱
-        model = llm_model_names.get(llm_option)
+        if not healthy:
+            LLMAPI.evict(mode, llm_option)
+        return healthy
+
+    @staticmethod
+    def warm_up(mode, llm_option, timeout: float = 300) -> bool:
+        """
+        先進行健康檢查，再預先建立 LLM 實例；內部模式另外請 Ollama 載入模型權重，
+        讓第一位使用者的查詢不必等待模型載入。
+        輸入：mode (str)、llm_option (str)、timeout (float)；輸出：是否成功 (bool)。
+        """
+        if not LLMAPI.health_check(mode, llm_option):
+            print(f"⚠️ LLM 預熱略過：{mode} / {llm_option} 目前無法使用")
+            return False
+        try:
+            LLMAPI.get_llm(mode, llm_option)
+            if mode == '內部LLM':
+                # Ollama 收到不含 prompt 的 generate 請求時只載入模型（num_ctx 需與實際呼叫一致，否則會重新載入）
+                response = requests.post(f"{INTERNAL_API_BASE}/api/generate",
+                                         json={"model": LLMAPI._resolve_internal_model(llm_option),
+                                               "keep_alive": OLLAMA_KEEP_ALIVE,
+                                               "options": {"num_ctx": OLLAMA_NUM_CTX}},
+                                         timeout=timeout)
+                response.raise_for_status()
+            print(f"🔥 LLM 已預熱：{mode} / {llm_option}")
+            return True
+        except Exception as e:
+            print(f"⚠️ LLM 預熱失敗：{e}")
+            LLMAPI.evict(mode, llm_option)
+            return False
+
+    @staticmethod
+    def _resolve_internal_model(llm_option):
+        """
+        取得內部模型代稱對應的實際模型名稱。
+        輸入：llm_option (str)；輸出：模型名稱 (str)。
+        """
+        model = INTERNAL_MODEL_NAMES.get(llm_option)
         if not model:
             raise ValueError(f"無效的內部模型選項：{llm_option}")
+        return model
+
+    @staticmethod
+    def _load_env():
+        """載入 .env 設定檔（整個程序只讀取一次）。"""
+        if not LLMAPI._env_loaded:
+            load_dotenv()
+            LLMAPI._env_loaded = True
+
+    @staticmethod
+    def _get_internal_llm(llm_option):
+        """
+        建立並回傳內部 LLM (透過 Ollama API) 實例。
+        輸入：llm_option (str) 模型代稱；輸出：Ollama LLM 實例。
+        """
+        # 根據傳入模型選項取得實際模型名稱
+        model = LLMAPI._resolve_internal_model(llm_option)
 
-        # 使用 Ollama API 建立並回傳 LLM 實例
-        llm = Ollama(base_url=api_base, model=model)
+        # 使用 Ollama API 建立並回傳 LLM 實例（保持模型常駐，避免閒置後重新載入）
+        llm = Ollama(base_url=INTERNAL_API_BASE, model=model, keep_alive=OLLAMA_KEEP_ALIVE, num_ctx=OLLAMA_NUM_CTX)
         return llm
 
     @staticmethod
@@ -48,7 +144,7 @@ class LLMAPI:
         輸入：llm_option (str) 為 Azure 上部署名稱；輸出：AzureChatOpenAI LLM 實例。
         """
         deployment_name = llm_option
-        load_dotenv()  # 載入 .env 設定檔
+        LLMAPI._load_env()  # 載入 .env 設定檔
 
         # 從環境變數中取得 Azure API 設定參數
         api_key = os.getenv("AZURE_OPENAI_API_KEY")
@@ -1,23 +1,122 @@
 #  news_database.py
-import sqlite3
+import hashlib
+import re
+from collections import Counter
+import numpy as np
+from apis.db_connection import get_connection_manager
+
+_DATE_PATTERN = re.compile(r"(\d{4})\s*[./\-年]\s*(\d{1,2})\s*[./\-月]\s*(\d{1,2})")
+
+
+def normalize_date(date_text):
+    """
+    將各種日期字串（如 2025.03.20、2025/3/20、2025-03-20T08:00）轉為 ISO 格式 YYYY-MM-DD。
+    輸入：date_text (str)；輸出：ISO 日期字串 (str)，無法解析時回傳 None。
+    """
+    match = _DATE_PATTERN.search(date_text or "")
+    if not match:
+        return None
+    year, month, day = (int(part) for part in match.groups())
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+_ENTITY_SEPARATORS = re.compile(r"[,，、;；\n]+")
+_NO_ENTITY = {"", "無", "无", "none", "n/a", "null"}
+MAX_ENTITY_LENGTH = 64
+SENTIMENTS = ("正面", "中性", "負面", "未知")
+
+
+def parse_entities(ner_text):
+    """
+    將 LLM 輸出的命名實體字串（逗號、頓號等分隔）拆為實體清單，去除空白、「無」與重複項目。
+    輸入：ner_text (str)；輸出：list of str（依出現順序）。
+    """
+    entities = {}
+    for name in _ENTITY_SEPARATORS.split(ner_text or ""):
+        name = name.strip().strip("\"'「」[]()（）")
+        if name.casefold() in _NO_ENTITY or len(name) > MAX_ENTITY_LENGTH:
+            continue
+        entities.setdefault(name.casefold(), name)
+    return list(entities.values())
+
+
+def normalize_sentiment(sentiment_text):
+    """
+    將情緒判斷文字歸類為 正面 / 中性 / 負面 / 未知。
+    輸入：sentiment_text (str)；輸出：str。
+    """
+    for label in SENTIMENTS[:3]:
+        if label in (sentiment_text or ""):
+            return label
+    return "未知"
+
+
+_NON_WORD = re.compile(r"[\W_]+")
+SIMHASH_SHINGLE = 3         # 以連續 3 個字元為特徵（中文無空白斷詞）
+SIMHASH_MIN_CHARS = 50      # 過短的內文（例如擷取失敗的預設文字）不計算指紋，避免誤判為重複
+SIMHASH_BANDS = 8           # 64 位元指紋切成 8 段 8 位元；漢明距離 7 以內必有一段完全相同
+
+
+def simhash(text):
+    """
+    計算文字的 64 位元 SimHash 指紋（字元 shingle 依出現次數加權），內容相近的文字指紋的漢明距離也小。
+    輸入：text (str)；輸出：int（0 ~ 2^64-1），文字過短時為 None。
+    """
+    text = _NON_WORD.sub("", (text or "").casefold())
+    if len(text) < SIMHASH_MIN_CHARS:
+        return None
+    counts = Counter(text[i:i + SIMHASH_SHINGLE] for i in range(len(text) - SIMHASH_SHINGLE + 1))
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+         for shingle in counts), dtype="<u8", count=len(counts))
+    weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    # 每個位元：特徵雜湊該位為 1 時加上權重、為 0 時扣除，總和為正則指紋該位為 1
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    scores = weights @ (bits.astype(np.int64) * 2 - 1)
+    return int(np.packbits(scores > 0, bitorder="little").view("<u8")[0])
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """兩個指紋相異的位元數。"""
+    return bin(a ^ b).count("1")
+
+
+def _simhash_bands(fingerprint: int) -> list:
+    """將指紋切成 SIMHASH_BANDS 段，作為近似重複查詢的索引鍵。"""
+    width = 64 // SIMHASH_BANDS
+    return [(fingerprint >> (width * i)) & ((1 << width) - 1) for i in range(SIMHASH_BANDS)]
+
+
+def _to_signed(value: int) -> int:
+    """SQLite 的 INTEGER 為有號 64 位元，指紋以二補數形式存放。"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _fts_phrase(term: str) -> str:
+    """將搜尋詞包成 FTS5 片語，避免特殊字元被當成查詢語法。"""
+    return '"' + term.replace('"', '""') + '"'
+
 
 # 新聞資料庫管理類別
 class NewsDatabase:
+    FTS_MIN_TERM_LENGTH = 3  # trigram 分詞器可比對的最短搜尋詞長度
+
     def __init__(self, db_name="./data/news_all.db"):
         """
         建構函式，初始化資料庫。
         輸入：db_name (str) - SQLite 資料庫檔案名稱。
         """
         self.db_name = db_name
+        self.db = get_connection_manager(db_name)  # 共用的每執行緒連線（WAL 模式）
         self.init_db()
 
     def init_db(self):
         """
-        建立資料表（若尚未存在），包含新聞標題、日期、內容、URL 及分析欄位。
+        建立資料表（若尚未存在），包含新聞標題、日期、內容、URL 及分析欄位，
+        並依 PRAGMA user_version 執行尚未套用的結構遷移。
         無輸入 / 無輸出，執行資料表初始化。
         """
-        with sqlite3.connect(self.db_name) as conn:
-            c = conn.cursor()
+        with self.db.transaction() as c:
             c.execute('''CREATE TABLE IF NOT EXISTS news (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             title TEXT,
@@ -28,31 +127,443 @@ class NewsDatabase:
                             sentiment TEXT,
                             ner TEXT
                         )''')
-            conn.commit()
+            version = c.execute("PRAGMA user_version").fetchone()[0]
+            for target, migrate in enumerate(self.MIGRATIONS, start=1):
+                if version < target:
+                    migrate(self, c)
+                    c.execute(f"PRAGMA user_version = {target}")
+
+    def _migrate_v1(self, c):
+        """
+        結構遷移 v1：新增 ISO 日期欄位與索引、URL 唯一鍵，以及由觸發器同步的 FTS5 全文檢索表。
+        注意：此遷移會刪除資料——同一 URL 的多筆新聞只保留 id 最大（最新寫入）的一筆，其餘直接刪除；
+        沒有 URL 的新聞不受影響。需要保留舊資料時請先備份資料庫檔案。
+        """
+        columns = {row[1] for row in c.execute("PRAGMA table_info(news)")}
+        if "publish_date_iso" not in columns:
+            c.execute("ALTER TABLE news ADD COLUMN publish_date_iso TEXT")
+        rows = c.execute("SELECT id, publish_date FROM news").fetchall()
+        c.executemany("UPDATE news SET publish_date_iso = ? WHERE id = ?",
+                      [(normalize_date(date), row_id) for row_id, date in rows])
+
+        removed = c.execute("DELETE FROM news WHERE url IS NOT NULL AND id NOT IN "
+                            "(SELECT MAX(id) FROM news WHERE url IS NOT NULL GROUP BY url)").rowcount
+        if removed:
+            print(f"🧹 資料庫遷移：移除 {removed} 筆 URL 重複的舊新聞（每個 URL 保留最新一筆）")
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_news_url ON news (url)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_news_date ON news (publish_date_iso, id)")
+
+        # 中文沒有空白斷詞，使用 trigram 分詞器支援任意子字串比對
+        c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+                        title, content, summary, ner,
+                        content='news', content_rowid='id', tokenize='trigram'
+                    )''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS news_fts_ai AFTER INSERT ON news BEGIN
+                        INSERT INTO news_fts (rowid, title, content, summary, ner)
+                        VALUES (new.id, new.title, new.content, new.summary, new.ner);
+                    END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS news_fts_ad AFTER DELETE ON news BEGIN
+                        INSERT INTO news_fts (news_fts, rowid, title, content, summary, ner)
+                        VALUES ('delete', old.id, old.title, old.content, old.summary, old.ner);
+                    END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS news_fts_au AFTER UPDATE ON news BEGIN
+                        INSERT INTO news_fts (news_fts, rowid, title, content, summary, ner)
+                        VALUES ('delete', old.id, old.title, old.content, old.summary, old.ner);
+                        INSERT INTO news_fts (rowid, title, content, summary, ner)
+                        VALUES (new.id, new.title, new.content, new.summary, new.ner);
+                    END''')
+        c.execute("INSERT INTO news_fts (news_fts) VALUES ('rebuild')")
+
+    def _migrate_v2(self, c):
+        """
+        結構遷移 v2：新增資料版本號（news_meta.revision），由觸發器在新聞新增、更新或刪除時遞增，
+        供查詢結果快取判斷是否失效（其他程序寫入時同樣生效）。
+        """
+        c.execute("CREATE TABLE IF NOT EXISTS news_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        c.execute("INSERT OR IGNORE INTO news_meta (key, value) VALUES ('revision', 0)")
+        for event, name in (("INSERT", "ai"), ("UPDATE", "au"), ("DELETE", "ad")):
+            c.execute(f"""CREATE TRIGGER IF NOT EXISTS news_revision_{name} AFTER {event} ON news BEGIN
+                             UPDATE news_meta SET value = value + 1 WHERE key = 'revision';
+                          END""")
+
+    def _migrate_v3(self, c):
+        """
+        結構遷移 v3：新增實體表、新聞與實體的對應表，以及每日情緒彙總表（整體與各實體），
+        並以既有新聞回填；之後由 insert_many 於寫入時增量維護。
+        """
+        c.execute('''CREATE TABLE IF NOT EXISTS entity (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL,
+                        norm_name TEXT NOT NULL UNIQUE
+                    )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS entity_mention (
+                        news_id INTEGER NOT NULL REFERENCES news (id) ON DELETE CASCADE,
+                        entity_id INTEGER NOT NULL REFERENCES entity (id),
+                        PRIMARY KEY (news_id, entity_id)
+                    ) WITHOUT ROWID''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_entity_mention_entity ON entity_mention (entity_id, news_id)")
+        c.execute('''CREATE TABLE IF NOT EXISTS entity_daily (
+                        entity_id INTEGER NOT NULL REFERENCES entity (id),
+                        day TEXT NOT NULL,
+                        sentiment TEXT NOT NULL,
+                        count INTEGER NOT NULL,
+                        PRIMARY KEY (entity_id, day, sentiment)
+                    ) WITHOUT ROWID''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_entity_daily_day ON entity_daily (day, entity_id)")
+        c.execute('''CREATE TABLE IF NOT EXISTS sentiment_daily (
+                        day TEXT NOT NULL,
+                        sentiment TEXT NOT NULL,
+                        count INTEGER NOT NULL,
+                        PRIMARY KEY (day, sentiment)
+                    ) WITHOUT ROWID''')
+        for news_id, day, sentiment, ner in c.execute(
+                "SELECT id, publish_date_iso, sentiment, ner FROM news").fetchall():
+            self._add_rollups(c, news_id, day, sentiment, ner)
+
+    def _migrate_v4(self, c):
+        """
+        結構遷移 v4：新增近似重複索引（每篇新聞的 SimHash 指紋及分段索引），並以既有新聞回填。
+        """
+        bands = ", ".join(f"band{i} INTEGER" for i in range(SIMHASH_BANDS))
+        c.execute(f"""CREATE TABLE IF NOT EXISTS news_simhash (
+                          news_id INTEGER PRIMARY KEY REFERENCES news (id) ON DELETE CASCADE,
+                          simhash INTEGER NOT NULL, {bands}
+                      )""")
+        for i in range(SIMHASH_BANDS):
+            c.execute(f"CREATE INDEX IF NOT EXISTS idx_news_simhash_band{i} ON news_simhash (band{i})")
+        for news_id, title, content in c.execute("SELECT id, title, content FROM news").fetchall():
+            self._set_simhash(c, news_id, simhash(f"{title}\n{content}"))
+
+    def _migrate_v5(self, c):
+        """
+        結構遷移 v5：新增新聞向量表（依向量模型分開存放），seq 為寫入序號，
+        供各程序的記憶體映射向量索引增量同步。
+        """
+        c.execute('''CREATE TABLE IF NOT EXISTS news_embedding (
+                        model TEXT NOT NULL,
+                        news_id INTEGER NOT NULL REFERENCES news (id) ON DELETE CASCADE,
+                        seq INTEGER NOT NULL,
+                        vector BLOB NOT NULL,
+                        PRIMARY KEY (model, news_id)
+                    )''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_news_embedding_seq ON news_embedding (model, seq)")
+        c.execute("INSERT OR IGNORE INTO news_meta (key, value) VALUES ('embedding_seq', 0)")
+
+    # 依序套用的結構遷移（索引 + 1 即為遷移後的 user_version）
+    MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4, _migrate_v5]
+
+    def _set_simhash(self, c, news_id, fingerprint):
+        """寫入（或移除）一篇新聞的 SimHash 指紋。"""
+        if fingerprint is None:
+            c.execute("DELETE FROM news_simhash WHERE news_id = ?", (news_id,))
+            return
+        c.execute(f"INSERT OR REPLACE INTO news_simhash VALUES (?, ?{', ?' * SIMHASH_BANDS})",
+                  [news_id, _to_signed(fingerprint)] + _simhash_bands(fingerprint))
+
+    def _entity_ids(self, c, names):
+        """取得實體 id（不存在時新增）；以忽略大小寫的名稱判斷是否為同一實體。"""
+        ids = []
+        for name in names:
+            c.execute("INSERT OR IGNORE INTO entity (name, norm_name) VALUES (?, ?)", (name, name.casefold()))
+            ids.append(c.execute("SELECT id FROM entity WHERE norm_name = ?", (name.casefold(),)).fetchone()[0])
+        return ids
+
+    def _add_rollups(self, c, news_id, day, sentiment, ner):
+        """記錄一篇新聞的實體對應，並將其情緒計入每日彙總（日期無法解析時只記錄對應）。"""
+        sentiment = normalize_sentiment(sentiment)
+        entity_ids = self._entity_ids(c, parse_entities(ner))
+        c.executemany("INSERT OR IGNORE INTO entity_mention (news_id, entity_id) VALUES (?, ?)",
+                      [(news_id, entity_id) for entity_id in entity_ids])
+        if not day:
+            return
+        c.execute("INSERT INTO sentiment_daily (day, sentiment, count) VALUES (?, ?, 1) "
+                  "ON CONFLICT(day, sentiment) DO UPDATE SET count = count + 1", (day, sentiment))
+        c.executemany("INSERT INTO entity_daily (entity_id, day, sentiment, count) VALUES (?, ?, ?, 1) "
+                      "ON CONFLICT(entity_id, day, sentiment) DO UPDATE SET count = count + 1",
+                      [(entity_id, day, sentiment) for entity_id in entity_ids])
+
+    def _remove_rollups(self, c, news_id, day, sentiment):
+        """扣除一篇新聞先前計入的實體對應與每日彙總（更新既有新聞前呼叫）。"""
+        sentiment = normalize_sentiment(sentiment)
+        entity_ids = [row[0] for row in c.execute(
+            "SELECT entity_id FROM entity_mention WHERE news_id = ?", (news_id,)).fetchall()]
+        c.execute("DELETE FROM entity_mention WHERE news_id = ?", (news_id,))
+        if not day:
+            return
+        c.execute("UPDATE sentiment_daily SET count = count - 1 WHERE day = ? AND sentiment = ?", (day, sentiment))
+        c.executemany("UPDATE entity_daily SET count = count - 1 WHERE entity_id = ? AND day = ? AND sentiment = ?",
+                      [(entity_id, day, sentiment) for entity_id in entity_ids])
+        c.execute("DELETE FROM sentiment_daily WHERE day = ? AND count <= 0", (day,))
+        c.execute("DELETE FROM entity_daily WHERE day = ? AND sentiment = ? AND count <= 0", (day, sentiment))
 
     def insert_news(self, article_data, analysis):
         """
-        將新聞資料及分析結果插入資料庫。
-        輸入：article_data (dict)、analysis (dict)；無輸出。
-        """
-        with sqlite3.connect(self.db_name) as conn:
-            c = conn.cursor()
-            c.execute("INSERT INTO news "
-                      "(title, publish_date, content, url, summary, sentiment, ner) "
-                      "VALUES (?, ?, ?, ?, ?, ?, ?)",
-                      (article_data['title'], article_data['publish_date'], article_data['content'],
-                       article_data['url'], analysis["summary"], analysis["sentiment"], analysis["ner"]))
-            conn.commit()
-
-    def search_news(self, keyword: str, date_from: str, date_to: str):
-        """
-        根據關鍵字與日期範圍搜尋新聞，回傳前 10 筆結果。
-        輸入：keyword (str)、date_from (str)、date_to (str)；輸出：list (搜尋結果清單)。
-        """
-        with sqlite3.connect(self.db_name) as conn:
-            c = conn.cursor()
-            c.execute("""SELECT title, publish_date, content, url FROM news 
-                         WHERE content LIKE ? AND publish_date BETWEEN ? AND ?
-                         ORDER BY publish_date DESC LIMIT 10""",
-                      (f"%{keyword}%", date_from, date_to))
-            return c.fetchall()
+        將新聞資料及分析結果寫入資料庫；相同 URL 已存在時更新該筆資料。
+        輸入：article_data (dict)、analysis (dict)；輸出：新聞 id (int)。
+        """
+        return self.insert_many([(article_data, analysis)])[0]
+
+    def insert_many(self, items):
+        """
+        以單一交易批次寫入多篇新聞及分析結果（相同 URL 則更新）。
+        輸入：items (list of (article_data, analysis))；輸出：list of 新聞 id (int)。
+        """
+        news_ids = []
+        # 指紋在交易外先算好，避免持有寫入鎖期間進行計算
+        fingerprints = [simhash(f"{article_data['title']}\n{article_data['content']}") for article_data, _ in items]
+        with self.db.transaction() as c:
+            for (article_data, analysis), fingerprint in zip(items, fingerprints):
+                previous = c.execute("SELECT publish_date_iso, sentiment, ner FROM news WHERE url = ?",
+                                     (article_data['url'],)).fetchone()
+                c.execute("INSERT INTO news "
+                          "(title, publish_date, publish_date_iso, content, url, summary, sentiment, ner) "
+                          "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                          "ON CONFLICT(url) DO UPDATE SET "
+                          "title = excluded.title, publish_date = excluded.publish_date, "
+                          "publish_date_iso = excluded.publish_date_iso, content = excluded.content, "
+                          "summary = excluded.summary, sentiment = excluded.sentiment, ner = excluded.ner",
+                          (article_data['title'], article_data['publish_date'],
+                           normalize_date(article_data['publish_date']), article_data['content'],
+                           article_data['url'], analysis["summary"], analysis["sentiment"], analysis["ner"]))
+                news_id = c.execute("SELECT id FROM news WHERE url = ?", (article_data['url'],)).fetchone()[0]
+                news_ids.append(news_id)
+                self._set_simhash(c, news_id, fingerprint)
+
+                # 增量維護實體與每日情緒彙總：更新既有新聞時先扣除舊的貢獻
+                current = (normalize_date(article_data['publish_date']), analysis["sentiment"], analysis["ner"])
+                if previous != current:
+                    if previous:
+                        self._remove_rollups(c, news_id, previous[0], previous[1])
+                    self._add_rollups(c, news_id, *current)
+        return news_ids
+
+    def delete_news(self, urls) -> int:
+        """
+        刪除指定 URL 的新聞，並同步扣除其實體與每日情緒彙總（指紋、向量與全文索引由外鍵及觸發器移除）。
+        輸入：urls (iterable of str)；輸出：實際刪除的筆數 (int)。
+        """
+        deleted = 0
+        with self.db.transaction() as c:
+            for url in dict.fromkeys(urls):
+                row = c.execute("SELECT id, publish_date_iso, sentiment FROM news WHERE url = ?", (url,)).fetchone()
+                if not row:
+                    continue
+                self._remove_rollups(c, *row)
+                c.execute("DELETE FROM news WHERE id = ?", (row[0],))
+                deleted += 1
+        return deleted
+
+    def existing_urls(self, urls) -> set:
+        """
+        查詢哪些 URL 已存在於資料庫。
+        輸入：urls (iterable of str)；輸出：已存在的 URL 集合 (set)。
+        """
+        urls = list(dict.fromkeys(urls))
+        found = set()
+        c = self.db.connection().cursor()
+        for start in range(0, len(urls), 500):
+            batch = urls[start:start + 500]
+            c.execute(f"SELECT url FROM news WHERE url IN ({','.join('?' * len(batch))})", batch)
+            found.update(row[0] for row in c.fetchall())
+        return found
+
+    def revision(self) -> int:
+        """
+        取得目前的資料版本號，每次新聞寫入後都會改變，可作為查詢結果快取鍵的一部分。
+        輸出：int。
+        """
+        row = self.db.connection().execute("SELECT value FROM news_meta WHERE key = 'revision'").fetchone()
+        return row[0] if row else 0
+
+    def _fts_match(self, keyword: str):
+        """
+        將關鍵字轉為 FTS5 查詢字串；沒有搜尋詞或有搜尋詞過短（trigram 索引無法比對）時為 None。
+        輸入：keyword (str)；輸出：str 或 None。
+        """
+        terms = keyword.split()
+        if terms and all(len(term) >= self.FTS_MIN_TERM_LENGTH for term in terms):
+            return " AND ".join(_fts_phrase(term) for term in terms)
+        return None
+
+    def _keyword_filter(self, keyword: str):
+        """
+        將關鍵字轉為 news 資料表的篩選條件：搜尋詞夠長時使用全文檢索，否則以 LIKE 比對。
+        輸入：keyword (str)；輸出：(SQL 條件 str, 參數 list)。
+        """
+        match = self._fts_match(keyword)
+        if match:
+            return "id IN (SELECT rowid FROM news_fts WHERE news_fts MATCH ?)", [match]
+        terms = keyword.split()
+        conditions = " AND ".join(
+            ["(title LIKE ? OR content LIKE ? OR summary LIKE ? OR ner LIKE ?)"] * len(terms)) or "1"
+        return conditions, [f"%{term}%" for term in terms for _ in range(4)]
+
+    def browse_news(self, keyword: str, date_from: str, date_to: str, limit: int = 20, after=None,
+                    snippet_length: int = 300):
+        """
+        依日期新到舊瀏覽新聞（鍵集分頁），只取出內文開頭片段，不讀取完整內文。
+        輸入：keyword (str)、date_from (str)、date_to (str)、limit (int)、
+             after ((publish_date_iso, id) 或 None) - 上一頁最後一筆的排序鍵、snippet_length (int)；
+        輸出：list of (id, title, publish_date, publish_date_iso, snippet, url)，
+             下一頁以最後一筆的 (publish_date_iso, id) 作為 after。
+        """
+        condition, params = self._keyword_filter(keyword)
+        where = ["publish_date_iso BETWEEN ? AND ?", condition]
+        params = [normalize_date(date_from), normalize_date(date_to)] + params
+        if after:
+            # 以 (日期, id) 組合索引直接定位，不需像 OFFSET 一樣逐筆略過前面的資料
+            where.append("(publish_date_iso, id) < (?, ?)")
+            params += list(after)
+        c = self.db.connection().cursor()
+        c.execute(f"""SELECT id, title, publish_date, publish_date_iso, substr(content, 1, ?), url FROM news
+                      WHERE {" AND ".join(where)}
+                      ORDER BY publish_date_iso DESC, id DESC
+                      LIMIT ?""",
+                  [snippet_length] + params + [limit])
+        return c.fetchall()
+
+    def count_news(self, keyword: str, date_from: str, date_to: str) -> int:
+        """
+        計算符合關鍵字與日期範圍的新聞篇數。
+        輸入：keyword (str)、date_from (str)、date_to (str)；輸出：int。
+        """
+        condition, params = self._keyword_filter(keyword)
+        c = self.db.connection().cursor()
+        c.execute(f"SELECT COUNT(*) FROM news WHERE publish_date_iso BETWEEN ? AND ? AND {condition}",
+                  [normalize_date(date_from), normalize_date(date_to)] + params)
+        return c.fetchone()[0]
+
+    def get_news(self, news_id: int):
+        """
+        依 id 讀取單篇新聞的完整內容與分析結果。
+        輸入：news_id (int)；
+        輸出：dict（id、title、publish_date、publish_date_iso、content、url、summary、sentiment、ner），不存在時為 None。
+        """
+        fields = ("id", "title", "publish_date", "publish_date_iso", "content", "url", "summary", "sentiment", "ner")
+        c = self.db.connection().cursor()
+        c.execute(f"SELECT {', '.join(fields)} FROM news WHERE id = ?", (news_id,))
+        row = c.fetchone()
+        return dict(zip(fields, row)) if row else None
+
+    def save_embeddings(self, model: str, items):
+        """
+        寫入（或覆寫）新聞向量，每筆給予遞增的寫入序號。
+        輸入：model (str) - 向量模型名稱、items (list of (news_id, 向量 bytes))；無輸出。
+        """
+        with self.db.transaction() as c:
+            for news_id, vector in items:
+                c.execute("UPDATE news_meta SET value = value + 1 WHERE key = 'embedding_seq'")
+                seq = c.execute("SELECT value FROM news_meta WHERE key = 'embedding_seq'").fetchone()[0]
+                c.execute("INSERT OR REPLACE INTO news_embedding (model, news_id, seq, vector) VALUES (?, ?, ?, ?)",
+                          (model, news_id, seq, vector))
+
+    def embeddings_since(self, model: str, seq: int, limit: int = 5000):
+        """
+        讀取寫入序號大於 seq 的新聞向量（依序號排序）。
+        輸入：model (str)、seq (int)、limit (int)；輸出：list of (seq, news_id, 向量 bytes)。
+        """
+        c = self.db.connection().cursor()
+        c.execute("SELECT seq, news_id, vector FROM news_embedding WHERE model = ? AND seq > ? ORDER BY seq LIMIT ?",
+                  (model, seq, limit))
+        return c.fetchall()
+
+    def news_without_embedding(self, model: str, limit: int = 256):
+        """
+        取得尚未以指定模型向量化的新聞（補建索引用）。
+        輸入：model (str)、limit (int)；輸出：list of (id, title, content, summary, ner)。
+        """
+        c = self.db.connection().cursor()
+        c.execute("""SELECT n.id, n.title, n.content, n.summary, n.ner FROM news AS n
+                     LEFT JOIN news_embedding AS e ON e.model = ? AND e.news_id = n.id
+                     WHERE e.news_id IS NULL ORDER BY n.id LIMIT ?""",
+                  (model, limit))
+        return c.fetchall()
+
+    def find_near_duplicate(self, fingerprint: int, max_distance: int = 6):
+        """
+        以 SimHash 指紋查詢內容最相近的已儲存新聞（先以分段索引取得候選，再計算漢明距離）。
+        max_distance 不超過 SIMHASH_BANDS - 1 時保證找得到所有符合的新聞。
+        輸入：fingerprint (int)、max_distance (int)；
+        輸出：dict（news_id、distance、title、url、summary、sentiment、ner），沒有符合的新聞時為 None。
+        """
+        if fingerprint is None:
+            return None
+        conditions = " OR ".join(f"band{i} = ?" for i in range(SIMHASH_BANDS))
+        c = self.db.connection().cursor()
+        c.execute(f"SELECT news_id, simhash FROM news_simhash WHERE {conditions}", _simhash_bands(fingerprint))
+        best = None
+        for news_id, stored in c.fetchall():
+            distance = hamming_distance(fingerprint, stored & ((1 << 64) - 1))
+            if distance <= max_distance and (best is None or distance < best[1]):
+                best = (news_id, distance)
+        if best is None:
+            return None
+        row = c.execute("SELECT title, url, summary, sentiment, ner FROM news WHERE id = ?", (best[0],)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("news_id", "distance", "title", "url", "summary", "sentiment", "ner"), best + row))
+
+    def top_entities(self, date_from: str, date_to: str, limit: int = 20):
+        """
+        由每日彙總表統計日期範圍內被提及最多的實體及各情緒篇數。
+        輸入：date_from (str)、date_to (str)、limit (int)；
+        輸出：list of (實體名稱, 總篇數, 正面, 中性, 負面, 未知)。
+        """
+        c = self.db.connection().cursor()
+        c.execute("""SELECT e.name, SUM(d.count),
+                            SUM(CASE WHEN d.sentiment = '正面' THEN d.count ELSE 0 END),
+                            SUM(CASE WHEN d.sentiment = '中性' THEN d.count ELSE 0 END),
+                            SUM(CASE WHEN d.sentiment = '負面' THEN d.count ELSE 0 END),
+                            SUM(CASE WHEN d.sentiment = '未知' THEN d.count ELSE 0 END)
+                     FROM entity_daily AS d JOIN entity AS e ON e.id = d.entity_id
+                     WHERE d.day BETWEEN ? AND ?
+                     GROUP BY d.entity_id
+                     ORDER BY SUM(d.count) DESC, e.name
+                     LIMIT ?""",
+                  (normalize_date(date_from), normalize_date(date_to), limit))
+        return c.fetchall()
+
+    def sentiment_trend(self, date_from: str, date_to: str, entity: str = None):
+        """
+        取得每日各情緒的新聞篇數；指定實體時只計算提及該實體的新聞（名稱不分大小寫）。
+        輸入：date_from (str)、date_to (str)、entity (str 或 None)；
+        輸出：list of (日期 YYYY-MM-DD, 情緒, 篇數)，依日期排序。
+        """
+        date_from, date_to = normalize_date(date_from), normalize_date(date_to)
+        c = self.db.connection().cursor()
+        if entity is None:
+            c.execute("SELECT day, sentiment, count FROM sentiment_daily WHERE day BETWEEN ? AND ? ORDER BY day",
+                      (date_from, date_to))
+        else:
+            c.execute("""SELECT d.day, d.sentiment, d.count
+                         FROM entity AS e JOIN entity_daily AS d ON d.entity_id = e.id
+                         WHERE e.norm_name = ? AND d.day BETWEEN ? AND ?
+                         ORDER BY d.day""",
+                      (entity.strip().casefold(), date_from, date_to))
+        return c.fetchall()
+
+    def search_news(self, keyword: str, date_from: str, date_to: str, limit: int = 10, offset: int = 0):
+        """
+        根據關鍵字與日期範圍搜尋新聞，有關鍵字時依全文檢索相關度排序，否則依日期新到舊排序。
+        輸入：keyword (str)、date_from (str)、date_to (str)、limit (int)、offset (int)；
+        輸出：list of (title, publish_date, content, url)。
+        """
+        date_from, date_to = normalize_date(date_from), normalize_date(date_to)
+        match = self._fts_match(keyword)
+        c = self.db.connection().cursor()
+        if match:
+            c.execute("""SELECT n.title, n.publish_date, n.content, n.url
+                         FROM news_fts JOIN news AS n ON n.id = news_fts.rowid
+                         WHERE news_fts MATCH ? AND n.publish_date_iso BETWEEN ? AND ?
+                         ORDER BY news_fts.rank, n.publish_date_iso DESC
+                         LIMIT ? OFFSET ?""",
+                      (match, date_from, date_to, limit, offset))
+        else:
+            # 過短的搜尋詞無法使用 trigram 索引，改在日期索引篩選後的範圍內比對（與瀏覽、計數共用同一條件）
+            condition, params = self._keyword_filter(keyword)
+            c.execute(f"""SELECT title, publish_date, content, url FROM news
+                          WHERE publish_date_iso BETWEEN ? AND ? AND {condition}
+                          ORDER BY publish_date_iso DESC, id DESC
+                          LIMIT ? OFFSET ?""",
+                      [date_from, date_to] + params + [limit, offset])
+        return c.fetchall()
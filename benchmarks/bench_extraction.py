@@ -0,0 +1,171 @@
+# bench_extraction.py
+# 文章擷取微基準：比較 lxml 擷取引擎與原本 BeautifulSoup 實作的解析時間與記憶體峰值
+#
+# 用法（於專案根目錄執行）：
+#   python -m benchmarks.bench_extraction --corpus ./data/pages      # 已儲存的新聞頁面（*.html）
+#   python -m benchmarks.bench_extraction --synthetic 200            # 無頁面時以合成頁面測試
+import argparse
+import glob
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import time
+import tracemalloc
+from models.article_extractor import extract_article, extract_article_bs4
+
+ENGINES = {
+    "bs4 (html.parser)": extract_article_bs4,
+    "lxml (xpath)": extract_article,
+}
+
+# 合成頁面的三種版面：新版日期區塊、舊版日期區塊、僅有 meta 標籤
+_DATE_BLOCKS = [
+    '<div class="flex gap-4 text-sm items-center flex-wrap"><span>2025-03-{day:02d}</span><span>作者</span></div>',
+    '<div class="flex gap-2 items-center text-sm text-gray-600"><span>2025-03-{day:02d}</span></div>',
+    '',
+]
+
+
+def synthetic_page(seed: int, title: str = None) -> str:
+    """
+    產生仿數位時代版面的新聞頁面（含導覽列、側欄等與擷取無關的節點）。
+    輸入：seed (int)、title (str) - 新聞標題（預設依 seed 產生）；輸出：HTML (str)。
+    """
+    title = title or f"測試新聞標題 {seed}"
+    rng = random.Random(seed)
+    layout = seed % len(_DATE_BLOCKS)
+    paragraphs = "".join(
+        f"<p>第 {i} 段：人工智慧與半導體產業持續成長，<a href='/tags/{i}'>相關報導</a>帶動供應鏈投資。</p>"
+        for i in range(rng.randint(10, 40))
+    )
+    nav = "".join(f"<li><a href='/category/{i}'>分類 {i}</a></li>" for i in range(60))
+    sidebar = "".join(f"<div class='card'><a href='/articles/view/{i}'><span>推薦文章 {i}</span></a></div>"
+                      for i in range(rng.randint(20, 50)))
+    heading = f"<h1 class='article-title text-3xl'>{title}</h1>" if layout != 2 else ""
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<meta property='og:title' content='{title} | 數位時代'>"
+        f"<meta property='article:published_time' content='2025-03-{seed % 28 + 1:02d}T08:00:00+08:00'>"
+        "<script>window.__DATA__ = {\"a\": 1};</script></head><body>"
+        f"<header><ul>{nav}</ul></header><main>{heading}"
+        f"{_DATE_BLOCKS[layout].format(day=seed % 28 + 1)}"
+        f"<div class='article-content prose'>{paragraphs}</div></main>"
+        f"<aside>{sidebar}</aside><footer>© 數位時代</footer></body></html>"
+    )
+
+
+def load_corpus(corpus_dir: str, synthetic: int) -> list:
+    """
+    讀取語料：優先使用目錄中的 *.html，沒有時改用合成頁面。
+    輸入：corpus_dir (str)、synthetic (int) - 合成頁面數量；輸出：list of (名稱, HTML)。
+    """
+    pages = []
+    if corpus_dir:
+        for path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages.append((os.path.basename(path), f.read()))
+    if not pages:
+        print(f"ℹ️ 未找到已儲存的頁面，改用 {synthetic} 篇合成頁面")
+        pages = [(f"synthetic-{i}", synthetic_page(i)) for i in range(synthetic)]
+    return pages
+
+
+def measure(engine, pages: list, repeat: int) -> dict:
+    """
+    量測單一擷取引擎：每頁重複 repeat 次取最短時間，另以 tracemalloc 量測單頁解析的記憶體峰值。
+    輸入：engine (callable)、pages (list)、repeat (int)；輸出：dict（各項統計）。
+    """
+    timings, peaks = [], []
+    for name, html in pages:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            engine(html, name)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+
+        tracemalloc.start()
+        engine(html, name)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "total_ms": sum(timings) * 1000,
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+        "pages_per_s": len(timings) / sum(timings),
+        "peak_kib": max(peaks) / 1024,
+        "avg_peak_kib": statistics.mean(peaks) / 1024,
+    }
+
+
+def _rss_worker(label: str, pages: list, conn):
+    """子程序：先以第一頁暖機（載入函式庫），再解析全部頁面並回報最大常駐記憶體的增加量（KiB）。"""
+    ENGINES[label](pages[0][1], pages[0][0])
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for name, html in pages:
+        ENGINES[label](html, name)
+    conn.send(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+    conn.close()
+
+
+def measure_rss(label: str, pages: list) -> float:
+    """
+    在獨立子程序中量測最大常駐記憶體的增加量。
+    tracemalloc 只追蹤 Python 配置器，lxml（libxml2）的 C 層樹狀結構不在其中，因此另以 RSS 補充比較。
+    輸入：label (str) - 引擎名稱、pages (list)；輸出：RSS 增加量 KiB (float)。
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_rss_worker, args=(label, pages, sender))
+    process.start()
+    delta = receiver.recv()
+    process.join()
+    return float(delta)
+
+
+def compare_outputs(pages: list) -> int:
+    """
+    比對兩種引擎的擷取結果，回傳不一致的頁數（並列出前幾筆差異）。
+    """
+    mismatches = 0
+    for name, html in pages:
+        expected, actual = extract_article_bs4(html, name), extract_article(html, name)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 5:
+                diff = [k for k in expected if expected[k] != actual[k]]
+                print(f"⚠️ 結果不一致：{name}（欄位：{', '.join(diff)}）")
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="比較文章擷取引擎的解析時間與記憶體峰值")
+    parser.add_argument("--corpus", help="已儲存新聞頁面（*.html）的目錄")
+    parser.add_argument("--synthetic", type=int, default=200, help="無語料時產生的合成頁面數")
+    parser.add_argument("--repeat", type=int, default=5, help="每頁重複解析次數（取最短時間）")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.synthetic)
+    avg_kib = statistics.mean(len(html.encode("utf-8")) for _, html in pages) / 1024
+    print(f"📄 語料：{len(pages)} 篇，平均 {avg_kib:.1f} KiB")
+
+    mismatches = compare_outputs(pages)
+    print(f"🔍 結果一致性：{len(pages) - mismatches}/{len(pages)} 篇相同")
+
+    results = {}
+    for label, engine in ENGINES.items():
+        results[label] = measure(engine, pages, args.repeat)
+        results[label]["rss_kib"] = measure_rss(label, pages)
+    print(f"\n{'引擎':<20}{'總計 ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'頁/秒':>10}"
+          f"{'峰值 KiB':>12}{'平均峰值 KiB':>14}{'RSS 增加 KiB':>14}")
+    for label, r in results.items():
+        print(f"{label:<20}{r['total_ms']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['pages_per_s']:>10.0f}{r['peak_kib']:>12.0f}{r['avg_peak_kib']:>14.0f}{r['rss_kib']:>14.0f}")
+    print("（峰值 / 平均峰值為 tracemalloc 量測的 Python 配置；RSS 增加量另含 C 層配置）")
+
+    base, fast = results["bs4 (html.parser)"], results["lxml (xpath)"]
+    print(f"\n⚡ 解析速度提升 {base['total_ms'] / fast['total_ms']:.1f} 倍，"
+          f"Python 配置峰值降為 {fast['peak_kib'] / base['peak_kib']:.0%}")
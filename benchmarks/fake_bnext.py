@@ -0,0 +1,154 @@
+# fake_bnext.py
+# 模擬數位時代網站：提供 RSS、站內搜尋結果頁與新聞頁面，供離線基準測試使用
+#
+# 用法（於專案根目錄執行）：
+#   python -m benchmarks.fake_bnext --port 8001 --pages ./data/pages
+#   BNEXT_BASE_URL=http://127.0.0.1:8001 BNEXT_FEED_URLS=http://127.0.0.1:8001/rss streamlit run streamlit_app.py
+import argparse
+import glob
+import hashlib
+import html
+import os
+import threading
+import time
+import urllib.parse
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.bench_extraction import synthetic_page
+
+# 新聞標題使用的主題詞，基準測試的搜尋關鍵字從中挑選，確保每次搜尋都有結果
+TOPICS = ["AI", "半導體", "電動車", "雲端", "資安", "新創", "元宇宙", "5G", "機器人", "金融科技"]
+
+
+def article_title(article_id: int) -> str:
+    """依文章編號產生含主題詞的標題。"""
+    return f"{TOPICS[article_id % len(TOPICS)]} 產業觀察：第 {article_id} 篇深度報導"
+
+
+# 模擬網站伺服器
+class FakeBnextServer:
+    def __init__(self, article_count: int = 500, pages_dir: str = None, latency: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        """
+        建構函式。
+        輸入：article_count (int) - 文章數、pages_dir (str) - 已錄製的新聞頁面目錄（*.html，依序輪流使用）、
+             latency (float) - 每個回應的額外延遲秒數、host (str)、port (int) - 0 表示自動選擇。
+        """
+        self.article_count = article_count
+        self.latency = latency
+        self.recorded = []
+        if pages_dir:
+            for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    self.recorded.append(f.read())
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """於背景執行緒啟動伺服器，回傳網站位址。"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ---------- 頁面內容 ----------
+    def article_url(self, article_id: int) -> str:
+        return f"{self.base_url}/articles/view/{article_id}"
+
+    def article_html(self, article_id: int) -> str:
+        if self.recorded:
+            return self.recorded[article_id % len(self.recorded)]
+        return synthetic_page(article_id, title=article_title(article_id))
+
+    def rss_xml(self) -> str:
+        items = "".join(
+            f"<item><title>{html.escape(article_title(i))}</title><link>{self.article_url(i)}</link>"
+            f"<description>{TOPICS[i % len(TOPICS)]} 相關新聞摘要</description>"
+            f"<pubDate>{formatdate(time.time() - i * 3600, usegmt=True)}</pubDate></item>"
+            for i in range(self.article_count)
+        )
+        return f"<?xml version='1.0' encoding='utf-8'?><rss version='2.0'><channel><title>數位時代</title>{items}</channel></rss>"
+
+    def search_html(self, keyword: str) -> str:
+        """仿 Google 站內搜尋渲染完成後的結果頁（靜態 HTML，不需執行 JavaScript）。"""
+        matches = [i for i in range(self.article_count) if keyword.lower() in article_title(i).lower()][:10]
+        if not matches:
+            return "<html><body><div class='gs-no-results-result'>沒有結果</div></body></html>"
+        results = "".join(
+            f"<div class='gsc-webResult'><div class='gsc-thumbnail-inside'>"
+            f"<a class='gs-title' href='{self.article_url(i)}'>{html.escape(article_title(i))}</a></div></div>"
+            for i in matches
+        )
+        return f"<html><body>{results}</body></html>"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支援 keep-alive，與真實網站的連線行為一致
+
+            def _send(self, status: int, body: str = "", content_type: str = "text/html; charset=utf-8",
+                      headers: dict = None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                parts = urllib.parse.urlsplit(self.path)
+                if parts.path == "/rss":
+                    self._send(200, server.rss_xml(), "application/rss+xml; charset=utf-8")
+                elif parts.path == "/gsearch":
+                    keyword = urllib.parse.parse_qs(parts.query).get("q", [""])[0]
+                    self._send(200, server.search_html(keyword))
+                elif parts.path.startswith("/articles/view/"):
+                    try:
+                        article_id = int(parts.path.rsplit("/", 1)[-1])
+                    except ValueError:
+                        self._send(404, "not found")
+                        return
+                    body = server.article_html(article_id)
+                    etag = '"' + hashlib.md5(body.encode("utf-8")).hexdigest() + '"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self._send(304, headers={"ETag": etag})
+                    else:
+                        self._send(200, body, headers={"ETag": etag})
+                else:
+                    self._send(404, "not found")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="啟動模擬數位時代網站")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--articles", type=int, default=500, help="文章數")
+    parser.add_argument("--pages", help="已錄製的新聞頁面目錄（*.html）")
+    parser.add_argument("--latency", type=float, default=0.0, help="每個回應的額外延遲秒數")
+    args = parser.parse_args()
+
+    fake = FakeBnextServer(args.articles, args.pages, args.latency, port=args.port)
+    print(f"🌐 模擬網站已啟動：{fake.base_url}（RSS：{fake.base_url}/rss）")
+    fake._server.serve_forever()
@@ -0,0 +1,208 @@
+# fake_llm.py
+# 模擬 LLM 伺服器：支援 Ollama（/api/generate、/api/tags）與 OpenAI / Azure OpenAI（chat/completions）介面，
+# 可設定首個 token 延遲、生成速度與同時處理數，供離線基準測試與容量估算使用
+#
+# 用法（於專案根目錄執行）：
+#   python -m benchmarks.fake_llm --port 11434 --latency 0.5 --tokens-per-second 30 --parallel 4
+#   OLLAMA_API_BASE=http://127.0.0.1:11434 streamlit run streamlit_app.py
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from models.token_budget import estimate_tokens
+
+_AZURE_PATH = re.compile(r"^/openai/deployments/([^/]+)/chat/completions$")
+# /api/tags 回報的模型（與 apis/llm_api.py 的內部模型名稱一致，讓健康檢查通過）
+_MODEL_NAMES = ["cwchang/llama-3-taiwan-8b-instruct:f16", "gemma2:27b-instruct-q5_0"]
+
+
+# 模擬 LLM 伺服器
+class FakeLLMServer:
+    def __init__(self, latency: float = 0.2, tokens_per_second: float = 50, parallel: int = 4,
+                 completion_tokens: int = 120, host: str = "127.0.0.1", port: int = 0):
+        """
+        建構函式。
+        輸入：latency (float) - 首個 token 前的延遲秒數（模擬提示詞處理）、
+             tokens_per_second (float) - 生成速度、parallel (int) - 同時處理的請求數（超過時排隊，
+             模擬 Ollama 的 OLLAMA_NUM_PARALLEL）、completion_tokens (int) - 每次回覆的約略 token 數。
+        """
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self._slots = threading.BoundedSemaphore(max(1, parallel))
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """於背景執行緒啟動伺服器，回傳服務位址。"""
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reply_for(self, prompt: str) -> str:
+        """
+        依提示詞類型產生格式正確的回覆：問題理解 JSON、單篇分析 JSON，其餘為純文字總結。
+        輸入：prompt (str)；輸出：回覆文字 (str)。
+        """
+        filler = ("根據報導，相關產業持續成長，市場關注供應鏈與政策變化帶來的影響。" * 20)[:self.completion_tokens]
+        if '"is_valid"' in prompt:
+            return json.dumps({"is_valid": True, "reason": "科技新聞", "keywords": ["AI", "半導體"]},
+                              ensure_ascii=False)
+        if '"summary"' in prompt and '"sentiment"' in prompt:
+            return json.dumps({"summary": filler, "sentiment": "中性", "ner": "台積電, 輝達, 台北"},
+                              ensure_ascii=False)
+        return filler
+
+    def generate(self, prompt: str):
+        """
+        產生回覆片段：先等待首個 token 延遲，再依生成速度逐字產出（以估計 token 數計算時間）。
+        佔用一個處理名額直到產出完畢。
+        輸入：prompt (str)；輸出：generator of str。
+        """
+        text = self.reply_for(prompt)
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += estimate_tokens(prompt)
+            self.stats["completion_tokens"] += estimate_tokens(text)
+        with self._slots:
+            time.sleep(self.latency)
+            per_char = estimate_tokens(text) / max(self.tokens_per_second, 1e-6) / max(len(text), 1)
+            for char in text:
+                time.sleep(per_char)
+                yield char
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _read_json(self) -> dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def _send_json(self, payload: dict, status: int = 200):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _start_chunked(self, content_type: str):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+            def _write_chunk(self, text: str):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _end_chunked(self):
+                self.wfile.write(b"0\r\n\r\n")
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": name} for name in _MODEL_NAMES]})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                path = self.path.split("?")[0]
+                body = self._read_json()
+                if path == "/api/generate":
+                    self._ollama_generate(body)
+                elif path == "/v1/chat/completions" or _AZURE_PATH.match(path):
+                    match = _AZURE_PATH.match(path)
+                    self._openai_chat(body, match.group(1) if match else body.get("model", "fake"))
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def _ollama_generate(self, body: dict):
+                model, prompt = body.get("model", "fake"), body.get("prompt")
+                if not prompt:
+                    # 只載入模型（預熱）的請求
+                    self._send_json({"model": model, "response": "", "done": True})
+                    return
+                started = time.perf_counter()
+                if not body.get("stream", True):
+                    text = "".join(server.generate(prompt))
+                    self._send_json(self._ollama_final(model, prompt, text, started, text))
+                    return
+                self._start_chunked("application/x-ndjson")
+                pieces = []
+                for piece in server.generate(prompt):
+                    pieces.append(piece)
+                    self._write_chunk(json.dumps({"model": model, "response": piece, "done": False},
+                                                 ensure_ascii=False) + "\n")
+                final = self._ollama_final(model, prompt, "".join(pieces), started, "")
+                self._write_chunk(json.dumps(final, ensure_ascii=False) + "\n")
+                self._end_chunked()
+
+            @staticmethod
+            def _ollama_final(model, prompt, text, started, response) -> dict:
+                return {"model": model, "response": response, "done": True,
+                        "total_duration": int((time.perf_counter() - started) * 1e9),
+                        "prompt_eval_count": estimate_tokens(prompt), "eval_count": estimate_tokens(text)}
+
+            def _openai_chat(self, body: dict, model: str):
+                prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+                completion_id, created = f"chatcmpl-{uuid.uuid4().hex[:12]}", int(time.time())
+                if not body.get("stream"):
+                    text = "".join(server.generate(prompt))
+                    self._send_json({
+                        "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                     "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text),
+                                  "total_tokens": estimate_tokens(prompt) + estimate_tokens(text)},
+                    })
+                    return
+                self._start_chunked("text/event-stream")
+
+                def event(delta: dict, finish_reason=None):
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                             "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+                    self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+
+                event({"role": "assistant", "content": ""})
+                for piece in server.generate(prompt):
+                    event({"content": piece})
+                event({}, "stop")
+                self._write_chunk("data: [DONE]\n\n")
+                self._end_chunked()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="啟動模擬 LLM 伺服器（Ollama / OpenAI 相容）")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.2, help="首個 token 前的延遲秒數")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="生成速度")
+    parser.add_argument("--parallel", type=int, default=4, help="同時處理的請求數")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="每次回覆的約略 token 數")
+    args = parser.parse_args()
+
+    fake = FakeLLMServer(args.latency, args.tokens_per_second, args.parallel, args.completion_tokens,
+                         port=args.port)
+    print(f"🤖 模擬 LLM 已啟動：{fake.base_url}")
+    fake._server.serve_forever()
@@ -0,0 +1,232 @@
+# run_scenarios.py
+# 離線端到端基準測試：啟動模擬數位時代網站與模擬 LLM，依不同規模執行各階段情境，
+# 回報 p50 / p95 延遲、吞吐量與記憶體峰值（每個情境在獨立子程序中執行，RSS 互不影響）
+#
+# 用法（於專案根目錄執行）：
+#   python -m benchmarks.run_scenarios                                   # 全部情境，規模 1,10,50
+#   python -m benchmarks.run_scenarios --scenarios fetch_article_content,news_database --scales 10,100
+#   python -m benchmarks.run_scenarios --llm-latency 0.5 --tokens-per-second 30 --json result.json
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.fake_bnext import FakeBnextServer, TOPICS
+from benchmarks.fake_llm import FakeLLMServer
+
+# 可執行的情境（對應 scenario_<名稱> 函式；專案模組在子程序中才匯入，確保讀到指向模擬伺服器的環境變數）
+SCENARIOS = ["search_news", "fetch_article_content", "analyze_article", "generate_summary", "news_database"]
+
+
+def timed_map(fn, items: list, concurrency: int):
+    """
+    以指定並行數對每個項目執行 fn，分別計時。
+    輸入：fn (callable)、items (list)、concurrency (int)；輸出：(各次延遲秒數 list, 總耗時秒數 float)。
+    """
+    def timed(item):
+        start = time.perf_counter()
+        fn(item)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        latencies = list(executor.map(timed, items))
+    return latencies, time.perf_counter() - start
+
+
+def _crawler(workdir: str, args):
+    from apis.article_cache import ArticleCache
+    from apis.news_database import NewsDatabase
+    from models.crawler_bnext import BnextNewsCrawler
+    from models.http_client import HostRateLimiter
+    return BnextNewsCrawler(headless=True,
+                            rate_limiter=HostRateLimiter(min_interval=args.politeness, burst=5),
+                            search_limiter=HostRateLimiter(min_interval=args.politeness, burst=1),
+                            article_cache=ArticleCache(os.path.join(workdir, "article_cache.db")),
+                            db=NewsDatabase(os.path.join(workdir, "news.db")))
+
+
+def _llm_helper(workdir: str, args):
+    from apis.analysis_cache import AnalysisCache
+    from models.llm_helper import LLMHelper
+    helper = LLMHelper(analysis_cache=AnalysisCache(os.path.join(workdir, "analysis_cache.db")))
+    if args.llm_api == "openai":
+        helper.mode, helper.llm_option = "外部LLM", "fake-deployment"
+    return helper
+
+
+def _article_text(i: int, long_every: int = 10) -> str:
+    """產生測試用內文；每 long_every 篇一篇超長文章，觸發分段 map-reduce。"""
+    paragraph = f"{TOPICS[i % len(TOPICS)]} 相關企業第 {i} 季營收成長，法人看好後續需求與供應鏈布局。"
+    return "\n".join([paragraph] * (400 if long_every and i % long_every == long_every - 1 else 20))
+
+
+# ---------- 情境 ----------
+def scenario_search_news(scale: int, args, workdir: str) -> dict:
+    """以 scale 個關鍵字依序搜尋（每位使用者一次搜尋）。"""
+    crawler = _crawler(workdir, args)
+    if args.browser:
+        from models.search_backends import SeleniumSearchBackend
+        crawler.search_backends = [SeleniumSearchBackend(crawler)]
+    keywords = [TOPICS[i % len(TOPICS)] for i in range(scale)]
+    return {"search_news": timed_map(lambda kw: crawler.search_news(kw, max_results=10), keywords, 1)}
+
+
+def scenario_fetch_article_content(scale: int, args, workdir: str) -> dict:
+    """擷取 scale 篇文章：先冷快取（實際下載解析），再熱快取（命中磁碟快取）。"""
+    crawler = _crawler(workdir, args)
+    urls = [f"{args.site}/articles/view/{i}" for i in range(scale)]
+    cold = timed_map(crawler.fetch_article_content, urls, args.concurrency)
+    warm = timed_map(crawler.fetch_article_content, urls, args.concurrency)
+    return {"fetch_article_content (cold)": cold, "fetch_article_content (warm)": warm}
+
+
+def scenario_analyze_article(scale: int, args, workdir: str) -> dict:
+    """以有上限的並行數分析 scale 篇不同內文（每 10 篇含一篇超長文章），再以相同內文測試快取命中。"""
+    helper = _llm_helper(workdir, args)
+    articles = [_article_text(i) for i in range(scale)]
+    cold = timed_map(helper.analyze_article, articles, args.concurrency)
+    cached = timed_map(helper.analyze_article, articles, args.concurrency)
+    return {"analyze_article": cold, "analyze_article (cached)": cached}
+
+
+def scenario_generate_summary(scale: int, args, workdir: str) -> dict:
+    """以 scale 篇新聞產生綜合輿情總結（數量多時觸發分組 map-reduce），重複 repeat 次。"""
+    helper = _llm_helper(workdir, args)
+    articles = [{"title": f"{TOPICS[i % len(TOPICS)]} 新聞 {i}", "publish_date": "2025-03-25"} for i in range(scale)]
+    analyses = [{"summary": _article_text(i, long_every=0)[:200], "sentiment": "中性", "ner": "台積電, 輝達"}
+                for i in range(scale)]
+    return {"generate_summary": timed_map(lambda _: helper.generate_summary(articles, analyses),
+                                          range(args.repeat), 1)}
+
+
+def scenario_news_database(scale: int, args, workdir: str) -> dict:
+    """寫入 scale 篇新聞（每批 50 篇一個交易），再執行全文搜尋、短關鍵字搜尋與 URL 查詢。"""
+    from apis.news_database import NewsDatabase
+    db = NewsDatabase(os.path.join(workdir, "news_db_bench.db"))
+    items = [({"title": f"{TOPICS[i % len(TOPICS)]} 產業觀察 {i}", "publish_date": "2025-03-25",
+               "content": _article_text(i, long_every=0), "url": f"{args.site}/articles/view/{i}"},
+              {"summary": "摘要", "sentiment": "中性", "ner": "台積電"}) for i in range(scale)]
+    batches = [items[i:i + 50] for i in range(0, len(items), 50)]
+    queries = [TOPICS[i % len(TOPICS)] + " 產業" for i in range(max(scale, 10))]
+    short = [TOPICS[i % len(TOPICS)][:2] for i in range(max(scale, 10))]
+    urls = [item[0]["url"] for item in items]
+    return {
+        "news_database insert_many": timed_map(db.insert_many, batches, 1),
+        "news_database search (fts)": timed_map(
+            lambda q: db.search_news(q, "2025-01-01", "2025-12-31"), queries, args.concurrency),
+        "news_database search (like)": timed_map(
+            lambda q: db.search_news(q, "2025-01-01", "2025-12-31"), short, args.concurrency),
+        "news_database existing_urls": timed_map(db.existing_urls, [urls], 1),
+    }
+
+
+def _worker(name: str, scale: int, args, conn):
+    """子程序：執行單一情境並回傳結果與最大常駐記憶體（未指定 --verbose 時不顯示程式本身的輸出）。"""
+    try:
+        with tempfile.TemporaryDirectory() as workdir, open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(sys.stdout if args.verbose else devnull), warnings.catch_warnings():
+            if not args.verbose:
+                warnings.simplefilter("ignore")
+            results = globals()[f"scenario_{name}"](scale, args, workdir)
+        conn.send((results, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, None))
+    except Exception as e:
+        conn.send(({}, 0, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def summarize(label: str, scale: int, latencies: list, wall: float, peak_kib: int) -> dict:
+    """計算 p50 / p95 延遲、吞吐量與記憶體峰值。"""
+    ordered = sorted(latencies)
+    return {
+        "scenario": label,
+        "scale": scale,
+        "ops": len(ordered),
+        "p50_ms": statistics.median(ordered) * 1000 if ordered else 0.0,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000 if ordered else 0.0,
+        "throughput": len(ordered) / wall if wall else 0.0,
+        "peak_rss_mib": peak_kib / 1024,
+    }
+
+
+def run(names: list, scales: list, args) -> list:
+    """依序在子程序中執行各情境與規模，回傳結果列。"""
+    rows = []
+    for name in names:
+        for scale in scales:
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_worker, args=(name, scale, args, sender))
+            process.start()
+            results, peak_kib, error = receiver.recv()
+            process.join()
+            if error:
+                print(f"⚠️ {name} (scale={scale}) 失敗：{error}")
+                continue
+            for label, (latencies, wall) in results.items():
+                row = summarize(label, scale, latencies, wall, peak_kib)
+                rows.append(row)
+                print(f"{row['scenario']:<32}{row['scale']:>7}{row['ops']:>6}{row['p50_ms']:>11.1f}"
+                      f"{row['p95_ms']:>11.1f}{row['throughput']:>11.2f}{row['peak_rss_mib']:>10.1f}")
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="以模擬網站與模擬 LLM 執行離線端到端基準測試")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"逗號分隔，可選：{', '.join(SCENARIOS)}")
+    parser.add_argument("--scales", default="1,10,50", help="逗號分隔的規模（篇數 / 次數）")
+    parser.add_argument("--concurrency", type=int, default=4, help="擷取、分析與查詢的並行數")
+    parser.add_argument("--repeat", type=int, default=3, help="generate_summary 的重複次數")
+    parser.add_argument("--politeness", type=float, default=0.0,
+                        help="同一主機的請求間隔秒數（預設 0，只量測程式本身；設為 0.2 可模擬正式環境）")
+    parser.add_argument("--pages", help="已錄製的新聞頁面目錄（*.html），未提供時使用合成頁面")
+    parser.add_argument("--site-latency", type=float, default=0.0, help="模擬網站每個回應的延遲秒數")
+    parser.add_argument("--llm-api", choices=["ollama", "openai"], default="ollama", help="模擬 LLM 使用的介面")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="模擬 LLM 首個 token 前的延遲秒數")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="模擬 LLM 生成速度")
+    parser.add_argument("--llm-parallel", type=int, default=4, help="模擬 LLM 同時處理的請求數")
+    parser.add_argument("--browser", action="store_true", help="search_news 改用 Selenium 搜尋（需安裝 Chrome）")
+    parser.add_argument("--json", help="將結果寫入 JSON 檔（供 CI 比較）")
+    parser.add_argument("--verbose", action="store_true", help="顯示各情境執行時的程式輸出")
+    args = parser.parse_args()
+
+    site = FakeBnextServer(article_count=max(500, max(int(s) for s in args.scales.split(","))),
+                           pages_dir=args.pages, latency=args.site_latency)
+    llm = FakeLLMServer(latency=args.llm_latency, tokens_per_second=args.tokens_per_second,
+                        parallel=args.llm_parallel)
+    args.site = site.start()
+    llm_url = llm.start()
+
+    # 子程序繼承這些環境變數，專案模組匯入時即指向模擬伺服器
+    os.environ.update({
+        "BNEXT_BASE_URL": args.site,
+        "BNEXT_FEED_URLS": f"{args.site}/rss",
+        "OLLAMA_API_BASE": llm_url,
+        "AZURE_OPENAI_API_KEY": "fake-key",
+        "AZURE_OPENAI_ENDPOINT": llm_url,
+        "AZURE_OPENAI_API_VERSION": "2024-02-01",
+    })
+    print(f"🌐 模擬網站：{args.site}　🤖 模擬 LLM：{llm_url}（{args.llm_api}）")
+    print(f"\n{'情境':<30}{'規模':>7}{'次數':>5}{'p50 ms':>11}{'p95 ms':>11}{'次/秒':>10}{'RSS MiB':>10}")
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知的情境：{', '.join(unknown)}")
+    rows = run(names, [int(s) for s in args.scales.split(",")], args)
+    print(f"\n🤖 模擬 LLM 統計：{llm.stats}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": {k: v for k, v in vars(args).items() if k != "json"}, "results": rows},
+                      f, ensure_ascii=False, indent=2)
+        print(f"💾 已寫入 {args.json}")
+    site.stop()
+    llm.stop()
@@ -0,0 +1,117 @@
+# article_extractor.py
+# 新聞頁面擷取引擎：以 lxml（C 實作的 HTML 解析器）搭配預先編譯的 XPath 取出標題、日期與內文
+import lxml.html
+from lxml import etree
+from bs4 import BeautifulSoup
+
+NO_TITLE = "無法取得標題"
+NO_DATE = "未知日期"
+NO_CONTENT = "無法取得內文"
+
+
+def _has_class(name: str) -> str:
+    """產生「class 屬性包含指定類別」的 XPath 條件（等同 CSS 的 .name）。"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# 預先編譯的 XPath，對應數位時代目前已知的版面
+_TITLE_XPATH = etree.XPath(f"(//h1[{_has_class('article-title')}])[1]")
+_OG_TITLE_XPATH = etree.XPath("(//meta[@property='og:title'])[1]/@content")
+# 日期區塊：新版與舊版版面，依序嘗試（類別字串需完全相符，與原本 BeautifulSoup 的比對方式一致）
+_DATE_XPATHS = [
+    etree.XPath("(//div[@class='flex gap-4 text-sm items-center flex-wrap'])[1]"),
+    etree.XPath("(//div[@class='flex gap-2 items-center text-sm text-gray-600'])[1]"),
+]
+_FIRST_SPAN_XPATH = etree.XPath("(.//span)[1]")
+_META_DATE_XPATH = etree.XPath("(//meta[@property='article:published_time'])[1]/@content")
+_CONTENT_XPATH = etree.XPath(f"(//div[{_has_class('article-content')}])[1]")
+_PARAGRAPH_XPATH = etree.XPath(".//p")
+
+
+def _parse_html(html):
+    """
+    將 HTML 解析為 lxml 樹。
+    輸入：html (str 或 bytes)；輸出：lxml 元素，無法解析時回傳 None。
+    """
+    if not html:
+        return None
+    try:
+        return lxml.html.fromstring(html)
+    except ValueError:
+        # 含有 XML 編碼宣告的 str 無法直接解析，轉成 bytes 交由 lxml 判斷
+        return lxml.html.fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+
+def extract_article(html, article_url: str) -> dict:
+    """
+    以 lxml 從新聞頁面 HTML 解析標題、日期與內文。
+    輸入：html (str 或 bytes)、article_url (str)；輸出：dict（包含 title, publish_date, content, url）。
+    """
+    root = _parse_html(html)
+    if root is None:
+        return {"title": NO_TITLE, "publish_date": NO_DATE, "content": NO_CONTENT, "url": article_url}
+
+    # 擷取標題（找不到時改用 og:title）
+    title_nodes = _TITLE_XPATH(root)
+    if title_nodes:
+        title = title_nodes[0].text_content().strip()
+    else:
+        og_titles = _OG_TITLE_XPATH(root)
+        title = og_titles[0].strip() if og_titles else NO_TITLE
+
+    # 擷取發布日期（找不到日期區塊時改用 article:published_time）
+    publish_date = None
+    for xpath in _DATE_XPATHS:
+        date_nodes = xpath(root)
+        if date_nodes:
+            spans = _FIRST_SPAN_XPATH(date_nodes[0])
+            if spans:
+                publish_date = spans[0].text_content().strip()
+            break
+    if publish_date is None:
+        meta_dates = _META_DATE_XPATH(root)
+        publish_date = meta_dates[0].split('T')[0] if meta_dates else NO_DATE
+
+    # 擷取文章內容
+    content_nodes = _CONTENT_XPATH(root)
+    if content_nodes:
+        content = '\n'.join(p.text_content().strip() for p in _PARAGRAPH_XPATH(content_nodes[0]))
+    else:
+        content = NO_CONTENT
+
+    return {"title": title, "publish_date": publish_date, "content": content, "url": article_url}
+
+
+def extract_article_bs4(html: str, article_url: str) -> dict:
+    """
+    原本以 BeautifulSoup（html.parser）實作的解析方式，保留作為效能比較與結果對照的基準。
+    輸入：html (str)、article_url (str)；輸出：dict（包含 title, publish_date, content, url）。
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    title_tag = soup.find('h1', class_='article-title')
+    if not title_tag:
+        og_title = soup.find('meta', property='og:title')
+        title = og_title['content'].strip() if og_title else NO_TITLE
+    else:
+        title = title_tag.text.strip()
+
+    date_div = soup.find('div', class_='flex gap-4 text-sm items-center flex-wrap')
+    if not date_div:
+        date_div = soup.find('div', class_='flex gap-2 items-center text-sm text-gray-600')
+    if date_div:
+        publish_date = date_div.find('span').text.strip()
+    else:
+        meta_date = soup.find('meta', property='article:published_time')
+        publish_date = meta_date['content'].split('T')[0] if meta_date else NO_DATE
+
+    content_div = soup.find('div', class_='article-content')
+    if content_div:
+        paragraphs = content_div.find_all('p')
+        content = '\n'.join(p.text.strip() for p in paragraphs)
+    else:
+        content = NO_CONTENT
+
+    return {"title": title, "publish_date": publish_date, "content": content, "url": article_url}
@@ -1,28 +1,63 @@
 # crawler_bnext.py
+import os
 import urllib.parse
-import time
 import random
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
-from webdriver_manager.chrome import ChromeDriverManager
 from apis.news_database import NewsDatabase
+from apis.article_cache import ArticleCache
+from models.article_extractor import extract_article, NO_TITLE, NO_CONTENT
+from models.driver_pool import get_driver_pool
+from models.http_client import get_http_session, shared_rate_limiter, HostRateLimiter, DEFAULT_TIMEOUT
+from models.readiness import PageReadiness, WaitTimer, EMPTY, CAPTCHA
+from models.search_backends import FeedSearchBackend, SeleniumSearchBackend
+from models.tracing import tracer, bind_context
+
+# 數位時代網站位址，可由環境變數 BNEXT_BASE_URL 覆寫（例如指向離線基準測試用的模擬網站）
+BNEXT_BASE_URL = os.getenv("BNEXT_BASE_URL", "https://www.bnext.com.tw").rstrip("/")
+
+RESULT_SELECTOR = '.gsc-webResult .gsc-thumbnail-inside a.gs-title'
+NO_RESULT_SELECTOR = '.gs-no-results-result'
+
+# 瀏覽器搜尋的禮貌間隔：同一主機的搜尋在所有使用者之間至少間隔數秒，取代每次固定的隨機等待
+# 可由環境變數 SEARCH_POLITENESS_INTERVAL（秒）調整
+search_rate_limiter = HostRateLimiter(min_interval=float(os.getenv("SEARCH_POLITENESS_INTERVAL", "3")), burst=1)
 
 # Bnext（數位時代）新聞爬蟲類別
 class BnextNewsCrawler:
-    def __init__(self, headless: bool = False):
+    def __init__(self, headless: bool = False, timeout=DEFAULT_TIMEOUT, rate_limiter=None, driver_pool=None,
+                 search_limiter=None, result_timeout: float = 20, search_backends=None, article_cache=None,
+                 db=None):
         # 初始化設定
         self.headless = headless
+        self._driver_pool = driver_pool  # 共用瀏覽器池（首次搜尋時才取得）
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36'
         }
-        self.db = NewsDatabase()  # 建立新聞資料庫物件
+        self.timeout = timeout
+        self.session = get_http_session()  # 共用 keep-alive 連線池（含重試與退避）
+        self.rate_limiter = rate_limiter or shared_rate_limiter  # 每個主機的請求速率限制
+        self.search_limiter = search_limiter or search_rate_limiter  # 瀏覽器搜尋的禮貌間隔
+        self.readiness = PageReadiness(RESULT_SELECTOR, empty_selector=NO_RESULT_SELECTOR)
+        self.result_timeout = result_timeout
+        self.last_search_timings = {}  # 最近一次搜尋的等待 / 工作時間統計
+        # 搜尋後端依序嘗試：先用不需瀏覽器的 RSS / Sitemap，查無結果才改用 Selenium
+        self.search_backends = search_backends or [
+            FeedSearchBackend(self.session, self.headers, self.timeout, self.rate_limiter),
+            SeleniumSearchBackend(self),
+        ]
+        self.last_search_backend = None  # 最近一次產出結果的後端名稱
+        self.article_cache = article_cache or ArticleCache()  # 文章磁碟快取（含條件式重新驗證）
+        tracer.metrics.register_collector("article_cache", self.article_cache.stats)  # 命中率等統計匯出為指標
+        self.db = db or NewsDatabase()  # 新聞資料庫物件（可由外部傳入共用實例）
+
+    @property
+    def driver_pool(self):
+        """取得瀏覽器池；未指定時使用程序內共用的池。"""
+        if self._driver_pool is None:
+            self._driver_pool = get_driver_pool(headless=self.headless)
+        return self._driver_pool
 
     def build_search_url(self, keyword: str) -> str:
         """
@@ -30,11 +65,12 @@ class BnextNewsCrawler:
         輸入: keyword (str)，輸出: 搜尋結果 URL (str)
         """
         encoded_keyword = urllib.parse.quote(keyword.strip())
-        return f"https://www.bnext.com.tw/gsearch?q={encoded_keyword}#gsc.tab=0&gsc.q={encoded_keyword}&gsc.sort="
+        return f"{BNEXT_BASE_URL}/gsearch?q={encoded_keyword}#gsc.tab=0&gsc.q={encoded_keyword}&gsc.sort="
 
     # 模擬人類行為（滑鼠移動以降低被封鎖風險）
     def simulate_human_behavior(self, driver):
         actions = ActionChains(driver)
+        actions.reset_actions()  # 重用的瀏覽器會保留上次的游標位置，先重置輸入狀態
         driver.execute_script("window.scrollTo(0, 0);")  # 滑到頁面頂部
         window_width = driver.execute_script("return window.innerWidth;")
         window_height = driver.execute_script("return window.innerHeight;")
@@ -50,50 +86,100 @@ class BnextNewsCrawler:
 
     # 搜尋新聞標題與網址
     def search_news(self, keyword: str, max_results: int = 10) -> list:
+        """
+        根據關鍵字依序嘗試各搜尋後端，回傳第一個有結果的後端所找到的新聞清單。
+        輸入: keyword (str), max_results (int)；輸出: list of dict（title, url）
+        """
+        self.last_search_backend = None
+        for backend in self.search_backends:
+            results = self._search_backend(backend, keyword, max_results)
+            if results:
+                self.last_search_backend = backend.name
+                print(f"🔎 使用 {backend.name} 後端找到 {len(results)} 筆結果")
+                return results
+        return []
+
+    def _search_backend(self, backend, keyword: str, max_results: int) -> list:
+        """以單一後端搜尋一個關鍵字（含追蹤區段）。"""
+        with tracer.span("search.backend", backend=backend.name, keyword=keyword) as span:
+            results = backend.search(keyword, max_results)
+            span.set(results=len(results))
+        return results
+
+    # 以多個關鍵字搜尋並合併結果
+    def search_keywords(self, keywords: list, max_results: int = 10) -> list:
+        """
+        依後端順序搜尋：先以不需瀏覽器的後端查詢所有關鍵字，不足 max_results 篇時才改用下一個後端，
+        且收集到足夠的不重複網址即停止，不再對剩餘關鍵字啟動瀏覽器搜尋。
+        各後端的結果輪流取各關鍵字的第 1、2…名並依 URL 去重，讓每個關鍵字都有機會出現在結果中。
+        輸入: keywords (list of str), max_results (int)；輸出: list of dict（title, url）
+        """
+        self.last_search_backend = None
+        merged, seen = [], set()
+        for backend in self.search_backends:
+            per_keyword, found = [], set(seen)
+            for keyword in keywords:
+                if len(found) >= max_results:
+                    break
+                results = self._search_backend(backend, keyword, max_results)
+                per_keyword.append(results)
+                found.update(result['url'] for result in results)
+            for rank in range(max_results):
+                for results in per_keyword:
+                    if rank < len(results) and results[rank]['url'] not in seen:
+                        seen.add(results[rank]['url'])
+                        merged.append(results[rank])
+            if any(per_keyword):
+                self.last_search_backend = backend.name
+                print(f"🔎 使用 {backend.name} 後端累計找到 {min(len(merged), max_results)} 筆結果")
+            if len(merged) >= max_results:
+                break
+        return merged[:max_results]
+
+    # 以瀏覽器渲染站內搜尋頁
+    def search_with_browser(self, keyword: str, max_results: int = 10) -> list:
         """
         根據關鍵字自動使用 Selenium 模擬搜尋，回傳包含標題與 URL 的新聞清單。
         輸入: keyword (str), max_results (int)；輸出: list of dict
         """
         search_url = self.build_search_url(keyword)
+        timer = WaitTimer()
 
-        options = Options()
-        if self.headless:
-            options.add_argument('--headless=new')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--no-sandbox')
-        options.add_argument('window-size=1920x1080')
-        options.add_argument("user-agent=" + self.headers['User-Agent'])
-
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-        driver.get(search_url)
-
-        # 模擬滑鼠行為
-        self.simulate_human_behavior(driver)
-        time.sleep(random.uniform(3, 6))
-
-        # 偵測是否出現 reCAPTCHA
-        if "我是機器人" in driver.page_source or "reCAPTCHA" in driver.page_source:
-            driver.save_screenshot("captcha_detected.png")
-            driver.quit()
-            raise Exception("⚠️ 偵測到 reCAPTCHA，請打開 captcha_detected.png 檢查！")
-
-        # 等待搜尋結果出現
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, '.gsc-webResult .gsc-thumbnail-inside a.gs-title'))
-        )
-
-        # 擷取結果連結與標題
-        result_elements = driver.find_elements(By.CSS_SELECTOR, '.gsc-webResult .gsc-thumbnail-inside a.gs-title')
-        urls = []
-        for elem in result_elements:
-            href = elem.get_attribute('href')
-            title = elem.text.strip()
-            if href and title:
-                urls.append({'title': title, 'url': href})
-            if len(urls) >= max_results:
-                break
+        # 依主機共用的禮貌間隔排隊，而非每次搜尋都固定等待
+        with tracer.span("search.politeness"):
+            timer.add("politeness", self.search_limiter.acquire(search_url))
+
+        # 從瀏覽器池借用已暖機的瀏覽器，例外時由池負責回收重建
+        with self.driver_pool.driver() as driver:
+            with tracer.span("browser.navigate"):
+                driver.get(search_url)
+
+            # 模擬滑鼠行為
+            self.simulate_human_behavior(driver)
+
+            # 輪詢至搜尋結果、無結果提示或 reCAPTCHA 出現為止
+            with timer.waiting("ready"), tracer.span("search.wait_results") as span:
+                state = self.readiness.wait(driver, timeout=self.result_timeout)
+                span.set(state=state)
 
-        driver.quit()
+            if state == CAPTCHA:
+                driver.save_screenshot("captcha_detected.png")
+                raise Exception("⚠️ 偵測到 reCAPTCHA，請打開 captcha_detected.png 檢查！")
+
+            # 擷取結果連結與標題
+            urls = []
+            if state != EMPTY:
+                result_elements = driver.find_elements(By.CSS_SELECTOR, RESULT_SELECTOR)
+                for elem in result_elements:
+                    href = elem.get_attribute('href')
+                    title = elem.text.strip()
+                    if href and title:
+                        urls.append({'title': title, 'url': href})
+                    if len(urls) >= max_results:
+                        break
+
+        self.last_search_timings = timer.report()
+        print(f"⏱️ 搜尋耗時統計：{self.last_search_timings}")
         return urls
 
     # 擷取新聞詳細內容
@@ -102,42 +188,68 @@ class BnextNewsCrawler:
         根據傳入新聞 URL，擷取新聞標題、日期、內文等詳細資訊。
         輸入: article_url (str)；輸出: dict（包含 title, publish_date, content, url）
         """
-        response = requests.get(article_url, headers=self.headers)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        with tracer.span("article.fetch", url=article_url) as span:
+            # 快取仍在有效期限內則直接回傳
+            cached = self.article_cache.get(article_url)
+            if cached and cached['fresh']:
+                self.article_cache.record_hit(cached)
+                span.set(cache="hit")
+                return cached['article']
 
-        # 擷取標題
-        title_tag = soup.find('h1', class_='article-title')
-        if not title_tag:
-            og_title = soup.find('meta', property='og:title')
-            title = og_title['content'].strip() if og_title else "無法取得標題"
-        else:
-            title = title_tag.text.strip()
-
-        # 擷取發布日期
-        date_div = soup.find('div', class_='flex gap-4 text-sm items-center flex-wrap')
-        if not date_div:
-            date_div = soup.find('div', class_='flex gap-2 items-center text-sm text-gray-600')
-        if date_div:
-            publish_date = date_div.find('span').text.strip()
-        else:
-            meta_date = soup.find('meta', property='article:published_time')
-            publish_date = meta_date['content'].split('T')[0] if meta_date else "未知日期"
-
-        # 擷取文章內容
-        content_div = soup.find('div', class_='article-content')
-        if content_div:
-            paragraphs = content_div.find_all('p')
-            content = '\n'.join(p.text.strip() for p in paragraphs)
-        else:
-            content = "無法取得內文"
+            # 快取過期時帶上 ETag / Last-Modified 發出條件式請求
+            headers = dict(self.headers)
+            if cached:
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
 
-        return {
-            "title": title,
-            "publish_date": publish_date,
-            "content": content,
-            "url": article_url
-        }
+            span.set(rate_wait=round(self.rate_limiter.acquire(article_url), 3))
+            response = self.session.get(article_url, headers=headers, timeout=self.timeout)
+            if cached and response.status_code == 304:
+                self.article_cache.touch(article_url)
+                self.article_cache.record_hit(cached, revalidated=True)
+                span.set(cache="revalidated", status=304)
+                return cached['article']
+            response.raise_for_status()
+
+            span.set(cache="miss", status=response.status_code, bytes=len(response.content))
+            article = self.parse_article_html(response.text, article_url)
+            # 解析失敗（標題或內文為預設值）不寫入快取，下次仍重新擷取
+            if article['title'] == NO_TITLE or article['content'] == NO_CONTENT:
+                span.set(cache="skip")
+                return article
+            self.article_cache.put(article_url, article,
+                                   etag=response.headers.get('ETag'),
+                                   last_modified=response.headers.get('Last-Modified'),
+                                   response_bytes=len(response.content))
+            return article
+
+    # 解析新聞頁面 HTML
+    def parse_article_html(self, html: str, article_url: str) -> dict:
+        """
+        從新聞頁面 HTML 解析標題、日期與內文（lxml + 預先編譯的 XPath）。
+        輸入: html (str), article_url (str)；輸出: dict（包含 title, publish_date, content, url）
+        """
+        return extract_article(html, article_url)
+
+    # 並行擷取多篇新聞內容
+    def fetch_articles(self, urls: list, max_concurrency: int = 5):
+        """
+        以有上限的執行緒池並行擷取多篇新聞，依完成順序逐篇產出結果；
+        擷取失敗的文章會略過並印出警告。
+        輸入: urls (list of str), max_concurrency (int)；輸出: generator of (url, dict)
+        """
+        if not urls:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(urls)))) as executor:
+            futures = {executor.submit(bind_context(self.fetch_article_content), url): url for url in urls}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    yield url, future.result()
+                except Exception as e:
+                    print(f"⚠️ 擷取失敗：{url}（{e}）")
 
     # 儲存到資料庫
     def save_to_db(self, article_data: dict, analysis: dict):
@@ -145,9 +257,21 @@ class BnextNewsCrawler:
         將文章內容與 LLM 分析結果儲存至 SQLite 資料庫。
         輸入: article_data (dict), analysis (dict)
         """
-        self.db.insert_news(article_data, analysis)
+        with tracer.span("db.write", rows=1):
+            self.db.insert_news(article_data, analysis)
         print(f"✅ 已儲存到資料庫：{article_data['title']}")
 
+    # 批次儲存到資料庫
+    def save_many_to_db(self, items: list) -> list:
+        """
+        以單一交易將多篇文章與分析結果儲存至資料庫。
+        輸入: items (list of (article_data, analysis))；輸出: list of 新聞 id
+        """
+        with tracer.span("db.write", rows=len(items)):
+            news_ids = self.db.insert_many(items)
+        print(f"✅ 已批次儲存 {len(news_ids)} 篇新聞到資料庫")
+        return news_ids
+
 
 if __name__ == '__main__':
     keyword = input("請輸入搜尋關鍵字（例如：AI 或 Agent）：").strip()
@@ -161,8 +285,8 @@ if __name__ == '__main__':
             print("⚠️ 沒有找到新聞，請嘗試其他關鍵字。")
         else:
             print(f"\n共找到 {len(search_results)} 篇新聞，開始抓取並儲存內容...\n")
-            for idx, article in enumerate(search_results, start=1):
-                detail = crawler.fetch_article_content(article['url'])
+            urls = [article['url'] for article in search_results]
+            for idx, (url, detail) in enumerate(crawler.fetch_articles(urls), start=1):
                 print(f"第 {idx} 篇已完成儲存")
                 print(f"標題：{detail['title']}")
                 print(f"日期：{detail['publish_date']}")
@@ -0,0 +1,90 @@
+# deduplicator.py
+# 近似重複新聞偵測：以 SimHash 指紋比對已儲存新聞與同批新聞，轉載或改寫幅度很小的新聞沿用既有分析，
+# 不再送交 LLM
+import os
+import threading
+from collections import OrderedDict
+from apis.news_database import simhash, hamming_distance
+from apis.analysis_result import ANALYSIS_FIELDS, is_reusable_analysis
+from models.tracing import tracer
+
+# 以站內新聞實測：同一篇轉載的距離為 0，約 1% 文字改動約為 6，同主題的不同新聞則在 18 以上
+DEFAULT_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "6"))
+
+
+# 近似重複偵測器
+class ArticleDeduplicator:
+    def __init__(self, db, max_distance: int = DEFAULT_MAX_DISTANCE, recent_items: int = 1024):
+        """
+        建構函式。
+        輸入：db (NewsDatabase) - 已儲存新聞的指紋索引、max_distance (int) - 視為重複的最大漢明距離
+             （64 位元中相異位元數，0 表示停用）、recent_items (int) - 記憶體中保留的最近分析數
+             （涵蓋已分析但尚未寫入資料庫的新聞）。
+        """
+        self.db = db
+        self.max_distance = max_distance
+        self.recent_items = recent_items
+        self._recent = OrderedDict()  # {指紋: 分析結果}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(article: dict):
+        """以標題與內文計算指紋；內文過短（例如擷取失敗）時為 None。"""
+        return simhash(f"{article.get('title', '')}\n{article.get('content', '')}")
+
+    def remember(self, article: dict, analysis: dict):
+        """記住剛完成的分析，讓尚未寫入資料庫的近似重複新聞也能沿用。"""
+        fingerprint = self.fingerprint(article)
+        if fingerprint is None or not self.max_distance or not is_reusable_analysis(analysis):
+            return
+        with self._lock:
+            self._recent[fingerprint] = {field: analysis[field] for field in ANALYSIS_FIELDS}
+            self._recent.move_to_end(fingerprint)
+            while len(self._recent) > self.recent_items:
+                self._recent.popitem(last=False)
+
+    def find(self, article: dict, fingerprint=None):
+        """
+        查詢可沿用的分析結果：先查最近的分析，再查資料庫中內容最相近的新聞。
+        輸入：article (dict)、fingerprint (int) - 已計算的指紋（可省略）；
+        輸出：dict（summary, sentiment, ner）或 None。
+        """
+        fingerprint = self.fingerprint(article) if fingerprint is None else fingerprint
+        if fingerprint is None or not self.max_distance:
+            return None
+        with self._lock:
+            for stored, analysis in self._recent.items():
+                if hamming_distance(fingerprint, stored) <= self.max_distance:
+                    return dict(analysis)
+        match = self.db.find_near_duplicate(fingerprint, self.max_distance)
+        if match and is_reusable_analysis(match):
+            print(f"♻️ 近似重複新聞，沿用既有分析：{article.get('url')} ≈ {match['url']}（距離 {match['distance']}）")
+            return {field: match[field] for field in ANALYSIS_FIELDS}
+        return None
+
+    def plan(self, articles: list):
+        """
+        規劃一批新聞的分析工作：與已儲存新聞近似者直接沿用分析，同批中彼此近似者只分析第一篇。
+        輸入：articles (list of dict)；
+        輸出：(analyses, duplicate_of)，analyses[i] 為可沿用的分析或 None，
+             duplicate_of[i] 為同批中代表新聞的索引（需等待該篇分析完成）或 None。
+        """
+        analyses, duplicate_of = [None] * len(articles), [None] * len(articles)
+        if not self.max_distance:
+            return analyses, duplicate_of
+        with tracer.span("dedup.plan", articles=len(articles)) as span:
+            representatives = []  # [(索引, 指紋)]：需要送交 LLM 的新聞
+            for i, article in enumerate(articles):
+                fingerprint = self.fingerprint(article)
+                analyses[i] = self.find(article, fingerprint)
+                if analyses[i] is not None or fingerprint is None:
+                    continue
+                for j, other in representatives:
+                    if hamming_distance(fingerprint, other) <= self.max_distance:
+                        duplicate_of[i] = j
+                        break
+                else:
+                    representatives.append((i, fingerprint))
+            span.set(reused=sum(analysis is not None for analysis in analyses),
+                     batch_duplicates=sum(j is not None for j in duplicate_of))
+        return analyses, duplicate_of
@@ -0,0 +1,217 @@
+# driver_pool.py
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+from models.tracing import tracer
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36'
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def resolve_driver_path() -> str:
+    """
+    解析 ChromeDriver 執行檔路徑，整個程序只解析一次。
+    優先使用環境變數 CHROMEDRIVER_PATH，否則透過 webdriver-manager 下載。
+    輸出：driver 路徑 (str)。
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = os.getenv("CHROMEDRIVER_PATH") or ChromeDriverManager().install()
+        return _driver_path
+
+
+def build_chrome_options(headless: bool, user_agent: str = DEFAULT_USER_AGENT) -> Options:
+    """
+    建立 Chrome 啟動參數。
+    輸入：headless (bool)、user_agent (str)；輸出：Options。
+    """
+    options = Options()
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('window-size=1920x1080')
+    options.add_argument("user-agent=" + user_agent)
+    return options
+
+
+# 常駐 WebDriver 池：保持 N 個暖機中的瀏覽器，使用 K 次或發生錯誤後回收重建
+class WebDriverPool:
+    def __init__(self, size: int = 2, max_uses: int = 20, headless: bool = True,
+                 user_agent: str = DEFAULT_USER_AGENT):
+        """
+        建構函式，設定池大小與單一瀏覽器的最大使用次數（driver 路徑與瀏覽器皆於首次啟動時才解析、建立）。
+        輸入：size (int)、max_uses (int)、headless (bool)、user_agent (str)。
+        """
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.headless = headless
+        self.user_agent = user_agent
+        self._idle = []        # 閒置中的瀏覽器
+        self._uses = {}        # 每個瀏覽器已使用次數（以 id 為鍵）
+        self._total = 0        # 已建立（閒置 + 借出）的瀏覽器數
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _launch(self):
+        """啟動一個新的 Chrome 瀏覽器。"""
+        options = build_chrome_options(self.headless, self.user_agent)
+        with tracer.span("browser.launch", headless=self.headless):
+            return webdriver.Chrome(service=Service(resolve_driver_path()), options=options)
+
+    @staticmethod
+    def _quit(driver):
+        """關閉瀏覽器，忽略已崩潰造成的錯誤。"""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_alive(driver) -> bool:
+        """檢查瀏覽器連線是否仍可用。"""
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def warm(self, count: int = None):
+        """
+        預先啟動瀏覽器至指定數量（預設為池大小），避免首次查詢等待啟動。
+        輸入：count (int)；無輸出。
+        """
+        target = min(self.size, count or self.size)
+        while True:
+            with self._cond:
+                if self._closed or self._total >= target:
+                    return
+                self._total += 1
+            try:
+                driver = self._launch()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._uses[id(driver)] = 0
+                self._idle.append(driver)
+                self._cond.notify()
+
+    def checkout(self, timeout: float = None):
+        """
+        借出一個可用的瀏覽器；池已滿時等待其他使用者歸還。
+        輸入：timeout (float) - 最長等待秒數；輸出：WebDriver。
+        """
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("WebDriverPool 已關閉")
+                if not self._idle and self._total >= self.size:
+                    if not self._cond.wait_for(lambda: self._idle or self._total < self.size or self._closed,
+                                               timeout=timeout):
+                        raise TimeoutError("等待可用瀏覽器逾時")
+                    continue
+                driver = self._idle.pop() if self._idle else None
+                if driver is None:
+                    self._total += 1
+
+            if driver is None:
+                try:
+                    driver = self._launch()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+                self._uses[id(driver)] = 0
+                return driver
+
+            # 閒置期間瀏覽器可能已崩潰，失效則丟棄後重試
+            if self._is_alive(driver):
+                return driver
+            self._discard(driver)
+
+    def checkin(self, driver, broken: bool = False):
+        """
+        歸還瀏覽器；若已損壞或達使用上限則關閉回收。
+        輸入：driver (WebDriver)、broken (bool)；無輸出。
+        """
+        with self._cond:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+            if not broken and uses < self.max_uses and not self._closed:
+                self._idle.append(driver)
+                self._cond.notify()
+                return
+        self._discard(driver)
+
+    def _discard(self, driver):
+        """關閉並移除瀏覽器，釋出池中的名額。"""
+        self._quit(driver)
+        with self._cond:
+            self._uses.pop(id(driver), None)
+            self._total -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def driver(self, timeout: float = None):
+        """
+        以 with 語法借用瀏覽器，使用期間發生例外時視為損壞並回收。
+        輸入：timeout (float)；輸出：WebDriver。
+        """
+        with tracer.span("browser.checkout"):
+            driver = self.checkout(timeout=timeout)
+        broken = False
+        try:
+            yield driver
+        except BaseException:
+            broken = True
+            raise
+        finally:
+            self.checkin(driver, broken=broken)
+
+    def close(self):
+        """關閉池中所有閒置瀏覽器，並讓借出中的瀏覽器於歸還時關閉。"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver in idle:
+            self._discard(driver)
+
+
+def get_driver_pool(headless: bool = True, size: int = None, max_uses: int = None) -> WebDriverPool:
+    """
+    取得程序內共用的 WebDriverPool（依 headless 區分），首次呼叫時建立。
+    池大小與使用上限可由環境變數 DRIVER_POOL_SIZE、DRIVER_POOL_MAX_USES 設定。
+    輸入：headless (bool)、size (int)、max_uses (int)；輸出：WebDriverPool。
+    """
+    with _pools_lock:
+        pool = _pools.get(headless)
+        if pool is None:
+            pool = WebDriverPool(
+                size=size or int(os.getenv("DRIVER_POOL_SIZE", "2")),
+                max_uses=max_uses or int(os.getenv("DRIVER_POOL_MAX_USES", "20")),
+                headless=headless,
+            )
+            _pools[headless] = pool
+        return pool
+
+
+@atexit.register
+def _close_all_pools():
+    # 程序結束時關閉所有瀏覽器，避免殘留 Chrome 行程
+    for pool in list(_pools.values()):
+        pool.close()
@@ -0,0 +1,132 @@
+# embedding.py
+# 文字向量化：預設為純 CPU、無需下載模型的特徵雜湊向量（可離線測試），
+# 亦可改用本機 sentence-transformers 模型或 Azure OpenAI embedding
+import hashlib
+import math
+import os
+import re
+from collections import Counter
+import numpy as np
+
+# 英數字詞（小寫）與中文字的連續兩字
+_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-+][a-z0-9]+)*")
+_CJK_RUN_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+# 虛詞視為斷詞點，不產生跨詞的二字詞（例如「電的」「的新」）
+_FUNCTION_CHARS = re.compile("[的了是在與及或也嗎呢吧之這那著被把而很還]")
+# 問題與新聞中常見、不代表主題的二字詞，不列入特徵（否則短問題的相似度多半來自這些詞）
+STOP_BIGRAMS = frozenset({
+    "最近", "近期", "最新", "目前", "今天", "今年", "日前", "如何", "怎麼", "怎樣", "什麼", "為何", "哪些",
+    "請問", "關於", "相關", "新聞", "消息", "報導", "輿情", "情況", "狀況", "看法", "評價", "表示", "指出",
+})
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """將每列向量正規化為單位長度（零向量維持為零），之後的內積即為餘弦相似度。"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+# 特徵雜湊向量：英數字詞與中文二字詞以雜湊決定維度與正負號，詞頻取對數
+class HashingEmbedder:
+    default_min_score = 0.1  # 短關鍵字對長文件的相似度偏低，門檻需相應放寬；是否相關另以 shares_evidence 確認
+
+    def __init__(self, dim: int = 512):
+        """
+        建構函式。
+        輸入：dim (int) - 向量維度。
+        """
+        self.dim = dim
+        self.name = f"hashing-v2-{dim}"
+
+    @staticmethod
+    def features(text: str) -> Counter:
+        """
+        擷取文字特徵：英數字詞，以及中文連續字串（於虛詞處斷開）中的每個二字詞（單一中文字時取該字），
+        略過 STOP_BIGRAMS 中的常見二字詞。
+        輸入：text (str)；輸出：Counter（特徵: 次數）。
+        """
+        text = (text or "").casefold()
+        features = Counter(_WORD_PATTERN.findall(text))
+        for run in _CJK_RUN_PATTERN.findall(_FUNCTION_CHARS.sub(" ", text)):
+            features.update([run] if len(run) == 1 else (run[i:i + 2] for i in range(len(run) - 1)))
+        for stop in STOP_BIGRAMS & features.keys():
+            del features[stop]
+        return features
+
+    def shares_evidence(self, keywords: list, text: str) -> bool:
+        """
+        確認文件完整含有至少一個關鍵字的所有特徵；雜湊向量的維度碰撞或單一共同二字詞
+        都可能讓無關文件得到不低的相似度。
+        輸入：keywords (list of str)、text (str)；輸出：bool。
+        """
+        features = self.features(text).keys()
+        return any(wanted and wanted <= features for wanted in (self.features(kw).keys() for kw in keywords))
+
+    def embed(self, texts: list) -> np.ndarray:
+        """
+        將多段文字轉為向量。
+        輸入：texts (list of str)；輸出：np.ndarray（len(texts) x dim，float32，單位長度）。
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self.features(text).items():
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                sign = 1.0 if digest >> 63 else -1.0
+                vectors[row, digest % self.dim] += sign * (1.0 + math.log(count))
+        return _normalize_rows(vectors)
+
+
+# 本機 sentence-transformers 模型（需另行安裝套件與下載模型，可純 CPU 執行）
+class SentenceTransformerEmbedder:
+    default_min_score = 0.45
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device=os.getenv("EMBEDDING_DEVICE", "cpu"))
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = "st-" + re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = self.model.encode(list(texts), batch_size=32, show_progress_bar=False)
+        return _normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+
+# Azure OpenAI embedding（使用 .env 中的 Embedding_API_VERSION）
+class AzureEmbedder:
+    default_min_score = 0.75
+
+    def __init__(self, deployment: str):
+        from dotenv import load_dotenv
+        from langchain_openai import AzureOpenAIEmbeddings
+        load_dotenv()  # 與 LLM 相同，只在實際使用 Azure 時才載入 .env
+        self.client = AzureOpenAIEmbeddings(
+            azure_deployment=deployment,
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_version=os.getenv("Embedding_API_VERSION"),
+        )
+        self.dim = len(self.client.embed_query("test"))
+        self.name = "azure-" + re.sub(r"[^A-Za-z0-9_.-]+", "_", deployment)
+
+    def embed(self, texts: list) -> np.ndarray:
+        return _normalize_rows(np.asarray(self.client.embed_documents(list(texts)), dtype=np.float32))
+
+
+def get_embedder():
+    """
+    依環境變數建立向量化模型：
+    EMBEDDING_BACKEND=hashing（預設）| sentence-transformers | azure，
+    EMBEDDING_MODEL 為 sentence-transformers 模型名稱或 Azure 部署名稱。
+    無法載入時改用特徵雜湊向量。
+    輸出：具有 name、dim、default_min_score 與 embed(texts) 的物件。
+    """
+    backend = os.getenv("EMBEDDING_BACKEND", "hashing").strip().lower()
+    model = os.getenv("EMBEDDING_MODEL", "").strip()
+    try:
+        if backend == "sentence-transformers":
+            return SentenceTransformerEmbedder(model or "paraphrase-multilingual-MiniLM-L12-v2")
+        if backend == "azure":
+            return AzureEmbedder(model or os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-3-small"))
+    except Exception as e:
+        print(f"⚠️ 無法載入 {backend} 向量模型，改用特徵雜湊向量：{e}")
+    return HashingEmbedder(int(os.getenv("EMBEDDING_DIM", "512")))
@@ -0,0 +1,77 @@
+# http_client.py
+import threading
+import time
+import urllib.parse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (5, 20)  # (連線逾時, 讀取逾時) 秒
+DEFAULT_POOL_SIZE = 10
+
+_session = None
+_session_lock = threading.Lock()
+
+
+# 每個主機的請求速率限制器（GCRA 漏桶演算法，跨請求、跨執行緒共用）
+class HostRateLimiter:
+    def __init__(self, min_interval: float = 0.2, burst: int = 5):
+        """
+        建構函式，設定同一主機的平均請求間隔與可瞬間突發的請求數。
+        輸入：min_interval (float) - 秒數、burst (int) - 突發上限。
+        """
+        self.min_interval = min_interval
+        self.burst = max(1, burst)
+        self._tat = {}  # 各主機的理論到達時間 (theoretical arrival time)
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str) -> float:
+        """
+        取得該 URL 主機的請求時段，必要時等待至可請求為止。
+        輸入：url (str)；輸出：實際等待秒數 (float)。
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat.get(host, now), now)
+            wait = max(0.0, tat - (self.burst - 1) * self.min_interval - now)
+            self._tat[host] = tat + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def build_session(pool_size: int = DEFAULT_POOL_SIZE, retries: int = 3,
+                  backoff_factor: float = 0.5) -> requests.Session:
+    """
+    建立具 keep-alive 連線池與自動重試（指數退避）的 requests Session。
+    輸入：pool_size (int)、retries (int)、backoff_factor (float)；輸出：requests.Session。
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """
+    取得程序內共用的 HTTP Session（首次呼叫時建立）。
+    輸出：requests.Session。
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+
+# 程序內共用的主機速率限制器，確保多個爬蟲實例對同一網站的總請求頻率受控
+shared_rate_limiter = HostRateLimiter()
@@ -0,0 +1,260 @@
+# ingest_worker.py
+# 背景批次匯入：依關注清單預先爬取、去重、分析並寫入資料庫，支援中斷後續跑
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from apis.analysis_result import is_reusable_analysis
+from models.crawler_bnext import BnextNewsCrawler
+from models.deduplicator import ArticleDeduplicator
+from models.llm_helper import LLMHelper
+from models.search_backends import FeedSearchBackend
+from models.vector_index import VectorIndex
+from models.tracing import tracer, bind_context, start_metrics_server
+
+_DONE = object()  # 工作佇列結束標記
+
+
+# 批次匯入工作器
+class IngestWorker:
+    def __init__(self, keywords: list, feeds: list, crawler=None, llm_helper=None, deduplicator=None,
+                 vector_index=None, max_results: int = 10, fetch_workers: int = 4, llm_workers: int = 2,
+                 batch_size: int = 10, checkpoint_path: str = "./data/ingest_checkpoint.json"):
+        """
+        建構函式。
+        輸入：keywords (list) - 關注關鍵字、feeds (list) - 分類 RSS / Sitemap 網址、
+             deduplicator (ArticleDeduplicator) - 近似重複偵測（預設使用爬蟲的資料庫）、
+             vector_index (VectorIndex) - 寫入後增量更新的向量索引（預設使用爬蟲的資料庫）、
+             max_results (int) - 每個來源最多取幾篇、fetch_workers / llm_workers (int) - 並行數、
+             batch_size (int) - 每次寫入資料庫的篇數、checkpoint_path (str) - 進度檔路徑。
+        """
+        self.keywords = keywords
+        self.feeds = feeds
+        self.crawler = crawler or BnextNewsCrawler(headless=True)
+        self.llm_helper = llm_helper or LLMHelper()
+        self.deduplicator = deduplicator or ArticleDeduplicator(self.crawler.db)
+        self.vector_index = vector_index or VectorIndex(self.crawler.db)
+        self.max_results = max_results
+        self.fetch_workers = fetch_workers
+        self.llm_workers = llm_workers
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint = self.load_checkpoint()
+
+    # ---------- 進度檔 ----------
+    def load_checkpoint(self) -> dict:
+        """
+        讀取進度檔；不存在時回傳新的進度。
+        輸出：dict（completed_sources: 已完成探索的來源、pending_urls: 待處理的 URL）。
+        """
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            print(f"♻️ 從進度檔續跑：{len(checkpoint.get('pending_urls', []))} 篇待處理")
+            return checkpoint
+        return {"completed_sources": [], "pending_urls": []}
+
+    def save_checkpoint(self):
+        """以暫存檔 + 原子替換寫入進度檔，避免中斷時留下損毀的檔案。"""
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self):
+        """本輪完成後清除已完成的來源；分析失敗而留下的 URL 保留至下輪重試，沒有時刪除進度檔。"""
+        self.checkpoint = {"completed_sources": [], "pending_urls": self.checkpoint["pending_urls"]}
+        if self.checkpoint["pending_urls"]:
+            self.save_checkpoint()
+        elif os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    # ---------- 探索 ----------
+    def _discover_source(self, source: str) -> list:
+        """依來源類型（關鍵字或訂閱網址）取得候選文章清單。"""
+        if source.startswith("feed:"):
+            backend = FeedSearchBackend(self.crawler.session, self.crawler.headers, self.crawler.timeout,
+                                        self.crawler.rate_limiter, feed_urls=[source[len("feed:"):]])
+            return backend.latest(self.max_results)
+        return self.crawler.search_news(source[len("keyword:"):], max_results=self.max_results)
+
+    def discover(self):
+        """
+        逐一探索關注清單中尚未完成的來源，將資料庫中不存在的 URL 加入待處理清單；
+        每完成一個來源即寫入進度檔。
+        """
+        sources = [f"keyword:{kw}" for kw in self.keywords] + [f"feed:{url}" for url in self.feeds]
+        for source in sources:
+            if source in self.checkpoint["completed_sources"]:
+                continue
+            try:
+                results = self._discover_source(source)
+            except Exception as e:
+                print(f"⚠️ 探索失敗：{source}（{e}）")
+                continue
+
+            urls = [article["url"] for article in results]
+            known = self.crawler.db.existing_urls(urls) | set(self.checkpoint["pending_urls"])
+            new_urls = [url for url in dict.fromkeys(urls) if url not in known]
+            self.checkpoint["pending_urls"].extend(new_urls)
+            self.checkpoint["completed_sources"].append(source)
+            self.save_checkpoint()
+            print(f"🔎 {source}：找到 {len(urls)} 篇，新文章 {len(new_urls)} 篇")
+
+    # ---------- 擷取、分析、寫入 ----------
+    def _analyze_loop(self, work: queue.Queue, results: queue.Queue):
+        """
+        分析工作執行緒：從工作佇列取文章送交 LLM（近似重複的新聞沿用既有分析），結果放入結果佇列；
+        分析發生例外時分析結果為 None。
+        """
+        while True:
+            item = work.get()
+            if item is _DONE:
+                results.put(_DONE)
+                return
+            url, article = item
+            try:
+                analysis = self.deduplicator.find(article)
+                if analysis is None:
+                    analysis = self.llm_helper.analyze_article(article["content"])
+                    self.deduplicator.remember(article, analysis)
+                results.put((url, article, analysis))
+            except Exception as e:
+                print(f"⚠️ 分析失敗：{url}（{e}）")
+                results.put((url, article, None))
+
+    def _feed_work(self, urls: list, work: queue.Queue, results: queue.Queue):
+        """
+        擷取執行緒：並行擷取文章並放入工作佇列（佇列滿時自動等待，形成背壓）。
+        擷取失敗的結果會在結束標記之前送出，確保主迴圈收齊所有 URL；擷取過程本身中斷時，
+        未擷取的 URL 不送出（留在待處理清單），結束標記則一律送出，避免分析執行緒與主迴圈永久等待。
+        """
+        fetched, completed = set(), False
+        try:
+            for url, article in self.crawler.fetch_articles(urls, max_concurrency=self.fetch_workers):
+                fetched.add(url)
+                work.put((url, article))
+            completed = True
+        finally:
+            if completed:
+                for url in urls:
+                    if url not in fetched:
+                        results.put((url, None, None))  # 擷取失敗，視為已處理以免無限重試
+            for _ in range(self.llm_workers):
+                work.put(_DONE)
+
+    def process_pending(self) -> int:
+        """
+        處理待處理清單：擷取 → 分析（工作佇列 + 多個分析執行緒）→ 批次寫入資料庫，
+        每次寫入後更新進度檔。分析失敗（例外或預設結果）的文章不寫入，留在待處理清單於下輪重試。
+        輸出：成功寫入的篇數 (int)。
+        """
+        pending = list(self.checkpoint["pending_urls"])
+        if not pending:
+            return 0
+
+        work = queue.Queue(maxsize=self.llm_workers * 2)
+        results = queue.Queue()
+        threads = [threading.Thread(target=bind_context(self._feed_work), args=(pending, work, results), daemon=True)]
+        threads += [threading.Thread(target=bind_context(self._analyze_loop), args=(work, results), daemon=True)
+                    for _ in range(self.llm_workers)]
+        for thread in threads:
+            thread.start()
+
+        stored, batch, handled, retry = 0, [], [], 0
+        finished_workers = 0
+        while finished_workers < self.llm_workers:
+            item = results.get()
+            if item is _DONE:
+                finished_workers += 1
+            else:
+                url, article, analysis = item
+                if article is None:
+                    handled.append(url)
+                elif analysis is not None and is_reusable_analysis(analysis):
+                    handled.append(url)
+                    batch.append((article, analysis))
+                else:
+                    retry += 1
+            if len(batch) >= self.batch_size or (finished_workers == self.llm_workers and handled):
+                stored += self._commit(batch, handled)
+                batch, handled = [], []
+        if retry:
+            print(f"⚠️ {retry} 篇分析失敗，留待下輪重試")
+        return stored
+
+    def _commit(self, batch: list, handled: list) -> int:
+        """寫入一批分析結果並加入向量索引，再從待處理清單移除已處理的 URL。"""
+        if batch:
+            self.vector_index.index_saved(self.crawler.save_many_to_db(batch), batch)
+        done = set(handled)
+        self.checkpoint["pending_urls"] = [url for url in self.checkpoint["pending_urls"] if url not in done]
+        self.save_checkpoint()
+        return len(batch)
+
+    def run_once(self) -> int:
+        """
+        執行一輪完整匯入（探索 → 處理），完成後清除進度檔。
+        輸出：本輪寫入的篇數 (int)。
+        """
+        start = time.perf_counter()
+        with tracer.span("ingest.run", sources=len(self.keywords) + len(self.feeds)) as span:
+            self.vector_index.backfill()
+            self.discover()
+            stored = self.process_pending()
+            span.set(stored=stored)
+        self.clear_checkpoint()
+        print(f"✅ 本輪完成：寫入 {stored} 篇，耗時 {time.perf_counter() - start:.1f} 秒")
+        return stored
+
+
+def load_watchlist(path: str):
+    """
+    讀取關注清單檔案：每行一個關鍵字，或以 http 開頭的分類 RSS / Sitemap 網址；# 開頭為註解。
+    輸入：path (str)；輸出：(keywords, feeds)。
+    """
+    keywords, feeds = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            (feeds if line.startswith(("http://", "https://")) else keywords).append(line)
+    return keywords, feeds
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="依關注清單預先爬取並分析數位時代新聞")
+    parser.add_argument("--keywords", default="", help="逗號分隔的關注關鍵字，例如：AI,NVIDIA")
+    parser.add_argument("--feeds", default="", help="逗號分隔的分類 RSS / Sitemap 網址")
+    parser.add_argument("--watchlist", help="關注清單檔案（每行一個關鍵字或網址）")
+    parser.add_argument("--max-results", type=int, default=10, help="每個來源最多取幾篇")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="並行擷取數")
+    parser.add_argument("--llm-workers", type=int, default=2, help="並行 LLM 分析數")
+    parser.add_argument("--batch-size", type=int, default=10, help="每次寫入資料庫的篇數")
+    parser.add_argument("--checkpoint", default="./data/ingest_checkpoint.json", help="進度檔路徑")
+    parser.add_argument("--interval", type=float, default=0, help="重複執行間隔秒數（0 表示只執行一次）")
+    parser.add_argument("--metrics-port", type=int, default=0, help="Prometheus 指標端點的埠號（0 表示不啟動）")
+    args = parser.parse_args()
+
+    keywords = [kw.strip() for kw in args.keywords.split(",") if kw.strip()]
+    feeds = [url.strip() for url in args.feeds.split(",") if url.strip()]
+    if args.watchlist:
+        file_keywords, file_feeds = load_watchlist(args.watchlist)
+        keywords += file_keywords
+        feeds += file_feeds
+    if not keywords and not feeds:
+        parser.error("請至少提供 --keywords、--feeds 或 --watchlist 其中之一")
+
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    worker = IngestWorker(keywords, feeds, max_results=args.max_results,
+                          fetch_workers=args.fetch_workers, llm_workers=args.llm_workers,
+                          batch_size=args.batch_size, checkpoint_path=args.checkpoint)
+    while True:
+        worker.run_once()
+        if args.interval <= 0:
+            break
+        time.sleep(args.interval)
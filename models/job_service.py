@@ -0,0 +1,271 @@
+# job_service.py
+# 程序內搜尋工作服務：在背景執行緒執行「問題理解 → 檢索已儲存新聞 → 搜尋 → 擷取 → 分析 → 儲存 → 總結」，
+# 以事件串流回報進度；相同問題進行中時共用同一個工作，所有使用者共用一組爬蟲與 LLM
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from models.crawler_bnext import BnextNewsCrawler
+from models.deduplicator import ArticleDeduplicator
+from models.vector_index import NewsRetriever
+from models.llm_helper import LLMHelper
+from models.query_cache import normalize_query
+from models.tracing import tracer, bind_context
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+# 單一搜尋工作：事件只會追加，前端以游標讀取新事件
+class SearchJob:
+    def __init__(self, query: str, key: tuple):
+        self.id = uuid.uuid4().hex[:12]
+        self.query = query
+        self.key = key
+        self.status = QUEUED
+        self.trace_id = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.events = []  # [(類型, 內容), ...]
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def emit(self, kind: str, payload=None):
+        """追加一個事件並喚醒等待中的讀取者。"""
+        with self._cond:
+            self.events.append((kind, payload))
+            self._cond.notify_all()
+
+    def finish(self, status: str):
+        """結束工作（DONE 或 FAILED）。"""
+        with self._cond:
+            self.status = status
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def wait_events(self, cursor: int, timeout: float = 0.5):
+        """
+        取得游標之後的新事件；尚無新事件時最多等待 timeout 秒。
+        輸入：cursor (int) - 已讀取的事件數、timeout (float)；
+        輸出：(新事件 list, 新游標 int, 工作是否已結束 bool)。
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.events) > cursor or self.finished, timeout=timeout)
+            events = self.events[cursor:]
+            return events, cursor + len(events), self.finished
+
+
+# 搜尋工作服務
+class JobService:
+    def __init__(self, crawler=None, llm_helper=None, deduplicator=None, retriever=None, max_workers: int = None,
+                 max_results: int = 3, reuse_seconds: float = 120, retention_seconds: float = 1800):
+        """
+        建構函式。
+        輸入：crawler (BnextNewsCrawler)、llm_helper (LLMHelper) - 所有工作共用、
+             deduplicator (ArticleDeduplicator) - 近似重複偵測（預設使用爬蟲的資料庫）、
+             retriever (NewsRetriever) - 已儲存新聞的向量檢索（預設使用爬蟲的資料庫）、
+             max_workers (int) - 同時執行的工作數（預設讀取環境變數 JOB_WORKERS）、
+             max_results (int) - 每次搜尋的新聞篇數、
+             reuse_seconds (float) - 完成後仍可被相同問題直接沿用的秒數、
+             retention_seconds (float) - 已結束工作保留供查詢的秒數。
+        """
+        self.crawler = crawler or BnextNewsCrawler(headless=True)
+        self.llm_helper = llm_helper or LLMHelper()
+        self.deduplicator = deduplicator or ArticleDeduplicator(self.crawler.db)
+        self.retriever = retriever or NewsRetriever(self.crawler.db)
+        self.max_results = max_results
+        self.reuse_seconds = reuse_seconds
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or int(os.getenv("JOB_WORKERS", "4")),
+                                            thread_name_prefix="search-job")
+        self._jobs = {}    # {job_id: SearchJob}
+        self._by_key = {}  # {去重鍵: SearchJob}（最近一次相同問題的工作）
+        self._lock = threading.Lock()
+        # 背景補建既有新聞的向量（不阻塞服務啟動；補建期間檢索結果可能較少）
+        threading.Thread(target=self.retriever.index.backfill, daemon=True).start()
+
+    def submit(self, query: str) -> SearchJob:
+        """
+        提交搜尋工作；相同（正規化後）問題正在進行或剛完成時直接回傳既有工作。
+        輸入：query (str)；輸出：SearchJob。
+        """
+        key = (normalize_query(query), self.max_results)
+        with self._lock:
+            self._prune()
+            job = self._by_key.get(key)
+            if job and job.status != FAILED and (
+                    not job.finished or time.time() - job.finished_at < self.reuse_seconds):
+                print(f"🔁 共用進行中或剛完成的搜尋工作：{job.id}（{query}）")
+                return job
+
+            job = SearchJob(query, key)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+        job.emit("status", "⏳ 排隊中...")
+        self._executor.submit(bind_context(self._run), job)
+        return job
+
+    def get(self, job_id: str):
+        """依 id 取得工作（已過保留期限時回傳 None）。"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        """移除超過保留期限的已結束工作（呼叫端需持有鎖）。"""
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and now - job.finished_at > self.retention_seconds]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+    def _run(self, job: SearchJob):
+        """背景執行緒：執行完整流程，任何例外都記錄為失敗事件。"""
+        job.status = RUNNING
+        status = DONE
+        with tracer.span("search.request", query=job.query, job_id=job.id) as root:
+            job.trace_id = root.trace_id
+            try:
+                self._pipeline(job)
+            except Exception as e:
+                print(f"⚠️ 搜尋工作失敗：{job.id}（{e}）")
+                root.set(failed=f"{type(e).__name__}: {e}")
+                job.emit("notice", ("error", f"❗ 搜尋失敗：{e}"))
+                status = FAILED
+        # 追蹤區段結束後才標記完成，前端讀到完成狀態時即可取得完整追蹤
+        job.finish(status)
+
+    def _pipeline(self, job: SearchJob):
+        """
+        搜尋流程本體，依序發出事件：
+        status（進度文字）、notice（(層級, 訊息)）、articles（新聞清單）、
+        analysis（(索引, 分析結果, 是否完成)）、summary_start、summary（總結文字片段）。
+        """
+        crawler, llm_helper = self.crawler, self.llm_helper
+
+        # 以單次 LLM 呼叫驗證問題並解析出搜尋用的關鍵字
+        job.emit("status", "🔎 驗證並解析關鍵字中...")
+        understanding = llm_helper.understand_query(job.query)
+        if not understanding["is_valid"]:
+            job.emit("notice", ("warning", "⚠️ 此問題不適合輿情分析，請換個描述"))
+            return
+        keywords = understanding["keywords"]
+
+        # 先從已儲存且已分析的新聞檢索，數量不足或不夠新時才即時搜尋補足
+        job.emit("status", "📚 從已儲存新聞檢索相關內容...")
+        hits, crawl_limit = self.retriever.retrieve(keywords, self.max_results)
+        if hits:
+            job.emit("notice", ("info", f"📚 已儲存新聞中找到 {len(hits)} 篇相關新聞"))
+
+        new_details = []
+        if crawl_limit:
+            # 只抓取夠新新聞的缺額
+            new_details = self._crawl(job, keywords, known={article['url'] for article, *_ in hits},
+                                      limit=crawl_limit)
+        # 夠新的新聞全數保留；過舊的新聞只用來補足爬取不足的名額，總篇數不超過 max_results
+        spare = self.max_results - len(new_details) - sum(fresh for *_, fresh in hits)
+        stored_details, analyses = [], []
+        for article, analysis, _, fresh in hits:
+            if fresh or spare > 0:
+                stored_details.append(article)
+                analyses.append(analysis)
+                spare -= not fresh
+        article_details = stored_details + new_details
+        if not article_details:
+            job.emit("notice", ("error", "❗ 沒有找到相關新聞，請嘗試其他關鍵字"))
+            return
+        job.emit("articles", article_details)
+        for i, analysis in enumerate(analyses):
+            job.emit("analysis", (i, analysis, True))
+
+        # 新抓取的新聞：分析後以單一交易儲存並加入向量索引
+        if new_details:
+            new_analyses = self._analyze(job, new_details, offset=len(stored_details))
+            items = list(zip(new_details, new_analyses))
+            self.retriever.index.index_saved(crawler.save_many_to_db(items), items)
+            analyses += new_analyses
+
+        # 綜合產出輿情摘要（逐段發出）
+        job.emit("status", "📢 產生綜合輿情摘要...")
+        job.emit("summary_start")
+        summary = []
+        for text in llm_helper.stream_summary(article_details, analyses):
+            summary.append(text)
+            job.emit("summary", text)
+        if "".join(summary).startswith("查詢失敗"):
+            job.emit("notice", ("warning", "⚠️ 無法生成摘要，請稍後再試。"))
+
+    def _crawl(self, job: SearchJob, keywords: list, known: set, limit: int) -> list:
+        """
+        以關鍵字即時搜尋並擷取新聞（略過已由檢索取得的網址），依搜尋結果原始順序排列。
+        輸出：list of article dict（可能為空）。
+        """
+        job.emit("status", f"🔎 正在搜尋「{'、'.join(keywords)}」新聞...")
+        articles = self.crawler.search_keywords(keywords, max_results=self.max_results + len(known))
+        urls = [article['url'] for article in articles if article['url'] not in known][:limit]
+        if not urls:
+            return []
+
+        # 並行擷取的完成順序不固定，依原始順序重新排列
+        job.emit("status", "🔎 抓取相關新聞...")
+        fetched = dict(self.crawler.fetch_articles(urls, max_concurrency=len(urls)))
+        details = [fetched[url] for url in urls if url in fetched]
+        if details:
+            job.emit("notice", ("success", f"✅ 成功抓取 {len(details)} 篇新聞"))
+        else:
+            job.emit("notice", ("warning", "⚠️ 新聞內容擷取失敗，請稍後再試"))
+        return details
+
+    def _analyze(self, job: SearchJob, details: list, offset: int) -> list:
+        """
+        分析新抓取的新聞：近似重複者沿用既有分析，同批中彼此近似者只分析代表的一篇，
+        其餘並行串流分析，欄位一完成即發出事件（事件索引加上 offset）。
+        輸出：list of analysis dict。
+        """
+        analyses, duplicate_of = self.deduplicator.plan(details)
+        for i, analysis in enumerate(analyses):
+            if analysis is not None:
+                job.emit("analysis", (offset + i, analysis, True))
+        todo = [i for i, analysis in enumerate(analyses) if analysis is None and duplicate_of[i] is None]
+        skipped = len(details) - len(todo)
+        if skipped:
+            job.emit("notice", ("info", f"♻️ {skipped} 篇為近似重複新聞，沿用既有分析"))
+
+        job.emit("status", f"🧠 正在分析 {len(todo)} 篇新聞...")
+        contents = [details[i]['content'] for i in todo]
+        for k, analysis, done in self.llm_helper.stream_analyze_articles(contents, max_in_flight=len(contents)):
+            i = todo[k]
+            if done:
+                self.deduplicator.remember(details[i], analysis)
+            for j in [i] + [j for j, rep in enumerate(duplicate_of) if rep == i]:
+                if done:
+                    analyses[j] = analysis
+                job.emit("analysis", (offset + j, analysis, done))
+        return analyses
+
+    def shutdown(self):
+        """停止接收新工作並等待進行中的工作結束。"""
+        self._executor.shutdown(wait=True)
+
+
+_shared_service = None
+_shared_service_lock = threading.Lock()
+
+
+def get_job_service(**kwargs) -> JobService:
+    """
+    取得程序內共用的搜尋工作服務（首次呼叫時以 kwargs 建立）。
+    輸出：JobService。
+    """
+    global _shared_service
+    with _shared_service_lock:
+        if _shared_service is None:
+            _shared_service = JobService(**kwargs)
+        return _shared_service
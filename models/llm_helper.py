@@ -1,135 +1,439 @@
 # llm_helper.py
+import hashlib
 import json
+import queue
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from apis.llm_api import LLMAPI
+from apis.analysis_cache import get_analysis_cache
+from apis.analysis_result import ANALYSIS_FIELDS, FALLBACK_ANALYSIS, is_reusable_analysis, normalize_analysis
+from models.query_cache import shared_query_cache
+from models.token_budget import TokenBudget, estimate_tokens, split_into_chunks, pack_blocks, truncate_to_tokens
+from models.tracing import tracer, bind_context
+
+# 單篇新聞分析提示詞；內容變更時版本雜湊隨之改變，舊快取自動失效
+ANALYZE_PROMPT_TEMPLATE = (
+    "請根據以下新聞內容，同時產生：\n"
+    "1. 新聞摘要（200 字內）\n"
+    "2. 情緒判斷（正面、中性、負面擇一）\n"
+    "3. 命名實體（包含人名、公司、地名，以逗號分隔）\n"
+    "⚠️ 最後請務必以以下 JSON 格式輸出：\n"
+    '{ "summary": "...", "sentiment": "...", "ner": "..." }\n\n'
+    "以下為新聞內容：\n"
+)
+ANALYZE_PROMPT_VERSION = hashlib.sha256(ANALYZE_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+# 長文分段重點提示詞（map）：超過預算的新聞先分段整理重點，再以重點進行分析（reduce）
+CHUNK_PROMPT_TEMPLATE = (
+    "以下為一篇長篇新聞的第 {index}/{total} 段，請整理此段重點（300 字內），"
+    "保留人名、公司、地名、關鍵數據與作者語氣，只輸出重點：\n\n{chunk}"
+)
+
+# 輿情總結提示詞；新聞過多時先分組整理重點（map），再綜合各組重點（reduce）
+SUMMARY_PROMPT_HEADER = (
+    "以下為多篇新聞內容及 AI 分析結果，請綜合以下內容產出 300 字以內的輿情總結，"
+    "並說明輿論趨勢及潛在風險：\n\n"
+)
+GROUP_SUMMARY_PROMPT_HEADER = (
+    "以下為部分新聞及 AI 分析結果，請整理這些新聞的重點、情緒傾向與主要實體（300 字內），"
+    "作為後續綜合輿情總結的素材：\n\n"
+)
+MAX_REDUCE_ROUNDS = 3  # 分層彙整的最多層數，超過仍放不下時直接截斷
+
+# 問題理解提示詞：一次回傳是否適合輿情分析與搜尋關鍵字
+QUERY_PROMPT_TEMPLATE = """
+請根據以下使用者問題完成兩件事：
+1. 判斷是否可能用於'新聞搜尋'或'輿情分析'，或是與科技新聞有關。大部分問題可通過，但與聊天者請拒答。
+2. 若適合，產生 1-3 個最適合新聞搜尋的短關鍵字，關鍵字應簡潔且代表主題重點。
+請只以以下 JSON 格式回應：
+{{ "is_valid": true 或 false, "reason": "簡短原因", "keywords": ["關鍵字1", "關鍵字2", "關鍵字3"] }}
+---
+使用者輸入: {query}
+"""
+QUERY_PROMPT_VERSION = hashlib.sha256(QUERY_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+# 串流 JSON 中字串欄位的開頭（欄位名稱至值的左引號）；欄位名稱可能被切在兩段串流文字之間，
+# 因此每次保留緩衝區結尾這麼多字元重新比對
+_FIELD_KEY_PATTERN = re.compile(r'"(summary|sentiment|ner)"\s*:\s*"')
+_FIELD_KEY_TAIL = 32
+
+
+def _chunk_text(chunk) -> str:
+    """取出串流片段文字（Ollama 回傳 str，Chat 模型回傳訊息片段）。"""
+    return getattr(chunk, "content", chunk)
+
+
+# 增量 JSON 欄位解析器：每收到一段文字，就回報新完成的欄位
+class IncrementalFieldParser:
+    def __init__(self, fields=ANALYSIS_FIELDS):
+        self.fields = fields
+        self.buffer = ""
+        self.values = {}
+        self._scan = 0      # 下次從緩衝區的這個位置繼續掃描，已掃過的文字不再重掃
+        self._open = None   # 已出現左引號、尚未結束的欄位：(欄位名稱, 值的起始位置)
+
+    @staticmethod
+    def _escaped(text: str, quote: int, start: int) -> bool:
+        """引號前連續奇數個反斜線表示該引號已跳脫。"""
+        backslashes = 0
+        while quote - backslashes - 1 >= start and text[quote - backslashes - 1] == "\\":
+            backslashes += 1
+        return backslashes % 2 == 1
+
+    def feed(self, text: str) -> dict:
+        """
+        加入新的串流文字，只掃描尚未掃過的部分。
+        輸入：text (str)；輸出：本次新完成的欄位 (dict)。
+        """
+        self.buffer += text
+        completed = {}
+        while True:
+            if self._open is None:
+                match = _FIELD_KEY_PATTERN.search(self.buffer, self._scan)
+                if match is None:
+                    self._scan = max(self._scan, len(self.buffer) - _FIELD_KEY_TAIL)
+                    return completed
+                self._open, self._scan = (match.group(1), match.end()), match.end()
+                continue
+
+            name, start = self._open
+            end = self.buffer.find('"', self._scan)
+            while end != -1 and self._escaped(self.buffer, end, start):
+                end = self.buffer.find('"', end + 1)
+            if end == -1:
+                self._scan = len(self.buffer)
+                return completed
+
+            raw = self.buffer[start:end]
+            self._open, self._scan = None, end + 1
+            if name in self.fields and name not in self.values:
+                try:
+                    value = json.loads(f'"{raw}"')
+                except json.JSONDecodeError:
+                    value = raw
+                self.values[name] = completed[name] = value
 
 # LLM 輔助工具類別
 class LLMHelper:
-    def __init__(self):
+    def __init__(self, analysis_cache=None, query_cache=None, budget=None, max_map_workers: int = 4):
         # 設定使用的 LLM 模型與模式
         self.llm_option = "Gemma2:27b"
         self.mode = "內部LLM"
+        self.analysis_cache = analysis_cache or get_analysis_cache()  # 分析結果快取
+        self.query_cache = query_cache or shared_query_cache  # 問題理解結果快取
+        self.budget = budget or TokenBudget()  # 單次呼叫的提示詞 token 預算
+        self.max_map_workers = max_map_workers  # map 階段的並行 LLM 呼叫數（所有同時分析的新聞合計）
+        # 所有新聞的 map 呼叫共用同一個執行緒池，並行分析多篇長文時總呼叫數仍不超過上限
+        self._map_executor = ThreadPoolExecutor(max_workers=max(1, max_map_workers), thread_name_prefix="llm-map")
+
+    @property
+    def model_key(self) -> str:
+        """目前使用的模式與模型，作為快取鍵的一部分。"""
+        return f"{self.mode}:{self.llm_option}"
 
     def analyze_article(self, article: str) -> dict:
         """
         使用 LLM 對輸入新聞內容進行分析，回傳摘要、情緒判斷、NER 實體辨識結果。
         輸入: 單篇新聞文字 (str)，輸出: 字典格式 (dict)。
         """
-        prompt = (
-            "請根據以下新聞內容，同時產生：\n"
-            "1. 新聞摘要（200 字內）\n"
-            "2. 情緒判斷（正面、中性、負面擇一）\n"
-            "3. 命名實體（包含人名、公司、地名，以逗號分隔）\n"
-            "⚠️ 最後請務必以以下 JSON 格式輸出：\n"
-            '{ "summary": "...", "sentiment": "...", "ner": "..." }\n\n'
-            "以下為新聞內容：\n" + article
-        )
+        # 相同內文、模型與提示詞版本已分析過則直接回傳
+        cached = self.analysis_cache.get(article, self.model_key, ANALYZE_PROMPT_VERSION)
+        if cached:
+            print("🧠 使用快取的分析結果")
+            return cached
 
-        llm = LLMAPI().get_llm(self.mode, self.llm_option)
-        response_text = llm.invoke(prompt)
+        prompt = ANALYZE_PROMPT_TEMPLATE + self.fit_article(article)
+
+        response_text = self._invoke(prompt, "analyze")
         print("🧠 LLM 回傳原始結果：", response_text)
 
-        # 嘗試解析 JSON 格式結果
+        result = self.parse_analysis(response_text)
+        if not isinstance(result, dict):
+            return dict(FALLBACK_ANALYSIS)
+
+        # 只快取完整的結果，避免缺欄位或失敗的結果被重複使用；缺少的欄位以預設結果補上
+        if is_reusable_analysis(result):
+            self.analysis_cache.put(article, self.model_key, ANALYZE_PROMPT_VERSION, result)
+        return normalize_analysis(result)
+
+    def stream_analyze_article(self, article: str):
+        """
+        以串流方式分析單篇新聞；摘要、情緒、NER 任一欄位完整輸出即產出一次目前結果，
+        最後一次產出為完整分析結果。
+        輸入: 單篇新聞文字 (str)，輸出: generator of dict（已完成的欄位）。
+        """
+        cached = self.analysis_cache.get(article, self.model_key, ANALYZE_PROMPT_VERSION)
+        if cached:
+            yield cached
+            return
+
+        parser = IncrementalFieldParser()
+        for text in self._stream(ANALYZE_PROMPT_TEMPLATE + self.fit_article(article), "analyze"):
+            if parser.feed(text):
+                yield dict(parser.values)
+
+        result = self.parse_analysis(parser.buffer)
+        if not isinstance(result, dict):
+            yield dict(FALLBACK_ANALYSIS)
+            return
+        # 串流中斷或只輸出部分欄位時不快取，缺少的欄位以預設結果補上
+        if is_reusable_analysis(result):
+            self.analysis_cache.put(article, self.model_key, ANALYZE_PROMPT_VERSION, result)
+        yield normalize_analysis(result)
+
+    def stream_analyze_articles(self, articles: list, max_in_flight: int = 4):
+        """
+        並行串流分析多篇新聞，依到達順序產出各篇的部分或完整結果。
+        輸入: articles (list of str), max_in_flight (int)；
+        輸出: generator of (索引, dict, 是否完成)。
+        """
+        if not articles:
+            return
+        events = queue.Queue()
+
+        def worker(idx, article):
+            try:
+                # 最後一次產出為完整結果，只以 done=True 送出一次；之前的產出才是部分結果
+                analysis = None
+                for latest in self.stream_analyze_article(article):
+                    if analysis is not None:
+                        events.put((idx, analysis, False))
+                    analysis = latest
+                events.put((idx, analysis if analysis is not None else dict(FALLBACK_ANALYSIS), True))
+            except Exception as e:
+                events.put((idx, e, True))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_in_flight, len(articles)))) as executor:
+            for idx, article in enumerate(articles):
+                executor.submit(bind_context(worker), idx, article)
+            remaining = len(articles)
+            while remaining:
+                idx, payload, done = events.get()
+                if isinstance(payload, Exception):
+                    raise payload
+                if done:
+                    remaining -= 1
+                yield idx, payload, done
+
+    # ---------- LLM 呼叫（含追蹤）----------
+    def _invoke(self, prompt: str, stage: str) -> str:
+        """
+        呼叫 LLM 並記錄追蹤區段（階段、模型、提示詞與生成的 token 數）。
+        輸入：prompt (str)、stage (str) - 呼叫用途；輸出：回覆文字 (str)。
+        """
+        llm = LLMAPI().get_llm(self.mode, self.llm_option)
+        with tracer.span("llm.invoke", stage=stage, model=self.model_key,
+                         prompt_tokens=estimate_tokens(prompt)) as span:
+            try:
+                response = llm.invoke(prompt)
+            except Exception:
+                # 呼叫失敗時檢查服務狀態，不可用則移除快取實例，下次呼叫重新建立連線
+                LLMAPI.health_check(self.mode, self.llm_option)
+                raise
+            text = _chunk_text(response)
+            span.set(completion_tokens=estimate_tokens(text))
+            # Chat 模型回傳實際用量時以實際值為準
+            usage = getattr(response, "usage_metadata", None)
+            if usage:
+                span.set(prompt_tokens=usage.get("input_tokens"), completion_tokens=usage.get("output_tokens"))
+        return text
+
+    def _stream(self, prompt: str, stage: str):
+        """
+        以串流方式呼叫 LLM 並記錄追蹤區段（含首個片段的等待時間）。
+        區段不設為目前區段，避免跨越 yield 時污染呼叫端的追蹤上下文。
+        輸入：prompt (str)、stage (str)；輸出：generator of str。
+        """
+        llm = LLMAPI().get_llm(self.mode, self.llm_option)
+        span = tracer.start_span("llm.stream", stage=stage, model=self.model_key,
+                                 prompt_tokens=estimate_tokens(prompt))
+        completion, error = [], None
+        try:
+            for chunk in llm.stream(prompt):
+                text = _chunk_text(chunk)
+                if not completion:
+                    span.set(first_token_s=round(time.time() - span.start_wall, 3))
+                completion.append(text)
+                yield text
+        except BaseException as e:
+            error = e
+            if isinstance(e, Exception):
+                LLMAPI.health_check(self.mode, self.llm_option)
+            raise
+        finally:
+            span.set(completion_tokens=estimate_tokens("".join(completion)))
+            tracer.end_span(span, error)
+
+    # ---------- Token 預算與 map-reduce ----------
+    def _map(self, prompts: list, fallbacks: list) -> list:
+        """
+        透過共用的 map 執行緒池並行送出多個提示詞，依原順序回傳結果；單一呼叫失敗時改用對應的備援文字。
+        輸入：prompts (list of str)、fallbacks (list of str)；輸出：list of str。
+        """
+        results = list(fallbacks)
+        futures = {self._map_executor.submit(bind_context(self._invoke), prompt, "map"): idx
+                   for idx, prompt in enumerate(prompts)}
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                text = future.result().strip()
+                if text and not text.startswith("查詢失敗"):
+                    results[idx] = text
+            except Exception as e:
+                print(f"⚠️ 分段呼叫失敗，改用原文截斷：{e}")
+        return results
+
+    def fit_article(self, article: str) -> str:
+        """
+        確保新聞內文放得進單次分析提示詞：未超過預算時原樣回傳；
+        超過時切分為多段並行整理重點（map），以各段重點取代原文，必要時再分層彙整。
+        輸入：article (str)；輸出：放入分析提示詞的文字 (str)。
+        """
+        available = self.budget.available(ANALYZE_PROMPT_TEMPLATE)
+        text = article
+        for _ in range(MAX_REDUCE_ROUNDS):
+            if estimate_tokens(text) <= available:
+                return text
+            chunk_budget = self.budget.available(CHUNK_PROMPT_TEMPLATE)
+            chunks = split_into_chunks(text, chunk_budget)
+            print(f"✂️ 內文約 {estimate_tokens(text)} tokens，超過預算 {available}，分 {len(chunks)} 段整理重點")
+            prompts = [CHUNK_PROMPT_TEMPLATE.format(index=i, total=len(chunks), chunk=chunk)
+                       for i, chunk in enumerate(chunks, start=1)]
+            fallbacks = [truncate_to_tokens(chunk, max(1, available // len(chunks))) for chunk in chunks]
+            notes = self._map(prompts, fallbacks)
+            text = "\n".join(f"【第 {i} 段重點】{note}" for i, note in enumerate(notes, start=1))
+        return truncate_to_tokens(text, available)
+
+    @staticmethod
+    def summary_blocks(articles: list, analyses: list) -> list:
+        """
+        將每篇新聞與分析結果整理為輿情總結用的文字區塊。
+        輸入: articles (list), analyses (list)；輸出: list of str
+        """
+        return [
+            f"【第 {i} 則新聞】\n"
+            f"標題：{article['title']}\n"
+            f"日期：{article['publish_date']}\n"
+            f"摘要：{analysis['summary']}\n"
+            f"情緒：{analysis['sentiment']}\n"
+            f"NER：{analysis['ner']}\n"
+            for i, (article, analysis) in enumerate(zip(articles, analyses), start=1)
+        ]
+
+    def reduce_summary_blocks(self, blocks: list) -> list:
+        """
+        分層彙整輿情總結區塊：全部放得進單次提示詞時原樣回傳；否則依預算分組，
+        各組並行整理重點（map），以各組重點取代原區塊，重複至放得下為止。
+        輸入: blocks (list of str)；輸出: list of str（可直接組成最終提示詞的區塊）。
+        """
+        available = self.budget.available(SUMMARY_PROMPT_HEADER)
+        for _ in range(MAX_REDUCE_ROUNDS):
+            if estimate_tokens("\n\n".join(blocks)) <= available:
+                return blocks
+            groups = pack_blocks(blocks, self.budget.available(GROUP_SUMMARY_PROMPT_HEADER))
+            print(f"🧩 {len(blocks)} 個區塊超過總結預算 {available}，分 {len(groups)} 組彙整")
+            fallbacks = [truncate_to_tokens(group, max(1, available // len(groups))) for group in groups]
+            notes = self._map([GROUP_SUMMARY_PROMPT_HEADER + group for group in groups], fallbacks)
+            blocks = [f"【第 {i} 組新聞重點】\n{note}" for i, note in enumerate(notes, start=1)]
+        return [truncate_to_tokens("\n\n".join(blocks), available)]
+
+    def prepare_summary_prompt(self, articles: list, analyses: list) -> str:
+        """
+        組合輿情總結提示詞；新聞過多而超過預算時先以 map-reduce 分層彙整。
+        輸入: articles (list), analyses (list)；輸出: prompt (str)
+        """
+        blocks = self.reduce_summary_blocks(self.summary_blocks(articles, analyses))
+        return SUMMARY_PROMPT_HEADER + "\n\n".join(blocks)
+
+    @staticmethod
+    def parse_analysis(response_text: str):
+        """
+        解析 LLM 回傳的 JSON 分析結果，格式不正確時嘗試從字串中提取 JSON。
+        輸入: LLM 回傳文字 (str)，輸出: dict 或 None（無法解析）。
+        """
         try:
-            result = json.loads(response_text)
+            return json.loads(response_text)
         except json.JSONDecodeError:
             # 若 LLM 回傳格式不正確，嘗試從字串中提取 JSON
             cleaned_text = response_text.replace("\n", " ").replace("\r", "").strip()
             match = re.search(r'\{.*\}', cleaned_text)
             if match:
                 try:
-                    result = json.loads(match.group(0))
-                except:
-                    result = {"summary": "無法生成摘要", "sentiment": "未知", "ner": "無"}
-            else:
-                result = {"summary": "無法生成摘要", "sentiment": "未知", "ner": "無"}
-        return result
+                    return json.loads(match.group(0))
+                except json.JSONDecodeError:
+                    return None
+            return None
 
     def generate_summary(self, articles: list, analyses: list) -> str:
         """
         整合多篇新聞及分析結果，請 LLM 產出 300 字內的輿情總結。
         輸入: articles (list), analyses (list)；輸出: 總結文字 (str)
         """
-        combined_text = []
-        for i, (article, analysis) in enumerate(zip(articles, analyses), start=1):
-            block = (
-                f"【第 {i} 則新聞】\n"
-                f"標題：{article['title']}\n"
-                f"日期：{article['publish_date']}\n"
-                f"摘要：{analysis['summary']}\n"
-                f"情緒：{analysis['sentiment']}\n"
-                f"NER：{analysis['ner']}\n"
-            )
-            combined_text.append(block)
-
-        prompt = (
-            "以下為多篇新聞內容及 AI 分析結果，請綜合以下內容產出 300 字以內的輿情總結，"
-            "並說明輿論趨勢及潛在風險：\n\n" + "\n\n".join(combined_text)
-        )
-
-        llm = LLMAPI().get_llm(self.mode, self.llm_option)
-        response_text = llm.invoke(prompt)
+        prompt = self.prepare_summary_prompt(articles, analyses)
+        response_text = self._invoke(prompt, "summary")
 
         if response_text.startswith("查詢失敗"):
             return "⚠️ 無法生成摘要，請稍後再試。"
 
         return response_text
 
-    def query_to_keywords(self, query: str) -> str:
+    def stream_summary(self, articles: list, analyses: list):
         """
-        將使用者輸入問題轉換為 1-3 個新聞搜尋用的關鍵字。
-        輸入: query (str)；輸出: 關鍵字 (str)。
+        以串流方式產出輿情總結，逐段回傳 LLM 生成的文字。
+        輸入: articles (list), analyses (list)；輸出: generator of str
         """
-        import streamlit as st
-        prompt = f"""
-        請根據以下使用者問題，產生 1-3 個最適合新聞搜尋的短關鍵字（逗號分隔），
-        關鍵字應簡潔且代表主題重點。
-        請以此格式回應：
-        <qtkeywords> 關鍵字1, 關鍵字2, 關鍵字3 <qtkeywords>
+        prompt = self.prepare_summary_prompt(articles, analyses)
+        yield from self._stream(prompt, "summary")
 
-        使用者輸入: {query}
+    def understand_query(self, query: str) -> dict:
         """
+        以單次 LLM 呼叫判斷問題是否適合新聞搜尋或輿情分析，並產生 1-3 個搜尋關鍵字；
+        相同或近似的問題直接使用快取結果。
+        輸入: query (str)；輸出: dict（is_valid: bool, keywords: list of str）。
+        """
+        # 驗證與關鍵字擷取已合併為同一次 LLM 呼叫，以單一區段記錄
+        with tracer.span("query.understand") as span:
+            namespace = f"{self.model_key}:{QUERY_PROMPT_VERSION}"
+            cached = self.query_cache.get(query, namespace=namespace)
+            if cached:
+                print(f"🔎 使用快取的問題解析結果: {cached}")
+                span.set(cached=True, is_valid=cached["is_valid"], keywords=len(cached["keywords"]))
+                return dict(cached)
 
-        llm = LLMAPI().get_llm(self.mode, self.llm_option)
-        response_text = llm.invoke(prompt)
-        print(f"🔎 LLM 關鍵字回應: {response_text}")
-
-        match = re.search(r"<qtkeywords>\s*(.*?)\s*<qtkeywords>", response_text)
-        if match:
-            keywords_str = match.group(1)
-            keywords_list = [kw.strip() for kw in re.split(r"[，,]", keywords_str)]
-            print(f"✅ 關鍵字清單: {keywords_list}")
-            return keywords_list[0]
-        else:
-            # 若無法符合格式，使用回傳文字前幾個字作為備用關鍵字
-            fallback_keyword = response_text.strip().split('\n')[0][:10]
-            print(f"⚠️ 使用 fallback keyword: {fallback_keyword}")
-            st.warning(f"⚠️ LLM 回傳原始結果：{response_text}")
-            return fallback_keyword or ""
+            response_text = self._invoke(QUERY_PROMPT_TEMPLATE.format(query=query), "query")
+            print(f"🔎 LLM 問題解析回覆: {response_text}")
+
+            parsed = self.parse_analysis(response_text)
+            if not isinstance(parsed, dict):
+                # 無法解析時不快取，預設判定為不適合
+                span.set(cached=False, is_valid=False, keywords=0)
+                return {"is_valid": False, "keywords": []}
+
+            is_valid = parsed.get("is_valid")
+            if isinstance(is_valid, str):
+                is_valid = "false" not in is_valid.lower()
+            keywords = parsed.get("keywords") or []
+            if isinstance(keywords, str):
+                keywords = re.split(r"[，,]", keywords)
+            keywords = list(dict.fromkeys(kw.strip() for kw in keywords if isinstance(kw, str) and kw.strip()))
+
+            result = {"is_valid": bool(is_valid) and bool(keywords), "keywords": keywords[:3]}
+            print(f"✅ 問題解析結果: {result}")
+            span.set(cached=False, is_valid=result["is_valid"], keywords=len(result["keywords"]))
+            self.query_cache.put(query, result, namespace=namespace)
+            return dict(result)
+
+    def query_to_keywords(self, query: str) -> str:
+        """
+        將使用者輸入問題轉換為新聞搜尋用的關鍵字（取第一個）。
+        輸入: query (str)；輸出: 關鍵字 (str)。
+        """
+        keywords = self.understand_query(query)["keywords"]
+        return keywords[0] if keywords else ""
 
     def is_semantic_search(self, query: str) -> bool:
         """
         判斷使用者問題是否適合新聞搜尋或輿情分析。
-        只要 LLM 回覆 <is_ss> 區塊中沒有包含 'false'，就判定為 True。
-        """
-        prompt = f"""
-        請根據以下使用者問題，判斷是否可能用於'新聞搜尋'或'輿情分析'，或是與科技新聞有關。
-        大部分問題可通過，但與聊天者請拒答。
-        請簡短說明原因，最後請用 <is_ss> True <is_ss> 或 <is_ss> False <is_ss> 格式回覆。
-        ---
-        使用者輸入: {query}
         """
-
-        llm = LLMAPI().get_llm(self.mode, self.llm_option)
-        response_text = llm.invoke(prompt).lower().strip()
-        print(f"🔎 LLM 判斷回覆: {response_text}")
-
-        # 從 LLM 回應中取出 <is_ss> 標籤區域文字
-        match = re.search(r"<is_ss>\s*(.*?)\s*<is_ss>", response_text)
-        if match:
-            inside_tag = match.group(1).strip()
-            # 只要沒有 false 字樣就回傳 True
-            return "false" not in inside_tag.lower()
-
-        # 若無標籤則預設 False
-        return False
+        return self.understand_query(query)["is_valid"]
@@ -0,0 +1,84 @@
+# query_cache.py
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_EXACT_TOKEN = re.compile(r"[a-z]+|[0-9]+")  # 英文與數字（如公司代號、年份）必須完全相同
+
+
+def normalize_query(query: str) -> str:
+    """
+    正規化使用者問題：全半形統一、轉小寫、移除標點與空白。
+    輸入：query (str)；輸出：正規化字串 (str)。
+    """
+    return _NON_WORD.sub("", unicodedata.normalize("NFKC", query).lower())
+
+
+def _bigrams(text: str) -> set:
+    """取得字元二元組集合（單一字元時退回字元本身）。"""
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+
+def _exact_tokens(text: str) -> frozenset:
+    """取得英文字詞與數字集合；只差一個年份或代號的問題字元相似度很高，但意思不同。"""
+    return frozenset(_EXACT_TOKEN.findall(text))
+
+
+# 問題理解結果快取：完全相同（正規化後）直接命中；英文與數字完全相同且字元二元組 Jaccard 相似度達門檻視為近似重複
+class QueryCache:
+    def __init__(self, max_items: int = 512, similarity: float = 0.8):
+        """
+        建構函式。
+        輸入：max_items (int) - 最多保留筆數、similarity (float) - 近似重複門檻 (0~1)。
+        """
+        self.max_items = max_items
+        self.similarity = similarity
+        self._entries = OrderedDict()  # {(namespace, 正規化問題): (bigrams, 英數字詞, value)}
+        self._lock = threading.Lock()
+
+    def get(self, query: str, namespace: str = ""):
+        """
+        查詢快取，先比對完全相同，再於英文與數字完全相同的問題中找最相似的近似問題。
+        輸入：query (str)、namespace (str) - 例如模型名稱；輸出：快取值或 None。
+        """
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+        key = (namespace, normalized)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][-1]
+
+            grams, tokens = _bigrams(normalized), _exact_tokens(normalized)
+            best_key, best_score = None, 0.0
+            for entry_key, (other, other_tokens, _) in self._entries.items():
+                if entry_key[0] != namespace or other_tokens != tokens:
+                    continue
+                score = len(grams & other) / len(grams | other)
+                if score > best_score:
+                    best_key, best_score = entry_key, score
+            if best_key and best_score >= self.similarity:
+                self._entries.move_to_end(best_key)
+                return self._entries[best_key][-1]
+        return None
+
+    def put(self, query: str, value, namespace: str = ""):
+        """
+        寫入快取，超過上限時淘汰最久未使用的項目。
+        輸入：query (str)、value、namespace (str)；無輸出。
+        """
+        normalized = normalize_query(query)
+        if not normalized:
+            return
+        with self._lock:
+            self._entries[(namespace, normalized)] = (_bigrams(normalized), _exact_tokens(normalized), value)
+            self._entries.move_to_end((namespace, normalized))
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+
+# 程序內共用的問題快取，熱門問題跨使用者共用
+shared_query_cache = QueryCache()
@@ -0,0 +1,75 @@
+# readiness.py
+import time
+from contextlib import contextmanager
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+READY = "ready"
+EMPTY = "empty"
+CAPTCHA = "captcha"
+
+
+# 計時器：區分「等待」（頁面就緒、禮貌間隔）與「實際工作」所花的時間
+class WaitTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.waits = {}  # 各類等待累計秒數
+
+    @contextmanager
+    def waiting(self, name: str):
+        """
+        以 with 語法量測一段等待時間並依名稱累計。
+        輸入：name (str) - 等待類別名稱。
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        """直接累計一段已知長度的等待時間。"""
+        self.waits[name] = self.waits.get(name, 0.0) + seconds
+
+    def report(self) -> dict:
+        """
+        產出時間統計。
+        輸出：dict（total、wait、work 及各類等待秒數）。
+        """
+        total = time.perf_counter() - self.started
+        wait = sum(self.waits.values())
+        report = {"total": round(total, 3), "wait": round(wait, 3), "work": round(total - wait, 3)}
+        report.update({f"wait_{name}": round(sec, 3) for name, sec in self.waits.items()})
+        return report
+
+
+# 頁面就緒偵測：輪詢結果選擇器，結果一出現即返回，不做固定等待
+class PageReadiness:
+    def __init__(self, result_selector: str, empty_selector: str = None,
+                 captcha_markers=("我是機器人", "reCAPTCHA"), poll_interval: float = 0.2):
+        """
+        建構函式，設定結果、無結果與驗證碼的判斷條件。
+        輸入：result_selector (str)、empty_selector (str)、captcha_markers (tuple)、poll_interval (float)。
+        """
+        self.result_selector = result_selector
+        self.empty_selector = empty_selector
+        self.captcha_markers = captcha_markers
+        self.poll_interval = poll_interval
+
+    def _check(self, driver):
+        """單次檢查頁面狀態；尚未就緒時回傳 False 讓 WebDriverWait 繼續輪詢。"""
+        if driver.find_elements(By.CSS_SELECTOR, self.result_selector):
+            return READY
+        if self.empty_selector and driver.find_elements(By.CSS_SELECTOR, self.empty_selector):
+            return EMPTY
+        page_source = driver.page_source
+        if any(marker in page_source for marker in self.captcha_markers):
+            return CAPTCHA
+        return False
+
+    def wait(self, driver, timeout: float = 20) -> str:
+        """
+        等待頁面出現結果、無結果提示或驗證碼，逾時則拋出 TimeoutException。
+        輸入：driver (WebDriver)、timeout (float)；輸出：READY / EMPTY / CAPTCHA (str)。
+        """
+        return WebDriverWait(driver, timeout, poll_frequency=self.poll_interval).until(self._check)
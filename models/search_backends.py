@@ -0,0 +1,147 @@
+# search_backends.py
+import os
+import threading
+import time
+from lxml import etree
+
+# 數位時代公開的 RSS / Sitemap 位址，可由環境變數 BNEXT_FEED_URLS（逗號分隔）覆寫
+DEFAULT_FEED_URLS = [url.strip() for url in
+                     os.getenv("BNEXT_FEED_URLS", "https://www.bnext.com.tw/rss").split(",") if url.strip()]
+
+# 預先編譯的 XPath（不分命名空間，同時支援 RSS item、Atom entry 與 sitemap url）
+_ENTRY_XPATH = etree.XPath("//*[local-name()='item' or local-name()='entry' or local-name()='url']")
+_CHILD_TEXT_XPATH = {
+    "title": etree.XPath("string(./*[local-name()='title'] | ./*[local-name()='news']/*[local-name()='title'])"),
+    "link": etree.XPath("string(./*[local-name()='link'][not(@href)] | ./*[local-name()='loc'])"),
+    "href": etree.XPath("string(./*[local-name()='link']/@href)"),
+    "description": etree.XPath("string(./*[local-name()='description'] | ./*[local-name()='summary'])"),
+    "published": etree.XPath("string(./*[local-name()='pubDate'] | ./*[local-name()='published']"
+                             " | ./*[local-name()='news']/*[local-name()='publication_date'])"),
+}
+
+_feed_cache = {}  # {feed_url: (抓取時間, entries)}
+_feed_cache_lock = threading.Lock()
+
+
+# 搜尋後端介面：輸入關鍵字，回傳 [{'title': ..., 'url': ...}]
+class SearchBackend:
+    name = "base"
+
+    def search(self, keyword: str, max_results: int = 10) -> list:
+        raise NotImplementedError
+
+
+# 輕量搜尋後端：以 requests + lxml 解析 RSS / Sitemap，不需啟動瀏覽器
+class FeedSearchBackend(SearchBackend):
+    name = "feed"
+
+    def __init__(self, session, headers: dict, timeout, rate_limiter, feed_urls=None, cache_ttl: float = 300):
+        """
+        建構函式。
+        輸入：session (requests.Session)、headers (dict)、timeout、rate_limiter (HostRateLimiter)、
+             feed_urls (list)、cache_ttl (float) - 訂閱來源快取秒數。
+        """
+        self.session = session
+        self.headers = headers
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.feed_urls = feed_urls or DEFAULT_FEED_URLS
+        self.cache_ttl = cache_ttl
+
+    @staticmethod
+    def parse_feed(xml_bytes: bytes) -> list:
+        """
+        解析 RSS / Atom / Sitemap 內容，回傳文章條目清單。
+        輸入：xml_bytes (bytes)；輸出：list of dict（title, url, description, published）。
+        """
+        parser = etree.XMLParser(recover=True, resolve_entities=False, no_network=True)
+        root = etree.fromstring(xml_bytes, parser=parser)
+        if root is None:
+            return []
+
+        entries = []
+        for node in _ENTRY_XPATH(root):
+            url = (_CHILD_TEXT_XPATH["link"](node) or _CHILD_TEXT_XPATH["href"](node)).strip()
+            if not url:
+                continue
+            entries.append({
+                "title": _CHILD_TEXT_XPATH["title"](node).strip(),
+                "url": url,
+                "description": _CHILD_TEXT_XPATH["description"](node).strip(),
+                "published": _CHILD_TEXT_XPATH["published"](node).strip(),
+            })
+        return entries
+
+    @staticmethod
+    def match_entries(entries: list, keyword: str, max_results: int = 10) -> list:
+        """
+        以關鍵字（空白分隔視為 AND）比對條目標題與描述，不分大小寫。
+        輸入：entries (list)、keyword (str)、max_results (int)；輸出：list of dict（title, url）。
+        """
+        terms = [term.lower() for term in keyword.split() if term]
+        if not terms:
+            return []
+        results, seen = [], set()
+        for entry in entries:
+            haystack = f"{entry['title']} {entry['description']}".lower()
+            if entry["title"] and entry["url"] not in seen and all(term in haystack for term in terms):
+                seen.add(entry["url"])
+                results.append({"title": entry["title"], "url": entry["url"]})
+                if len(results) >= max_results:
+                    break
+        return results
+
+    def _load_feed(self, feed_url: str) -> list:
+        """取得單一訂閱來源的條目（有效期限內使用程序內快取）。"""
+        with _feed_cache_lock:
+            cached = _feed_cache.get(feed_url)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl:
+            return cached[1]
+
+        self.rate_limiter.acquire(feed_url)
+        response = self.session.get(feed_url, headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()
+        entries = self.parse_feed(response.content)
+        with _feed_cache_lock:
+            _feed_cache[feed_url] = (time.monotonic(), entries)
+        return entries
+
+    def _load_all(self) -> list:
+        """讀取所有訂閱來源的條目，單一來源失敗時略過。"""
+        entries = []
+        for feed_url in self.feed_urls:
+            try:
+                entries.extend(self._load_feed(feed_url))
+            except Exception as e:
+                print(f"⚠️ 無法讀取訂閱來源：{feed_url}（{e}）")
+        return entries
+
+    def search(self, keyword: str, max_results: int = 10) -> list:
+        return self.match_entries(self._load_all(), keyword, max_results)
+
+    def latest(self, max_results: int = 50) -> list:
+        """
+        不做關鍵字篩選，回傳訂閱來源中最新的文章（依來源順序去重）。
+        輸入：max_results (int)；輸出：list of dict（title, url）。
+        """
+        results, seen = [], set()
+        for entry in self._load_all():
+            if entry["url"] not in seen:
+                seen.add(entry["url"])
+                results.append({"title": entry["title"], "url": entry["url"]})
+        return results[:max_results]
+
+
+# 瀏覽器搜尋後端：以 Selenium 渲染數位時代的 Google 站內搜尋頁
+class SeleniumSearchBackend(SearchBackend):
+    name = "selenium"
+
+    def __init__(self, crawler):
+        """
+        建構函式。
+        輸入：crawler (BnextNewsCrawler) - 提供瀏覽器池與搜尋頁解析。
+        """
+        self.crawler = crawler
+
+    def search(self, keyword: str, max_results: int = 10) -> list:
+        return self.crawler.search_with_browser(keyword, max_results)
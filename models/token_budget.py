@@ -0,0 +1,112 @@
+# token_budget.py
+# 提示詞長度控管：估算 token 數、截斷與切分長文，讓每次 LLM 呼叫都落在模型的上下文長度內
+import os
+import re
+
+# 預設上下文長度（Gemma2 為 8192），可由環境變數 LLM_CONTEXT_TOKENS / LLM_OUTPUT_TOKENS 調整
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "8192"))
+DEFAULT_OUTPUT_TOKENS = int(os.getenv("LLM_OUTPUT_TOKENS", "1024"))
+
+# 中日韓文字與全形標點約一字一個 token；其餘文字（英數、空白）約四個字元一個 token
+_CJK_PATTERN = re.compile(r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+_PARAGRAPH_PATTERN = re.compile(r"\n+")
+_SENTENCE_PATTERN = re.compile(r"(?<=[。！？!?；;])")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    以字元類型估算 token 數（不需載入分詞器，偏保守估計）。
+    輸入：text (str)；輸出：估計 token 數 (int)。
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    將文字截斷至估計 token 數不超過 max_tokens（以二分搜尋找出截斷位置）。
+    輸入：text (str)、max_tokens (int)；輸出：截斷後的文字 (str)。
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+def _pieces(text: str, max_tokens: int) -> list:
+    """將文字拆成不超過上限的片段：先依段落，再依句子，最後硬切。"""
+    pieces = []
+    for paragraph in _PARAGRAPH_PATTERN.split(text):
+        if not paragraph.strip():
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_PATTERN.split(paragraph):
+            while sentence:
+                head = truncate_to_tokens(sentence, max_tokens) or sentence[:1]
+                pieces.append(head)
+                sentence = sentence[len(head):]
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int) -> list:
+    """
+    將長文切分為多個區塊，每塊估計 token 數不超過 max_tokens，並盡量保持段落與句子完整。
+    輸入：text (str)、max_tokens (int)；輸出：list of str。
+    """
+    return pack_blocks(_pieces(text, max_tokens), max_tokens, separator="\n")
+
+
+def pack_blocks(blocks: list, max_tokens: int, separator: str = "\n\n") -> list:
+    """
+    依序將多個文字區塊合併成數組，每組估計 token 數不超過 max_tokens（單一區塊超過上限時自成一組）。
+    輸入：blocks (list of str)、max_tokens (int)、separator (str)；輸出：list of str（合併後的各組文字）。
+    """
+    groups, current, used = [], [], 0
+    separator_tokens = estimate_tokens(separator)
+    for block in blocks:
+        tokens = estimate_tokens(block)
+        if current and used + separator_tokens + tokens > max_tokens:
+            groups.append(separator.join(current))
+            current, used = [], 0
+        used += tokens + (separator_tokens if current else 0)
+        current.append(block)
+    if current:
+        groups.append(separator.join(current))
+    return groups
+
+
+# 單次呼叫的 token 預算：上下文長度扣除輸出保留量
+class TokenBudget:
+    def __init__(self, context_tokens: int = DEFAULT_CONTEXT_TOKENS, output_tokens: int = DEFAULT_OUTPUT_TOKENS):
+        """
+        建構函式。
+        輸入：context_tokens (int) - 模型上下文長度、output_tokens (int) - 保留給模型輸出的 token 數。
+        """
+        self.context_tokens = context_tokens
+        self.output_tokens = output_tokens
+
+    @property
+    def prompt_tokens(self) -> int:
+        """單次呼叫可用於提示詞的 token 數。"""
+        return max(256, self.context_tokens - self.output_tokens)
+
+    def available(self, template: str) -> int:
+        """
+        扣除提示詞模板本身後，可放入內容的 token 數。
+        輸入：template (str)；輸出：int。
+        """
+        return max(128, self.prompt_tokens - estimate_tokens(template))
+
+    def fits(self, prompt: str) -> bool:
+        """提示詞是否在預算內。"""
+        return estimate_tokens(prompt) <= self.prompt_tokens
@@ -0,0 +1,252 @@
+# tracing.py
+# 輕量追蹤與指標：以 span 記錄各階段耗時，匯出為 JSONL 檔與 Prometheus 文字格式
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 耗時直方圖的區間（秒）：涵蓋毫秒級的資料庫寫入到數十秒的 LLM 呼叫
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+METRIC_PREFIX = "newsbot"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+# 單一追蹤區段
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, attributes: dict = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_wall = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        """設定（或覆寫）區段屬性，例如 token 數、網址、筆數。"""
+        self.attributes.update(attributes)
+
+    def finish(self, error: BaseException = None):
+        """結束區段並記錄耗時；重複呼叫時只記錄第一次。"""
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+            if error is not None:
+                self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_wall,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+# 指標彙總：各區段的耗時直方圖、錯誤次數，以及 LLM token 計數
+class MetricsRegistry:
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}  # {區段名稱: [各區間累計次數..., 總次數, 總秒數]}
+        self._errors = defaultdict(int)
+        self._tokens = defaultdict(int)  # {(模型, prompt/completion): token 數}
+        self._collectors = {}  # {來源名稱: 回傳 {指標: 數值} 的函式}，輸出指標時才呼叫
+
+    def register_collector(self, source: str, collect):
+        """
+        註冊額外的指標來源（例如快取統計），輸出時以 {METRIC_PREFIX}_{source}_{指標} 呈現；同名來源會被取代。
+        輸入：source (str)、collect (callable，回傳 dict of 數值)；無輸出。
+        """
+        with self._lock:
+            self._collectors[source] = collect
+
+    def observe(self, span: Span):
+        """將結束的區段計入指標。"""
+        with self._lock:
+            histogram = self._histograms.setdefault(span.name, [0] * len(self.buckets) + [0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += span.duration
+            if span.error:
+                self._errors[span.name] += 1
+            model = span.attributes.get("model")
+            for kind in ("prompt", "completion"):
+                tokens = span.attributes.get(f"{kind}_tokens")
+                if model and tokens:
+                    self._tokens[(model, kind)] += tokens
+
+    def render_prometheus(self) -> str:
+        """
+        輸出 Prometheus 文字格式（text exposition format 0.0.4）。
+        輸出：str。
+        """
+        name = f"{METRIC_PREFIX}_span_duration_seconds"
+        lines = [f"# HELP {name} 各處理階段的耗時（秒）", f"# TYPE {name} histogram"]
+        with self._lock:
+            for span_name, histogram in sorted(self._histograms.items()):
+                label = f'span="{_escape_label(span_name)}"'
+                for bound, count in zip(self.buckets, histogram):
+                    lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram[-2]}')
+                lines.append(f"{name}_count{{{label}}} {histogram[-2]}")
+                lines.append(f"{name}_sum{{{label}}} {histogram[-1]:.6f}")
+
+            errors = f"{METRIC_PREFIX}_span_errors_total"
+            lines += [f"# HELP {errors} 各處理階段的失敗次數", f"# TYPE {errors} counter"]
+            for span_name, count in sorted(self._errors.items()):
+                lines.append(f'{errors}{{span="{_escape_label(span_name)}"}} {count}')
+
+            tokens = f"{METRIC_PREFIX}_llm_tokens_total"
+            lines += [f"# HELP {tokens} LLM 提示詞與生成的 token 數", f"# TYPE {tokens} counter"]
+            for (model, kind), count in sorted(self._tokens.items()):
+                lines.append(f'{tokens}{{model="{_escape_label(model)}",kind="{kind}"}} {count}')
+            collectors = sorted(self._collectors.items())
+
+        # 在鎖外呼叫收集函式，避免其查詢資料庫時阻塞區段記錄
+        for source, collect in collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                print(f"⚠️ 指標來源 {source} 收集失敗：{e}")
+                continue
+            for key, value in sorted(values.items()):
+                gauge = f"{METRIC_PREFIX}_{source}_{key}"
+                lines += [f"# TYPE {gauge} gauge", f"{gauge} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# 追蹤器：管理目前區段（以 contextvars 傳遞）、保留最近的追蹤並匯出
+class Tracer:
+    def __init__(self, jsonl_path: str = None, max_traces: int = 50):
+        """
+        建構函式。
+        輸入：jsonl_path (str) - 區段匯出檔路徑（None 表示不寫檔）、max_traces (int) - 記憶體中保留的追蹤數。
+        """
+        self.jsonl_path = jsonl_path
+        self.max_traces = max_traces
+        self.metrics = MetricsRegistry()
+        self._traces = OrderedDict()  # {trace_id: [span dict, ...]}
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, **attributes) -> Span:
+        """
+        建立區段但不設為目前區段（適用於跨越 yield 的串流呼叫），需自行呼叫 end_span。
+        父區段為目前區段；沒有目前區段時開啟新的追蹤。
+        """
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        return Span(name, trace_id, parent.span_id if parent else None, attributes)
+
+    def end_span(self, span: Span, error: BaseException = None):
+        """結束區段，並計入指標、保留於追蹤紀錄與寫入 JSONL。"""
+        span.finish(error)
+        record = span.to_dict()
+        self.metrics.observe(span)
+        with self._lock:
+            self._traces.setdefault(span.trace_id, []).append(record)
+            self._traces.move_to_end(span.trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        以 with 語法記錄一個區段，期間內建立的區段皆為其子區段。
+        輸出：Span（可用 span.set(...) 補充屬性）；例外會記錄於區段後繼續拋出。
+        """
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    def current_trace_id(self):
+        """目前所在追蹤的 id（不在任何區段內時為 None）。"""
+        span = _current_span.get()
+        return span.trace_id if span else None
+
+    def get_trace(self, trace_id: str) -> list:
+        """
+        取得指定追蹤已結束的所有區段（依開始時間排序）。
+        輸入：trace_id (str)；輸出：list of dict。
+        """
+        with self._lock:
+            spans = list(self._traces.get(trace_id, []))
+        return sorted(spans, key=lambda record: record["start"])
+
+
+def bind_context(fn):
+    """
+    綁定目前的追蹤上下文，讓函式在執行緒池中執行時仍掛在目前區段之下。
+    每次提交工作都需各自呼叫一次（同一份上下文不可同時在多個執行緒中執行）。
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.run(fn, *args, **kwargs)
+    return run
+
+
+# 程序內共用的追蹤器；設定 TRACE_JSONL_PATH 環境變數即將每個區段寫入 JSONL 檔
+tracer = Tracer(jsonl_path=os.getenv("TRACE_JSONL_PATH") or None)
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """
+    於背景執行緒啟動 Prometheus 指標端點（GET /metrics），同一程序只啟動一次。
+    輸入：port (int)、host (str)；輸出：ThreadingHTTPServer。
+    """
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is not None:
+            return _metrics_server
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 不在終端機輸出每次抓取紀錄
+
+        _metrics_server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+        print(f"📈 指標端點已啟動：http://{host}:{port}/metrics")
+        return _metrics_server
@@ -0,0 +1,267 @@
+# vector_index.py
+# 新聞向量索引：新聞寫入時增量向量化並存入 SQLite（跨程序一致），
+# 再同步到磁碟上的記憶體映射（memmap）矩陣，查詢時直接對映射矩陣計算相似度
+#
+# 用法（於專案根目錄執行，補建既有新聞的向量）：
+#   python -m models.vector_index --backfill
+import argparse
+import datetime
+import json
+import os
+import threading
+import numpy as np
+from models.embedding import get_embedder
+from apis.analysis_result import ANALYSIS_FIELDS, is_reusable_analysis
+from models.tracing import tracer
+
+try:
+    import fcntl  # 多個程序（Streamlit、批次匯入）同步同一份索引檔時互斥
+except ImportError:
+    fcntl = None
+
+DEFAULT_INDEX_DIR = "./data/vectors"
+DOCUMENT_CONTENT_CHARS = 200  # 向量化時取用的內文開頭字數（重點由標題、摘要與實體涵蓋，內文過長會稀釋相似度）
+SCAN_BLOCK_ROWS = 65536       # 分塊計算相似度，避免一次載入整個矩陣
+
+
+def document_text(article: dict, analysis: dict = None) -> str:
+    """
+    組合新聞的向量化文字：標題、LLM 摘要、命名實體與內文開頭。
+    輸入：article (dict)、analysis (dict)；輸出：str。
+    """
+    analysis = analysis or {}
+    parts = [article.get("title"), analysis.get("summary"), analysis.get("ner"),
+             (article.get("content") or "")[:DOCUMENT_CONTENT_CHARS]]
+    return "\n".join(part for part in parts if part)
+
+
+# 記憶體映射向量索引
+class VectorIndex:
+    def __init__(self, db, embedder=None, index_dir: str = DEFAULT_INDEX_DIR):
+        """
+        建構函式。
+        輸入：db (NewsDatabase) - 新聞與向量的來源、embedder - 向量化模型（預設依環境變數建立）、
+             index_dir (str) - 索引檔目錄（每個向量模型一個子目錄）。
+        """
+        self.db = db
+        self.embedder = embedder or get_embedder()
+        self.dim = self.embedder.dim
+        self.path = os.path.join(index_dir, self.embedder.name)
+        os.makedirs(self.path, exist_ok=True)
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._ids_path = os.path.join(self.path, "ids.i64")
+        self._state_path = os.path.join(self.path, "state.json")
+        self._lock = threading.Lock()
+        self._state = {"dim": self.dim, "count": 0, "capacity": 0, "seq": 0}
+        self._vectors = self._ids = None
+        self._row_of = {}  # {news_id: 列號}
+
+    # ---------- 索引檔 ----------
+    def _read_state(self) -> dict:
+        if not os.path.exists(self._state_path):
+            return {"dim": self.dim, "count": 0, "capacity": 0, "seq": 0}
+        with open(self._state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("dim") != self.dim:
+            raise ValueError(f"索引維度 {state.get('dim')} 與向量模型 {self.dim} 不符：{self.path}")
+        return state
+
+    def _write_state(self, state: dict):
+        tmp_path = self._state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self._state_path)
+
+    def _map(self, capacity: int):
+        """以指定容量映射向量與 id 檔（檔案不足時先延長）。"""
+        for path, itemsize in ((self._vectors_path, 4 * self.dim), (self._ids_path, 8)):
+            with open(path, "ab") as f:
+                if f.tell() < capacity * itemsize:
+                    f.truncate(capacity * itemsize)
+        if capacity:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+            self._ids = np.memmap(self._ids_path, dtype=np.int64, mode="r+", shape=(capacity,))
+
+    def _load(self, state: dict):
+        """依索引檔狀態重新映射，並補上其他程序新增的列。"""
+        if state["capacity"] != self._state["capacity"]:
+            self._map(state["capacity"])
+        if state["count"] != self._state["count"] or len(self._row_of) != state["count"]:
+            self._row_of = {int(news_id): row for row, news_id in enumerate(self._ids[:state["count"]])} \
+                if state["count"] else {}
+        self._state = state
+
+    def _file_lock(self):
+        handle = open(os.path.join(self.path, "index.lock"), "a")
+        if fcntl:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def refresh(self) -> int:
+        """
+        將資料庫中新寫入的向量同步到映射矩陣（新增或覆寫既有新聞的列）。
+        輸出：本次同步的筆數 (int)。
+        """
+        with self._lock:
+            lock = self._file_lock()
+            try:
+                state = self._read_state()
+                self._load(state)
+                rows = self.db.embeddings_since(self.embedder.name, state["seq"])
+                if not rows:
+                    return 0
+                state = dict(state)
+                new_ids = {news_id for _, news_id, _ in rows if news_id not in self._row_of}
+                if state["count"] + len(new_ids) > state["capacity"]:
+                    state["capacity"] = max(1024, state["capacity"] * 2, state["count"] + len(new_ids))
+                    self._map(state["capacity"])
+                for seq, news_id, blob in rows:
+                    row = self._row_of.get(news_id)
+                    if row is None:
+                        row = self._row_of[news_id] = state["count"]
+                        state["count"] += 1
+                    self._vectors[row] = np.frombuffer(blob, dtype=np.float32)
+                    self._ids[row] = news_id
+                    state["seq"] = seq
+                self._vectors.flush()
+                self._ids.flush()
+                self._write_state(state)
+                self._state = state
+                return len(rows)
+            finally:
+                lock.close()
+
+    # ---------- 寫入 ----------
+    def add(self, items):
+        """
+        向量化剛寫入的新聞並加入索引。
+        輸入：items (list of (news_id, article dict, analysis dict))；無輸出。
+        """
+        items = [(news_id, document_text(article, analysis)) for news_id, article, analysis in items]
+        if not items:
+            return
+        with tracer.span("vector.add", rows=len(items), model=self.embedder.name):
+            vectors = self.embedder.embed([text for _, text in items])
+            self.db.save_embeddings(self.embedder.name,
+                                    [(news_id, vector.tobytes()) for (news_id, _), vector in zip(items, vectors)])
+        self.refresh()
+
+    def index_saved(self, news_ids: list, items: list):
+        """
+        將剛寫入資料庫的新聞加入索引（失敗時只記錄，不影響搜尋或匯入流程；之後可由 backfill 補建）。
+        輸入：news_ids (list of int)、items (list of (article, analysis))；無輸出。
+        """
+        try:
+            self.add([(news_id, article, analysis) for news_id, (article, analysis) in zip(news_ids, items)])
+        except Exception as e:
+            print(f"⚠️ 向量索引更新失敗：{e}")
+
+    def backfill(self, batch_size: int = 256) -> int:
+        """
+        補建尚未向量化的既有新聞（例如索引建立前已儲存的資料）。
+        輸出：補建的篇數 (int)。
+        """
+        total = 0
+        while True:
+            rows = self.db.news_without_embedding(self.embedder.name, batch_size)
+            if not rows:
+                break
+            self.add([(news_id, {"title": title, "content": content}, {"summary": summary, "ner": ner})
+                      for news_id, title, content, summary, ner in rows])
+            total += len(rows)
+        if total:
+            print(f"🧮 已補建 {total} 篇新聞的向量（{self.embedder.name}）")
+        return total
+
+    # ---------- 查詢 ----------
+    def search(self, text: str, k: int = 10):
+        """
+        查詢與文字最相近的新聞（餘弦相似度，逐塊掃描映射矩陣）。
+        輸入：text (str)、k (int)；輸出：list of (news_id, 相似度 float)，依相似度高到低排序。
+        """
+        self.refresh()
+        count = self._state["count"]
+        if not count or k <= 0:
+            return []
+        query = self.embedder.embed([text])[0]
+        best_ids, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        for start in range(0, count, SCAN_BLOCK_ROWS):
+            stop = min(count, start + SCAN_BLOCK_ROWS)
+            scores = np.concatenate([best_scores, self._vectors[start:stop] @ query])
+            ids = np.concatenate([best_ids, np.asarray(self._ids[start:stop])])
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                scores, ids = scores[top], ids[top]
+            best_scores, best_ids = scores, ids
+        order = np.argsort(-best_scores)
+        return [(int(best_ids[i]), float(best_scores[i])) for i in order]
+
+
+# 檢索優先的新聞來源：先從已儲存新聞找出相關且已分析的新聞，不足或過舊時才需要即時爬取
+class NewsRetriever:
+    def __init__(self, db, index: VectorIndex = None, min_score: float = None, fresh_days: int = None):
+        """
+        建構函式。
+        輸入：db (NewsDatabase)、index (VectorIndex)、
+             min_score (float) - 視為相關的最低相似度（預設依向量模型，可由 RETRIEVAL_MIN_SCORE 覆寫）、
+             fresh_days (int) - 最新一篇相關新聞超過幾天即需補抓新新聞（RETRIEVAL_FRESH_DAYS，預設 3）。
+        """
+        self.db = db
+        self.index = index or VectorIndex(db)
+        self.min_score = min_score if min_score is not None else float(
+            os.getenv("RETRIEVAL_MIN_SCORE", self.index.embedder.default_min_score))
+        self.fresh_days = fresh_days if fresh_days is not None else int(os.getenv("RETRIEVAL_FRESH_DAYS", "3"))
+
+    def retrieve(self, keywords: list, k: int):
+        """
+        以搜尋關鍵字從已儲存新聞檢索相關新聞（只向量化關鍵字，不含問題中的贅詞）；
+        分析失敗的新聞不列入，向量模型提供 shares_evidence 時另須通過文字特徵確認。
+        輸入：keywords (list of str)、k (int)；
+        輸出：(hits, crawl_limit)，hits 為 list of (article dict, analysis dict, 相似度, 是否夠新)，
+             crawl_limit 為需要即時爬取的篇數：數量不足或沒有夠新的新聞時為 k 減去夠新的篇數，否則為 0。
+        """
+        shares_evidence = getattr(self.index.embedder, "shares_evidence", None)
+        with tracer.span("retrieval.search", k=k) as span:
+            hits = []
+            # 多取一些候選，扣除分析失敗或未通過確認的新聞後仍有機會湊滿 k 篇
+            for news_id, score in self.index.search(" ".join(keywords), k * 3):
+                if score < self.min_score or len(hits) >= k:
+                    break
+                news = self.db.get_news(news_id)
+                if news is None:
+                    continue
+                article = {key: news[key] for key in ("title", "publish_date", "content", "url")}
+                analysis = {key: news[key] for key in ANALYSIS_FIELDS}
+                if not is_reusable_analysis(analysis):
+                    continue
+                if shares_evidence and not shares_evidence(keywords, document_text(article, analysis)):
+                    continue
+                hits.append((article, analysis, score, news["publish_date_iso"]))
+
+            cutoff = str(datetime.date.today() - datetime.timedelta(days=self.fresh_days))
+            hits = [(article, analysis, score, bool(day and day >= cutoff)) for article, analysis, score, day in hits]
+            fresh = sum(is_fresh for *_, is_fresh in hits)
+            crawl_limit = k - fresh if len(hits) < k or not fresh else 0
+            span.set(hits=len(hits), fresh=fresh, crawl_limit=crawl_limit,
+                     top_score=round(hits[0][2], 3) if hits else None)
+        return hits, crawl_limit
+
+
+if __name__ == '__main__':
+    from apis.news_database import NewsDatabase
+
+    parser = argparse.ArgumentParser(description="建立或查詢新聞向量索引")
+    parser.add_argument("--db", default="./data/news_all.db", help="新聞資料庫路徑")
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR, help="索引檔目錄")
+    parser.add_argument("--backfill", action="store_true", help="補建尚未向量化的既有新聞")
+    parser.add_argument("--query", help="以文字查詢最相近的新聞")
+    parser.add_argument("-k", type=int, default=5, help="查詢回傳篇數")
+    args = parser.parse_args()
+
+    database = NewsDatabase(args.db)
+    vector_index = VectorIndex(database, index_dir=args.index_dir)
+    if args.backfill:
+        vector_index.backfill()
+    if args.query:
+        for found_id, similarity in vector_index.search(args.query, args.k):
+            print(f"{similarity:.3f}  {database.get_news(found_id)['title']}")
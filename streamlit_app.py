@@ -2,117 +2,376 @@
 # 提供新聞自動搜尋、LLM 分析、儲存及歷史紀錄查詢功能
 import streamlit as st
 import datetime
-from apis.news_database import NewsDatabase
+import os
+import threading
+import pandas as pd
+from apis.llm_api import LLMAPI
+from apis.news_database import NewsDatabase, SENTIMENTS
 from models.llm_helper import LLMHelper
 from models.crawler_bnext import BnextNewsCrawler
+from models.driver_pool import get_driver_pool
+from models.job_service import get_job_service
+from models.tracing import tracer, start_metrics_server
 
-# 初始化本地 SQLite 資料庫
-db = NewsDatabase()
 # 顯示 Streamlit 首頁標題
 st.title("📡 新聞輿情分析平台")
-# 建立分頁介面（分成搜尋與歷史）
-tab_search, tab_history = st.tabs(["🔎 搜尋新聞", "📂 已儲存新聞"])
+# 建立分頁介面（分成搜尋、歷史與趨勢）
+tab_search, tab_history, tab_trend = st.tabs(["🔎 搜尋新聞", "📂 已儲存新聞", "📈 輿情趨勢"])
+
+# 搜尋進行中時，每次重新執行頁面前最多等待新事件的秒數
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+
+
+@st.cache_resource
+def get_shared_db():
+    """
+    建立整個程序共用的本地 SQLite 資料庫物件（WAL 模式、每執行緒連線）。
+    """
+    return NewsDatabase()
+
+
+# 初始化本地 SQLite 資料庫
+db = get_shared_db()
+
+
+@st.cache_resource
+def get_shared_driver_pool():
+    """
+    於程序啟動時建立共用的無頭瀏覽器池，所有使用者工作階段共用。
+    暖機於背景執行緒進行且失敗時只記錄，Chrome 無法啟動不會讓頁面出錯；未暖機的瀏覽器於首次借用時才啟動。
+    """
+    pool = get_driver_pool(headless=True)
+
+    def warm():
+        try:
+            pool.warm()
+        except Exception as e:
+            print(f"⚠️ 瀏覽器池暖機失敗，改於查詢時再啟動：{e}")
+
+    threading.Thread(target=warm, name="driver-pool-warm", daemon=True).start()
+    return pool
+
+
+@st.cache_resource
+def warm_up_llm():
+    """
+    程序啟動時於背景預熱 LLM（建立長期實例並讓 Ollama 先載入模型權重）。
+    """
+    helper = LLMHelper()
+    thread = threading.Thread(target=LLMAPI.warm_up, args=(helper.mode, helper.llm_option), daemon=True)
+    thread.start()
+    return thread
+
 
-def process_single_article(idx: int, article_detail: dict, llm_helper, crawler) -> dict:
+@st.cache_resource
+def get_shared_job_service():
     """
-    分析單篇新聞，並於介面中顯示結果，同時儲存到資料庫。
+    建立整個程序共用的搜尋工作服務：所有工作階段共用一組爬蟲與 LLM，相同問題只執行一次。
     """
-    analysis = llm_helper.analyze_article(article_detail['content'])
-    crawler.save_to_db(article_detail, analysis)  # 儲存結果到資料庫
+    crawler = BnextNewsCrawler(headless=True, driver_pool=get_shared_driver_pool(), db=db)
+    return get_job_service(crawler=crawler, llm_helper=LLMHelper())
 
-    # 將結果展開在畫面上
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """
+    設定 METRICS_PORT 環境變數時，於程序啟動時開啟 Prometheus 指標端點（GET /metrics）。
+    """
+    port = int(os.getenv("METRICS_PORT", "0"))
+    return start_metrics_server(port) if port else None
+
+
+def render_article(idx: int, article_detail: dict, analysis: dict):
+    """
+    於介面中顯示單篇新聞的分析結果；尚未生成的欄位顯示為生成中。
+    """
+    pending = "⏳ 生成中..."
     with st.expander(f"【第 {idx} 篇】 {article_detail['publish_date']} - {article_detail['title']}"):
         st.write(f"🔗 [前往原文]({article_detail['url']})")
         st.write(article_detail['content'][:200] + "...")
-        st.write("**📄 LLM 摘要**:", analysis["summary"])
-        st.write("**😊 情緒判斷**:", analysis["sentiment"])
-        st.write("**🏷️ 命名實體**:", analysis["ner"])
-    return analysis
+        st.write("**📄 LLM 摘要**:", analysis.get("summary", pending))
+        st.write("**😊 情緒判斷**:", analysis.get("sentiment", pending))
+        st.write("**🏷️ 命名實體**:", analysis.get("ner", pending))
 
 
 def handle_search():
     """
-    1. 處理使用者輸入，確認是否適合輿情分析，
-    2. 將問題透過 LLM 轉成搜尋關鍵字、爬取新聞、分析並綜合結果。
+    1. 處理使用者輸入，提交搜尋工作至背景工作服務，
+    2. 顯示工作目前的進度與結果（重新執行或切換分頁時不會重做搜尋）。
+    輸出：工作仍在執行時為 (job, cursor)，供頁面繪製完成後等待新事件並重新執行；否則為 None。
     """
     st.header("🔎 從『數位時代』自動搜尋並分析")
-    crawler = BnextNewsCrawler(headless=True)  # 初始化新聞爬蟲
-    llm_helper = LLMHelper()  # 初始化 LLM 輔助工具
 
     # 輸入欄位
     with st.form(key="search_form"):
         user_query = st.text_input("請輸入新聞主題或問題...").strip()
         start_search = st.form_submit_button("搜尋")
 
-    # 使用者點及搜尋
-    if start_search:
-        # 驗證輸入問題是否適合輿情分析
-        with st.spinner(f"🔎 驗證中..."):
-            is_search = llm_helper.is_semantic_search(user_query)
-        if not is_search:
-            st.warning("⚠️ 此問題不適合輿情分析，請換個描述")
-            return
-
-        # 使用 LLM 將問題轉換成搜尋用的關鍵字
-        with st.spinner(f"🔎 正在解析出有效關鍵字..."):
-            keyword = llm_helper.query_to_keywords(user_query)
-        if not keyword:
-            st.warning("⚠️ LLM 無法解析出有效關鍵字，請換個描述再試")
-            return
-
-        # 使用關鍵字開始新聞搜尋
-        with st.spinner(f"🔎 正在搜尋「{keyword}」新聞..."):
-            articles = crawler.search_news(keyword, max_results=3)
-        if not articles:
-            st.error("❗ 沒有找到相關新聞，請嘗試其他關鍵字")
-            return
-
-        # 擷取每篇新聞詳細內容
-        with st.spinner(f"🔎 抓取相關新聞..."):
-            article_details = [crawler.fetch_article_content(article['url']) for article in articles]
-        st.success(f"✅ 成功抓取 {len(article_details)} 篇新聞")
-
-        # 對每篇新聞進行分析與畫面展示
-        analyses = []
-        for idx, article_detail in enumerate(article_details, start=1):
-            with st.spinner(f"🧠 正在分析第 {idx} 篇新聞..."):
-                analysis = process_single_article(idx, article_detail, llm_helper, crawler)
-                analyses.append(analysis)
-
-        # 綜合產出輿情摘要
-        with st.spinner("🧠 正在綜合產出輿情摘要..."):
-            summary = llm_helper.generate_summary(article_details, analyses)
+    # 使用者點及搜尋：提交工作並記住工作 id（相同問題進行中時共用同一工作）
+    if start_search and user_query:
+        st.session_state["job_id"] = get_shared_job_service().submit(user_query).id
+
+    job_id = st.session_state.get("job_id")
+    job = get_shared_job_service().get(job_id) if job_id else None
+    if job:
+        cursor, finished = render_job(job)
+        if not finished:
+            return job, cursor
+    return None
+
+
+def render_job(job):
+    """
+    重播工作目前為止的所有事件並繪製畫面，不等待工作結束（進行中的工作由頁面重新執行來更新）。
+    輸出：(已讀取的事件數 int, 工作是否已結束 bool)。
+    """
+    status = st.empty()
+    slots, article_details = [], []
+    summary_slot, summary_text = None, ""
+    events, cursor, finished = job.wait_events(0, timeout=0)
+    for kind, payload in events:
+        if kind == "status":
+            status.info(payload)
+        elif kind == "notice":
+            level, message = payload
+            getattr(st, level)(message)
+        elif kind == "articles":
+            article_details = payload
+            slots = [st.empty() for _ in article_details]
+            for i, article_detail in enumerate(article_details):
+                with slots[i].container():
+                    render_article(i + 1, article_detail, {})
+        elif kind == "analysis":
+            i, analysis, _ = payload
+            with slots[i].container():
+                render_article(i + 1, article_details[i], analysis)
+        elif kind == "summary_start":
             st.subheader("📢 綜合輿情摘要")
-            st.write(summary)
+            summary_slot = st.empty()
+        elif kind == "summary":
+            summary_text += payload
+            summary_slot.markdown(summary_text)
+    if finished:
+        status.empty()
+        st.session_state["last_trace_id"] = job.trace_id
+    return cursor, finished
+
+
+def show_trace_panel():
+    """
+    除錯面板：以瀑布圖顯示最近一次搜尋各階段的耗時（區段依開始時間排列、依層級縮排）。
+    """
+    trace_id = st.session_state.get("last_trace_id")
+    spans = tracer.get_trace(trace_id) if trace_id else []
+    if not spans:
+        st.info("尚無追蹤資料，請先執行一次搜尋")
+        return
+
+    origin = min(span["start"] for span in spans)
+    parents = {span["span_id"]: span["parent_id"] for span in spans}
+
+    def depth(span_id):
+        level = 0
+        while parents.get(span_id):
+            span_id, level = parents[span_id], level + 1
+        return level
+
+    rows = []
+    for i, span in enumerate(spans):
+        start_ms = (span["start"] - origin) * 1000
+        detail = ", ".join(f"{k}={v}" for k, v in span["attributes"].items())
+        rows.append({
+            "區段": f"{i:02d} " + "　" * depth(span["span_id"]) + span["name"],
+            "類型": span["name"],
+            "開始 (ms)": round(start_ms, 1),
+            "結束 (ms)": round(start_ms + span["duration"] * 1000, 1),
+            "耗時 (ms)": round(span["duration"] * 1000, 1),
+            "屬性": detail + (f" ⚠️ {span['error']}" if span["error"] else ""),
+        })
+    frame = pd.DataFrame(rows)
+
+    try:
+        import altair as alt
+        chart = alt.Chart(frame).mark_bar().encode(
+            x=alt.X("開始 (ms):Q", title="毫秒"),
+            x2="結束 (ms):Q",
+            y=alt.Y("區段:N", sort=None, title=None),
+            color=alt.Color("類型:N", legend=None),
+            tooltip=["類型", "耗時 (ms)", "屬性"],
+        ).properties(height=max(200, 22 * len(rows)))
+        st.altair_chart(chart, use_container_width=True)
+    except ImportError:
+        pass  # 沒有 altair 時僅顯示表格
+    st.dataframe(frame.drop(columns=["類型"]), use_container_width=True, hide_index=True)
+
+
+def show_article_cache_stats():
+    """
+    顯示文章快取的累計統計（程序啟動後）：命中率、重新驗證次數與節省的下載量。
+    """
+    stats = get_shared_job_service().crawler.article_cache.stats()
+    lookups = stats["hits"] + stats["misses"] + stats["expired"] - stats["revalidated"]
+    hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "—"
+    st.caption(f"📦 文章快取：命中率 {hit_rate}（命中 {stats['hits']}、未命中 {stats['misses']}、"
+               f"過期 {stats['expired']}、重新驗證 {stats['revalidated']}），"
+               f"節省 {stats['bytes_saved'] / 1024:.0f} KB、下載 {stats['bytes_downloaded'] / 1024:.0f} KB，"
+               f"共 {stats['entries']} 筆 / {stats['stored_bytes'] / 1024 / 1024:.1f} MB")
+
+
+@st.cache_data(max_entries=200, show_spinner=False)
+def load_history_page(keyword: str, date_from: str, date_to: str, page_size: int, after, revision: int):
+    """
+    查詢一頁已儲存新聞（僅標題與內文片段）；revision 為資料版本號，寫入新資料後快取即自動失效。
+    """
+    return db.browse_news(keyword, date_from, date_to, limit=page_size, after=after)
+
+
+@st.cache_data(max_entries=200, show_spinner=False)
+def count_history(keyword: str, date_from: str, date_to: str, revision: int) -> int:
+    """
+    計算符合篩選條件的新聞篇數（依資料版本號快取）。
+    """
+    return db.count_news(keyword, date_from, date_to)
+
+
+@st.cache_data(max_entries=500, show_spinner=False)
+def load_full_news(news_id: int, revision: int):
+    """
+    讀取單篇新聞的完整內文與分析結果（使用者展開全文時才查詢）。
+    """
+    return db.get_news(news_id)
 
 
 def show_history():
     """
-    顯示最近 30 天內已儲存新聞記錄，並可透過關鍵字篩選。
+    顯示指定日期範圍內已儲存的新聞記錄，可透過關鍵字篩選；
+    以鍵集分頁逐頁載入內文片段，完整內文於使用者點選時才讀取。
     """
     st.header("📂 瀏覽已儲存新聞")
-    keyword_filter = st.text_input("🔎 可輸入關鍵字篩選（留空則顯示全部）").strip()
     today = datetime.date.today()
-    past_30_days = today - datetime.timedelta(days=30)
+    col_keyword, col_dates, col_size = st.columns([3, 3, 1])
+    keyword_filter = col_keyword.text_input("🔎 可輸入關鍵字篩選（留空則顯示全部）").strip()
+    dates = col_dates.date_input("📅 日期範圍", value=(today - datetime.timedelta(days=30), today))
+    page_size = col_size.selectbox("每頁篇數", [10, 20, 50], index=1)
+    if not isinstance(dates, (tuple, list)) or len(dates) != 2:
+        st.info("請選擇日期範圍的起訖日")
+        return
+    date_from, date_to = str(dates[0]), str(dates[1])
 
-    # 從資料庫中查詢新聞
-    saved_news = db.search_news(keyword=keyword_filter, date_from=str(past_30_days), date_to=str(today))
+    # 篩選條件改變時回到第一頁；cursors 保存每一頁的起點（上一頁最後一筆的排序鍵）
+    filters = (keyword_filter, date_from, date_to, page_size)
+    if st.session_state.get("history_filters") != filters:
+        st.session_state["history_filters"] = filters
+        st.session_state["history_cursors"] = [None]
+    cursors = st.session_state["history_cursors"]
 
-    if not saved_news:
+    revision = db.revision()
+    total = count_history(keyword_filter, date_from, date_to, revision)
+    if not total:
         st.info("⚠️ 沒有符合條件的新聞記錄")
         return
+    saved_news = load_history_page(keyword_filter, date_from, date_to, page_size, cursors[-1], revision)
 
-    st.info(f"📚 最近 30 天內共 {len(saved_news)} 篇新聞：")
-    for title, date, content, url in saved_news:
+    page = len(cursors)
+    st.info(f"📚 {date_from} ~ {date_to} 共 {total} 篇新聞（第 {page} 頁）：")
+    for news_id, title, date, _, snippet, url in saved_news:
         with st.expander(f"{date} - {title}"):
-            st.write(content[:300] + "...")
+            if st.checkbox("📖 顯示全文", key=f"history_full_{news_id}"):
+                news = load_full_news(news_id, revision)
+                st.write(news["content"] if news else snippet)
+                if news:
+                    st.write("**📄 LLM 摘要**:", news["summary"])
+                    st.write("**😊 情緒判斷**:", news["sentiment"])
+                    st.write("**🏷️ 命名實體**:", news["ner"])
+            else:
+                st.write(snippet + "...")
             st.write(f"👉 [前往原文]({url})")
 
+    # 換頁以按鈕回呼更新游標，回呼在下一次重新執行前完成，畫面直接顯示新頁面
+    last_key = (saved_news[-1][3], saved_news[-1][0]) if saved_news else None
+    col_prev, col_next = st.columns(2)
+    col_prev.button("⬅️ 上一頁", disabled=page == 1, on_click=cursors.pop)
+    col_next.button("下一頁 ➡️", disabled=last_key is None or page * page_size >= total,
+                    on_click=cursors.append, args=(last_key,))
+
+
+@st.cache_data(max_entries=100, show_spinner=False)
+def load_top_entities(date_from: str, date_to: str, limit: int, revision: int):
+    """
+    讀取日期範圍內最常被提及的實體（來自每日彙總表，依資料版本號快取）。
+    """
+    return db.top_entities(date_from, date_to, limit)
+
+
+@st.cache_data(max_entries=100, show_spinner=False)
+def load_sentiment_trend(date_from: str, date_to: str, entity, revision: int):
+    """
+    讀取每日情緒篇數（整體或指定實體，來自每日彙總表，依資料版本號快取）。
+    """
+    return db.sentiment_trend(date_from, date_to, entity)
+
+
+def show_trend():
+    """
+    顯示輿情趨勢：熱門實體的情緒分布，以及整體或單一實體每日情緒篇數的變化。
+    資料皆來自寫入時增量維護的彙總表，不需重新掃描新聞內容。
+    """
+    st.header("📈 輿情趨勢")
+    today = datetime.date.today()
+    dates = st.date_input("📅 日期範圍", value=(today - datetime.timedelta(days=30), today), key="trend_dates")
+    if not isinstance(dates, (tuple, list)) or len(dates) != 2:
+        st.info("請選擇日期範圍的起訖日")
+        return
+    date_from, date_to = str(dates[0]), str(dates[1])
+    revision = db.revision()
+
+    top = load_top_entities(date_from, date_to, 20, revision)
+    if not top:
+        st.info("⚠️ 此日期範圍內沒有新聞記錄")
+        return
+    st.subheader("🏷️ 熱門實體")
+    st.dataframe(pd.DataFrame(top, columns=["實體", "篇數"] + list(SENTIMENTS)),
+                 use_container_width=True, hide_index=True)
+
+    choice = st.selectbox("選擇實體查看每日情緒變化", ["（全部新聞）"] + [row[0] for row in top])
+    entity = None if choice == "（全部新聞）" else choice
+    frame = pd.DataFrame(load_sentiment_trend(date_from, date_to, entity, revision), columns=["日期", "情緒", "篇數"])
+    st.subheader(f"📊 {choice}：每日情緒篇數")
+    try:
+        import altair as alt
+        chart = alt.Chart(frame).mark_bar().encode(
+            x=alt.X("日期:T", title=None),
+            y=alt.Y("篇數:Q", stack=True),
+            color=alt.Color("情緒:N", scale=alt.Scale(domain=list(SENTIMENTS),
+                                                    range=["#2ca02c", "#9e9e9e", "#d62728", "#c7c7c7"])),
+            tooltip=["日期:T", "情緒", "篇數"],
+        )
+        st.altair_chart(chart, use_container_width=True)
+    except ImportError:
+        st.dataframe(frame.pivot_table(index="日期", columns="情緒", values="篇數", fill_value=0),
+                     use_container_width=True)
+
 
 # Streamlit 執行主流程
 if __name__ == "__main__":
+    warm_up_llm()
+    start_metrics_endpoint()
+
     with tab_search:
-        handle_search()
+        running = handle_search()
+        if st.sidebar.checkbox("🛠️ 顯示效能追蹤"):
+            with st.expander("⏱️ 最近一次搜尋的階段耗時", expanded=True):
+                show_trace_panel()
+                show_article_cache_stats()
 
     with tab_history:
         show_history()
+
+    with tab_trend:
+        show_trend()
+
+    # 搜尋進行中：所有分頁已繪製完成，等到有新事件（或逾時）後重新執行頁面以更新進度
+    if running:
+        job, cursor = running
+        job.wait_events(cursor, timeout=JOB_POLL_SECONDS)
+        st.rerun()
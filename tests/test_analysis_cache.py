@@ -0,0 +1,52 @@
+# test_analysis_cache.py
+import sqlite3
+from apis.analysis_cache import AnalysisCache
+from apis.analysis_result import FALLBACK_ANALYSIS
+from models.llm_helper import LLMHelper
+
+COMPLETE = {"summary": "台積電營收創新高", "sentiment": "正面", "ner": "台積電, 魏哲家"}
+
+
+def test_put_and_get_complete_analysis(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache.db"))
+    cache.put("內文", "model", "v1", COMPLETE)
+    assert cache.get("內文", "model", "v1") == COMPLETE
+    # 重新建立（記憶體層清空）仍可由 SQLite 取得
+    assert AnalysisCache(str(tmp_path / "cache.db")).get("內文", "model", "v1") == COMPLETE
+
+
+def test_partial_and_fallback_analysis_are_not_cached(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache.db"))
+    cache.put("內文", "model", "v1", {"summary": "只有摘要"})
+    cache.put("內文", "model", "v1", dict(FALLBACK_ANALYSIS))
+    assert cache.get("內文", "model", "v1") is None
+
+
+def test_list_values_are_stored_as_strings(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache.db"))
+    cache.put("內文", "model", "v1", dict(COMPLETE, ner=["台積電", "魏哲家"]))
+    assert cache.get("內文", "model", "v1")["ner"] == "台積電, 魏哲家"
+
+
+def test_incomplete_rows_already_in_sqlite_are_ignored(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = AnalysisCache(path)
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO analysis_cache VALUES (?, 'model', 'v1', '只有摘要', NULL, NULL, 0)",
+                     (AnalysisCache.content_hash("內文"),))
+    assert cache.get("內文", "model", "v1") is None
+
+
+def test_analyze_article_fills_missing_fields_without_caching(tmp_path):
+    helper = LLMHelper(analysis_cache=AnalysisCache(str(tmp_path / "cache.db")))
+    calls = []
+
+    def invoke(prompt, stage):
+        calls.append(stage)
+        return '{"summary": "只有摘要"}'
+
+    helper._invoke = invoke
+    expected = {"summary": "只有摘要", "sentiment": FALLBACK_ANALYSIS["sentiment"], "ner": FALLBACK_ANALYSIS["ner"]}
+    assert helper.analyze_article("新聞內文") == expected
+    assert helper.analyze_article("新聞內文") == expected
+    assert calls == ["analyze", "analyze"]
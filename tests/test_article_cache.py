@@ -0,0 +1,73 @@
+# test_article_cache.py
+import sqlite3
+from apis import article_cache
+from apis.article_cache import ArticleCache
+from models.tracing import MetricsRegistry
+
+ARTICLE = {"title": "標題", "publish_date": "2025-03-20", "content": "內文" * 50}
+
+
+def accessed_at(path, url):
+    return sqlite3.connect(path).execute("SELECT accessed_at FROM article_cache WHERE url = ?",
+                                         (ArticleCache.canonical_url(url),)).fetchone()[0]
+
+
+def test_get_is_read_only_and_counts_misses(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ArticleCache(path)
+    assert cache.get("https://example.com/a") is None
+    cache.put("https://example.com/a", ARTICLE, response_bytes=1000)
+    before = accessed_at(path, "https://example.com/a")
+    entry = cache.get("https://example.com/a?utm_source=x")
+    assert entry["fresh"] and accessed_at(path, "https://example.com/a") == before
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["bytes_downloaded"], stats["entries"]) == (1, 0, 1000, 1)
+
+
+def test_expired_entries_are_counted(tmp_path):
+    cache = ArticleCache(str(tmp_path / "cache.db"), ttl=0)
+    cache.put("https://example.com/a", ARTICLE)
+    entry = cache.get("https://example.com/a")
+    assert not entry["fresh"]
+    cache.touch("https://example.com/a")
+    cache.record_hit(entry, revalidated=True)
+    stats = cache.stats()
+    assert (stats["expired"], stats["hits"], stats["revalidated"], stats["misses"]) == (1, 1, 1, 0)
+
+
+def test_hits_update_access_time_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(article_cache, "ACCESS_FLUSH_ITEMS", 3)
+    path = str(tmp_path / "cache.db")
+    cache = ArticleCache(path)
+    urls = [f"https://example.com/{i}" for i in range(3)]
+    for url in urls:
+        cache.put(url, ARTICLE)
+    before = [accessed_at(path, url) for url in urls]
+
+    for url in urls[:2]:
+        cache.record_hit(cache.get(url))
+    assert [accessed_at(path, url) for url in urls] == before
+    cache.record_hit(cache.get(urls[2]))
+    assert all(after > old for after, old in zip((accessed_at(path, url) for url in urls), before))
+
+
+def test_eviction_uses_pending_access_times(tmp_path):
+    cache = ArticleCache(str(tmp_path / "cache.db"), max_bytes=10 ** 6)
+    size = len("".join(ARTICLE.values()).encode("utf-8"))
+    cache.put("https://example.com/old", ARTICLE)
+    cache.put("https://example.com/new", ARTICLE)
+    cache.record_hit(cache.get("https://example.com/old"))  # 尚未寫回的存取時間
+    cache.max_bytes = size * 2
+    cache.put("https://example.com/third", ARTICLE)
+    assert cache.get("https://example.com/old") is not None
+    assert cache.get("https://example.com/new") is None
+
+
+def test_cache_stats_are_exported_as_metrics(tmp_path):
+    cache = ArticleCache(str(tmp_path / "cache.db"))
+    cache.get("https://example.com/missing")
+    metrics = MetricsRegistry()
+    metrics.register_collector("article_cache", cache.stats)
+    text = metrics.render_prometheus()
+    assert "newsbot_article_cache_misses 1" in text
+    assert "newsbot_article_cache_entries 0" in text
@@ -0,0 +1,81 @@
+# test_deduplicator.py
+import random
+import pytest
+from apis.news_database import NewsDatabase, SIMHASH_BANDS, hamming_distance, simhash
+from models.deduplicator import ArticleDeduplicator
+
+TSMC = ("台積電今日舉行法說會，董事長表示先進製程與先進封裝需求持續強勁，今年資本支出維持在三百億美元高檔，"
+        "並預期人工智慧相關營收將在未來五年以年複合成長率四成以上的速度增加。法人指出，美國新廠的量產進度"
+        "優於預期，毛利率稀釋幅度可望收斂，下半年營運展望樂觀。")
+FOXCONN = ("鴻海公布上月營收，受惠雲端伺服器出貨暢旺，月增一成二，年增兩成，創同期新高。公司表示，人工智慧伺服器"
+           "機櫃將在第三季放量，電動車事業則持續與日本車廠洽談合作，墨西哥新廠預計年底前完成建置並開始投產。")
+TSMC_ANALYSIS = {"summary": "台積電法說會釋出樂觀展望", "sentiment": "正面", "ner": "台積電"}
+
+
+def article(url, content, title="法說會"):
+    return {"title": title, "publish_date": "2025-03-20", "content": content, "url": url}
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = NewsDatabase(str(tmp_path / "news.db"))
+    db.insert_news(article("https://example.com/tsmc", TSMC), TSMC_ANALYSIS)
+    return db
+
+
+def test_near_duplicate_reuses_stored_analysis(db):
+    edited = article("https://example.com/tsmc-repost", TSMC.replace("三百億", "三百二十億"))
+    assert 0 < hamming_distance(simhash(f"法說會\n{TSMC}"), ArticleDeduplicator.fingerprint(edited)) <= 6
+    assert ArticleDeduplicator(db).find(edited) == TSMC_ANALYSIS
+
+
+def test_distinct_article_is_analyzed(db):
+    dedup = ArticleDeduplicator(db)
+    assert dedup.find(article("https://example.com/foxconn", FOXCONN)) is None
+    # 內文過短（例如擷取失敗）時不比對
+    assert dedup.find(article("https://example.com/empty", "無法取得內文", title="")) is None
+    # 門檻為 0 表示停用
+    assert ArticleDeduplicator(db, max_distance=0).find(article("https://example.com/copy", TSMC)) is None
+
+
+def test_plan_reuses_stored_and_groups_batch_duplicates(db):
+    articles = [article("a", TSMC.replace("高檔", "水準")),
+                article("b", FOXCONN),
+                article("c", FOXCONN.replace("一成二", "一成三")),
+                article("d", "內文過短")]
+    analyses, duplicate_of = ArticleDeduplicator(db).plan(articles)
+    assert analyses == [TSMC_ANALYSIS, None, None, None]
+    assert duplicate_of == [None, None, 1, None]
+
+
+def test_remember_covers_articles_not_yet_stored(tmp_path):
+    dedup = ArticleDeduplicator(NewsDatabase(str(tmp_path / "news.db")))
+    dedup.remember(article("a", FOXCONN), {"summary": "鴻海營收創新高", "sentiment": "正面", "ner": "鴻海"})
+    dedup.remember(article("b", TSMC), {"summary": "無法生成摘要", "sentiment": "未知", "ner": "無"})
+    assert dedup.find(article("a2", FOXCONN.replace("兩成", "兩成一")))["ner"] == "鴻海"
+    assert dedup.find(article("b2", TSMC)) is None
+
+
+def flip_bits(fingerprint, positions):
+    for position in positions:
+        fingerprint ^= 1 << position
+    return fingerprint
+
+
+def test_banding_finds_every_fingerprint_within_band_limit(db):
+    stored = simhash(f"法說會\n{TSMC}")
+    rng = random.Random(7)
+    for distance in range(SIMHASH_BANDS):
+        for _ in range(50):
+            probe = flip_bits(stored, rng.sample(range(64), distance))
+            match = db.find_near_duplicate(probe, max_distance=SIMHASH_BANDS - 1)
+            assert match is not None and match["distance"] == distance
+
+
+def test_near_duplicate_threshold_is_inclusive(db):
+    stored = simhash(f"法說會\n{TSMC}")
+    probe = flip_bits(stored, range(0, 48, 8))  # 距離 6，落在 6 個不同分段
+    assert db.find_near_duplicate(probe, max_distance=6)["distance"] == 6
+    assert db.find_near_duplicate(probe, max_distance=5) is None
+    # 每個分段都有相異位元時無法由索引取得候選（超過保證範圍）
+    assert db.find_near_duplicate(flip_bits(stored, range(0, 64, 8)), max_distance=8) is None
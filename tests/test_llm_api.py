@@ -0,0 +1,61 @@
+# test_llm_api.py
+import pytest
+import requests
+from apis import llm_api
+from apis.analysis_cache import AnalysisCache
+from apis.llm_api import LLMAPI
+from models.llm_helper import LLMHelper
+
+MODE, OPTION = "內部LLM", "Taiwan-Llama3-16f"
+
+
+class FakeResponse:
+    def __init__(self, models):
+        self.models = models
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"models": [{"name": name} for name in self.models]}
+
+
+@pytest.fixture(autouse=True)
+def clean_clients():
+    LLMAPI._clients.clear()
+    yield
+    LLMAPI._clients.clear()
+
+
+def test_warm_up_skips_and_evicts_when_health_check_fails(monkeypatch):
+    LLMAPI.get_llm(MODE, OPTION)
+    monkeypatch.setattr(llm_api.requests, "get", lambda *args, **kwargs: FakeResponse(["other:latest"]))
+    monkeypatch.setattr(llm_api.requests, "post", lambda *args, **kwargs: pytest.fail("不可用時不應載入模型"))
+    assert LLMAPI.warm_up(MODE, OPTION) is False
+    assert (MODE, OPTION) not in LLMAPI._clients
+
+
+def test_warm_up_loads_model_when_healthy(monkeypatch):
+    model = llm_api.INTERNAL_MODEL_NAMES[OPTION]
+    posted = []
+    monkeypatch.setattr(llm_api.requests, "get", lambda *args, **kwargs: FakeResponse([model]))
+    monkeypatch.setattr(llm_api.requests, "post", lambda url, json, timeout: posted.append(json) or FakeResponse([]))
+    assert LLMAPI.warm_up(MODE, OPTION) is True
+    assert posted[0]["model"] == model and (MODE, OPTION) in LLMAPI._clients
+
+
+def test_failed_invoke_evicts_client_when_server_is_down(monkeypatch, tmp_path):
+    class BrokenLLM:
+        def invoke(self, prompt):
+            raise requests.ConnectionError("connection refused")
+
+    def server_down(*args, **kwargs):
+        raise requests.ConnectionError("connection refused")
+
+    LLMAPI._clients[(MODE, OPTION)] = BrokenLLM()
+    monkeypatch.setattr(llm_api.requests, "get", server_down)
+    helper = LLMHelper(analysis_cache=AnalysisCache(str(tmp_path / "cache.db")))
+    helper.mode, helper.llm_option = MODE, OPTION
+    with pytest.raises(requests.ConnectionError):
+        helper._invoke("你好", "test")
+    assert (MODE, OPTION) not in LLMAPI._clients
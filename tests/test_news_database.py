@@ -0,0 +1,116 @@
+# test_news_database.py
+import sqlite3
+import pytest
+from apis.news_database import NewsDatabase
+
+
+def article(url, title, content, date="2025-03-20"):
+    return {"title": title, "publish_date": date, "content": content, "url": url}
+
+
+def analysis(summary="摘要", sentiment="正面", ner="台積電"):
+    return {"summary": summary, "sentiment": sentiment, "ner": ner}
+
+
+@pytest.fixture
+def db(tmp_path):
+    return NewsDatabase(str(tmp_path / "news.db"))
+
+
+def test_search_news_uses_fts_and_like_with_same_results_as_browse(db):
+    db.insert_many([
+        (article("u1", "台積電法說會", "先進封裝需求強勁", "2025-03-01"), analysis()),
+        (article("u2", "AI 晶片戰", "輝達與台積電合作", "2025-03-02"), analysis(ner="輝達")),
+        (article("u3", "電動車", "鴻海發表新車", "2025-03-03"), analysis(ner="鴻海")),
+    ])
+    # 三字以上走全文檢索，兩字走 LIKE；兩種路徑與瀏覽分頁的篩選結果一致
+    for keyword, expected in (("台積電", {"u1", "u2"}), ("AI", {"u2"}), ("鴻海 新車", {"u3"}), ("", {"u1", "u2", "u3"})):
+        found = {row[3] for row in db.search_news(keyword, "2025-03-01", "2025-03-31", limit=10)}
+        browsed = {row[5] for row in db.browse_news(keyword, "2025-03-01", "2025-03-31", limit=10)}
+        assert found == browsed == expected, keyword
+        assert db.count_news(keyword, "2025-03-01", "2025-03-31") == len(expected)
+    assert db.search_news("台積電", "2025-03-02", "2025-03-31")[0][3] == "u2"
+
+
+def legacy_db(path, rows):
+    """建立遷移前（user_version 0）的舊版資料表。"""
+    with sqlite3.connect(path) as conn:
+        conn.execute("""CREATE TABLE news (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, publish_date TEXT,
+                        content TEXT, url TEXT, summary TEXT, sentiment TEXT, ner TEXT)""")
+        conn.executemany("INSERT INTO news (id, title, publish_date, content, url, summary, sentiment, ner) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return path
+
+
+def test_migration_keeps_latest_row_per_url(tmp_path):
+    path = legacy_db(str(tmp_path / "legacy.db"), [
+        (1, "舊標題", "2025.03.20", "舊內文", "u1", "舊摘要", "正面", "甲"),
+        (2, "其他", "2025/3/21", "內文二", "u2", "摘要二", "負面", "乙"),
+        (3, "新標題", "2025年3月22日", "新內文", "u1", "新摘要", "中性", "甲"),
+        (4, "無網址一", "未知日期", "內文四", None, "摘要四", "正面", "丙"),
+        (5, "無網址二", "2025-03-23T08:00", "內文五", None, "摘要五", "正面", "丙"),
+    ])
+    db = NewsDatabase(path)
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT id, title, url, publish_date_iso FROM news ORDER BY id").fetchall()
+    assert rows == [
+        (2, "其他", "u2", "2025-03-21"),
+        (3, "新標題", "u1", "2025-03-22"),
+        (4, "無網址一", None, None),
+        (5, "無網址二", None, "2025-03-23"),
+    ]
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(NewsDatabase.MIGRATIONS)
+    # 全文索引以遷移後的資料重建，被刪除的舊資料不會被搜到
+    assert [row[3] for row in db.search_news("新內文", "2025-01-01", "2025-12-31")] == ["u1"]
+    assert db.search_news("舊內文", "2025-01-01", "2025-12-31") == []
+    # 遷移後相同 URL 改為更新既有資料
+    db.insert_news(article("u1", "更新標題", "更新內文", "2025-03-24"), analysis())
+    assert conn.execute("SELECT COUNT(*) FROM news WHERE url = 'u1'").fetchone()[0] == 1
+
+
+def test_migration_of_shipped_database(tmp_path):
+    # 專案附帶的 data/news_all.db 為遷移前版本：18 筆中只有 6 個不同 URL
+    source = sqlite3.connect("file:data/news_all.db?mode=ro", uri=True)
+    if source.execute("PRAGMA user_version").fetchone()[0] != 0:
+        pytest.skip("data/news_all.db 已遷移")
+    path = str(tmp_path / "shipped.db")
+    source.backup(sqlite3.connect(path))
+    expected = dict(source.execute("SELECT url, MAX(id) FROM news GROUP BY url").fetchall())
+    NewsDatabase(path)
+    survivors = dict(sqlite3.connect(path).execute("SELECT url, id FROM news").fetchall())
+    assert survivors == expected
+    assert len(survivors) == 6
+
+
+def test_fts_triggers_follow_insert_update_and_delete(db):
+    db.insert_news(article("u1", "台積電法說會", "先進封裝需求強勁"), analysis())
+    assert len(db.search_news("先進封裝", "2025-01-01", "2025-12-31")) == 1
+    db.insert_news(article("u1", "台積電法說會", "資本支出上修"), analysis())
+    assert db.search_news("先進封裝", "2025-01-01", "2025-12-31") == []
+    assert len(db.search_news("資本支出", "2025-01-01", "2025-12-31")) == 1
+    with db.db.transaction() as c:
+        c.execute("DELETE FROM news WHERE url = 'u1'")
+    assert db.search_news("資本支出", "2025-01-01", "2025-12-31") == []
+
+
+def test_insert_stores_iso_date(db):
+    for i, date in enumerate(("2025.03.05", "2025/3/5", "2025年3月5日", "2025-03-05T10:00")):
+        news_id = db.insert_news(article(f"u{i}", "標題", "內文", date), analysis())
+        assert db.get_news(news_id)["publish_date_iso"] == "2025-03-05"
+    assert db.get_news(db.insert_news(article("bad", "標題", "內文", "未知日期"), analysis()))["publish_date_iso"] is None
+
+
+def test_browse_keyset_pagination_covers_all_rows_in_order(db):
+    db.insert_many([(article(f"u{i}", f"標題{i}", "內文", f"2025-03-{1 + i % 5:02d}"), analysis())
+                    for i in range(23)])
+    pages, after = [], None
+    while True:
+        page = db.browse_news("", "2025-03-01", "2025-03-31", limit=5, after=after)
+        if not page:
+            break
+        pages.append(page)
+        after = (page[-1][3], page[-1][0])
+    rows = [row for page in pages for row in page]
+    assert len(pages) == 5 and [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    keys = [(row[3], row[0]) for row in rows]
+    assert keys == sorted(keys, reverse=True) and len(set(keys)) == 23
@@ -0,0 +1,35 @@
+# test_query_cache.py
+from models.query_cache import QueryCache
+
+
+def test_exact_match_after_normalization():
+    cache = QueryCache()
+    cache.put("NVIDIA 股價？", "hit")
+    assert cache.get("ｎｖｉｄｉａ股價") == "hit"
+
+
+def test_similar_query_hits():
+    cache = QueryCache()
+    cache.put("最近台積電的新聞輿情如何", "hit")
+    assert cache.get("最近台積電的新聞輿情如何呢") == "hit"
+
+
+def test_different_year_does_not_collide():
+    cache = QueryCache()
+    cache.put("nvidia股價2024", "2024")
+    assert cache.get("nvidia股價2025") is None
+    cache.put("nvidia股價2025", "2025")
+    assert cache.get("nvidia股價2024") == "2024"
+    assert cache.get("nvidia股價2025") == "2025"
+
+
+def test_different_latin_word_does_not_collide():
+    cache = QueryCache()
+    cache.put("apple最新財報表現分析", "apple")
+    assert cache.get("amd最新財報表現分析") is None
+
+
+def test_namespaces_are_separate():
+    cache = QueryCache()
+    cache.put("台積電營收", "a", namespace="model-a")
+    assert cache.get("台積電營收", namespace="model-b") is None
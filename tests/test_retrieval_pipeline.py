@@ -0,0 +1,104 @@
+# test_retrieval_pipeline.py
+import datetime
+from types import SimpleNamespace
+import pytest
+from apis.news_database import NewsDatabase
+from models.job_service import JobService, SearchJob
+from models.vector_index import NewsRetriever
+
+TODAY = datetime.date.today()
+FRESH, STALE = str(TODAY), str(TODAY - datetime.timedelta(days=30))
+ANALYSIS = {"summary": "相關摘要", "sentiment": "正面", "ner": "台積電"}
+
+
+class FakeIndex:
+    def __init__(self, ids):
+        self.ids = ids
+        self.embedder = SimpleNamespace(default_min_score=0.1)
+
+    def search(self, text, k):
+        return [(news_id, 0.9 - i * 0.01) for i, news_id in enumerate(self.ids)][:k]
+
+    def backfill(self):
+        pass
+
+    def index_saved(self, news_ids, items):
+        pass
+
+
+def stored_retriever(tmp_path, dates):
+    db = NewsDatabase(str(tmp_path / "news.db"))
+    ids = db.insert_many([({"title": f"舊聞{i}", "publish_date": date, "content": "內文", "url": f"stored{i}"},
+                           ANALYSIS) for i, date in enumerate(dates)])
+    return NewsRetriever(db, index=FakeIndex(ids), fresh_days=3)
+
+
+@pytest.mark.parametrize("dates, crawl_limit", [
+    ([FRESH, STALE, STALE], 0),        # 數量足夠且有夠新的新聞
+    ([STALE, STALE, STALE], 3),        # 全部過舊：補抓整批夠新的新聞
+    ([FRESH, STALE], 2),               # 數量不足：只補抓夠新新聞的缺額
+    ([FRESH, FRESH], 1),
+    ([], 3),
+])
+def test_retrieve_crawls_only_missing_fresh_articles(tmp_path, dates, crawl_limit):
+    hits, limit = stored_retriever(tmp_path, dates).retrieve(["台積電"], 3)
+    assert limit == crawl_limit
+    assert [fresh for *_, fresh in hits] == [date == FRESH for date in dates]
+
+
+class FakeCrawler:
+    def __init__(self, available):
+        self.available = available
+        self.db = None
+        self.fetched = []
+
+    def search_keywords(self, keywords, max_results):
+        return [{"url": f"new{i}"} for i in range(self.available)][:max_results]
+
+    def fetch_articles(self, urls, max_concurrency):
+        self.fetched += urls
+        return [(url, {"title": url, "publish_date": FRESH, "content": "新內文", "url": url}) for url in urls]
+
+    def save_many_to_db(self, items):
+        return list(range(len(items)))
+
+
+class FakeHelper:
+    def understand_query(self, query):
+        return {"is_valid": True, "keywords": ["台積電"]}
+
+    def stream_analyze_articles(self, contents, max_in_flight):
+        for i, _ in enumerate(contents):
+            yield i, ANALYSIS, True
+
+    def stream_summary(self, articles, analyses):
+        yield "總結"
+
+
+def run_pipeline(tmp_path, dates, available):
+    crawler = FakeCrawler(available)
+    dedup = SimpleNamespace(plan=lambda details: ([None] * len(details), [None] * len(details)),
+                            remember=lambda article, analysis: None)
+    service = JobService(crawler=crawler, llm_helper=FakeHelper(), deduplicator=dedup,
+                         retriever=stored_retriever(tmp_path, dates), max_workers=1, max_results=3)
+    job = SearchJob("台積電近況", ("台積電近況", 3))
+    service._pipeline(job)
+    service.shutdown()
+    articles = next(payload for kind, payload in job.events if kind == "articles")
+    return crawler.fetched, [article["url"] for article in articles]
+
+
+def test_stale_hits_are_replaced_not_doubled(tmp_path):
+    fetched, urls = run_pipeline(tmp_path, [STALE, STALE, STALE], available=5)
+    assert fetched == ["new0", "new1", "new2"]
+    assert urls == ["new0", "new1", "new2"]
+
+
+def test_stale_hits_fill_in_when_crawl_falls_short(tmp_path):
+    fetched, urls = run_pipeline(tmp_path, [STALE, FRESH], available=1)
+    assert fetched == ["new0"] and urls == ["stored0", "stored1", "new0"]
+
+
+def test_enough_hits_with_a_fresh_one_skip_crawling(tmp_path):
+    fetched, urls = run_pipeline(tmp_path, [STALE, FRESH, STALE], available=5)
+    assert fetched == [] and urls == ["stored0", "stored1", "stored2"]
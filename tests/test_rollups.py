@@ -0,0 +1,77 @@
+# test_rollups.py
+import random
+import sqlite3
+from apis.news_database import NewsDatabase, normalize_sentiment, parse_entities
+
+ENTITIES = ["台積電", "鴻海", "NVIDIA", "nvidia", "聯發科", "無", "經濟部"]
+SENTIMENTS = ["正面", "中性", "負面", "偏正面", "無法判斷"]
+DATES = ["2025-03-01", "2025/3/2", "2025.03.03", "2025年3月4日", "未知日期"]
+
+
+def random_item(rng, url):
+    article = {"title": f"標題 {url}", "publish_date": rng.choice(DATES),
+               "content": f"內文 {url} {rng.random()}", "url": url}
+    ner = rng.choice(["、", ", ", "，"]).join(rng.sample(ENTITIES, rng.randint(0, 3)))
+    return article, {"summary": "摘要", "sentiment": rng.choice(SENTIMENTS), "ner": ner}
+
+
+def recomputed_rollups(path):
+    """以 GROUP BY 從新聞表重新計算彙總表，作為增量維護結果的對照。"""
+    conn = sqlite3.connect(path)
+    conn.create_function("norm_sentiment", 1, normalize_sentiment)
+    sentiment_daily = conn.execute("""SELECT publish_date_iso, norm_sentiment(sentiment), COUNT(*) FROM news
+                                      WHERE publish_date_iso IS NOT NULL
+                                      GROUP BY 1, 2""").fetchall()
+    mentions = {(news_id, name.casefold())
+                for news_id, ner in conn.execute("SELECT id, ner FROM news")
+                for name in parse_entities(ner)}
+    conn.execute("CREATE TEMP TABLE expected_mention (news_id INTEGER, norm_name TEXT)")
+    conn.executemany("INSERT INTO expected_mention VALUES (?, ?)", mentions)
+    entity_daily = conn.execute("""SELECT m.norm_name, n.publish_date_iso, norm_sentiment(n.sentiment), COUNT(*)
+                                   FROM expected_mention AS m JOIN news AS n ON n.id = m.news_id
+                                   WHERE n.publish_date_iso IS NOT NULL
+                                   GROUP BY 1, 2, 3""").fetchall()
+    return sorted(sentiment_daily), sorted(entity_daily), sorted(mentions)
+
+
+def stored_rollups(path):
+    conn = sqlite3.connect(path)
+    sentiment_daily = conn.execute("SELECT day, sentiment, count FROM sentiment_daily").fetchall()
+    entity_daily = conn.execute("""SELECT e.norm_name, d.day, d.sentiment, d.count
+                                   FROM entity_daily AS d JOIN entity AS e ON e.id = d.entity_id""").fetchall()
+    mentions = conn.execute("""SELECT m.news_id, e.norm_name
+                               FROM entity_mention AS m JOIN entity AS e ON e.id = m.entity_id""").fetchall()
+    return sorted(sentiment_daily), sorted(entity_daily), sorted(mentions)
+
+
+def test_rollups_match_recompute_after_random_writes(tmp_path):
+    path = str(tmp_path / "news.db")
+    db = NewsDatabase(path)
+    rng = random.Random(20250320)
+    urls = [f"https://example.com/{i}" for i in range(40)]
+    for step in range(60):
+        action = rng.random()
+        if action < 0.6:
+            # 新增或取代（同 URL 會更新日期、情緒與實體）
+            db.insert_many([random_item(rng, rng.choice(urls)) for _ in range(rng.randint(1, 5))])
+        elif action < 0.8:
+            # 內容不變的重複寫入
+            items = [random_item(rng, url) for url in rng.sample(urls, 3)]
+            db.insert_many(items)
+            db.insert_many(items)
+        else:
+            db.delete_news(rng.sample(urls, rng.randint(1, 4)))
+        if step % 10 == 9:
+            assert stored_rollups(path) == recomputed_rollups(path)
+    assert stored_rollups(path) == recomputed_rollups(path)
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM sentiment_daily WHERE count <= 0").fetchone()[0] == 0
+
+
+def test_delete_news_removes_row_and_rollups(tmp_path):
+    path = str(tmp_path / "news.db")
+    db = NewsDatabase(path)
+    rng = random.Random(1)
+    db.insert_many([random_item(rng, "u1"), random_item(rng, "u2")])
+    assert db.delete_news(["u1", "u1", "missing"]) == 1
+    assert db.existing_urls(["u1", "u2"]) == {"u2"}
+    assert stored_rollups(path) == recomputed_rollups(path)
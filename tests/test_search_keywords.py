@@ -0,0 +1,44 @@
+# test_search_keywords.py
+from apis.article_cache import ArticleCache
+from apis.news_database import NewsDatabase
+from models.crawler_bnext import BnextNewsCrawler
+
+
+class FakeBackend:
+    def __init__(self, name, results):
+        self.name = name
+        self.results = results
+        self.calls = []
+
+    def search(self, keyword, max_results=10):
+        self.calls.append(keyword)
+        return [{"title": url, "url": url} for url in self.results.get(keyword, [])][:max_results]
+
+
+def make_crawler(tmp_path, backends):
+    return BnextNewsCrawler(search_backends=backends, article_cache=ArticleCache(str(tmp_path / "cache.db")),
+                            db=NewsDatabase(str(tmp_path / "news.db")))
+
+
+def test_feed_results_for_all_keywords_skip_browser(tmp_path):
+    feed = FakeBackend("feed", {"a": ["1", "2"], "b": ["2", "3"]})
+    browser = FakeBackend("selenium", {"a": ["9"]})
+    crawler = make_crawler(tmp_path, [feed, browser])
+    assert [r["url"] for r in crawler.search_keywords(["a", "b"], 3)] == ["1", "2", "3"]
+    assert browser.calls == []
+
+
+def test_browser_fallback_stops_once_enough_results(tmp_path):
+    feed = FakeBackend("feed", {"a": ["1"]})
+    browser = FakeBackend("selenium", {"a": ["1", "4", "5"], "b": ["6"], "c": ["7"]})
+    crawler = make_crawler(tmp_path, [feed, browser])
+    assert [r["url"] for r in crawler.search_keywords(["a", "b", "c"], 3)] == ["1", "4", "5"]
+    assert feed.calls == ["a", "b", "c"]
+    assert browser.calls == ["a"]
+    assert crawler.last_search_backend == "selenium"
+
+
+def test_round_robin_between_keywords(tmp_path):
+    feed = FakeBackend("feed", {"a": ["1", "2", "3"], "b": ["4", "5"]})
+    crawler = make_crawler(tmp_path, [feed])
+    assert [r["url"] for r in crawler.search_keywords(["a", "b"], 4)] == ["1", "4", "2", "5"]
@@ -0,0 +1,72 @@
+# test_streaming_analysis.py
+from apis.analysis_cache import AnalysisCache
+from apis.analysis_result import FALLBACK_ANALYSIS
+from models.llm_helper import LLMHelper, IncrementalFieldParser, ANALYZE_PROMPT_VERSION
+
+COMPLETE_REPLY = '{"summary": "台積電營收創新高", "sentiment": "正面", "ner": "台積電"}'
+
+
+def streaming_helper(tmp_path, chunks):
+    helper = LLMHelper(analysis_cache=AnalysisCache(str(tmp_path / "cache.db")))
+    helper._stream = lambda prompt, stage: iter(chunks)
+    return helper
+
+
+def test_stream_yields_partials_then_complete_result(tmp_path):
+    helper = streaming_helper(tmp_path, [COMPLETE_REPLY[:30], COMPLETE_REPLY[30:55], COMPLETE_REPLY[55:]])
+    results = list(helper.stream_analyze_article("新聞內文"))
+    assert results[0] == {"summary": "台積電營收創新高"}
+    assert results[-1] == {"summary": "台積電營收創新高", "sentiment": "正面", "ner": "台積電"}
+    assert helper.analysis_cache.get("新聞內文", helper.model_key, ANALYZE_PROMPT_VERSION) == results[-1]
+
+
+def test_truncated_stream_is_not_cached(tmp_path):
+    helper = streaming_helper(tmp_path, ['{"summary": "只有摘要"}'])
+    results = list(helper.stream_analyze_article("新聞內文"))
+    assert results[-1] == {"summary": "只有摘要", "sentiment": FALLBACK_ANALYSIS["sentiment"],
+                           "ner": FALLBACK_ANALYSIS["ner"]}
+    assert helper.analysis_cache.get("新聞內文", helper.model_key, ANALYZE_PROMPT_VERSION) is None
+
+
+
+def feed_all(chunks):
+    parser = IncrementalFieldParser()
+    completed = [parser.feed(chunk) for chunk in chunks]
+    return parser, completed
+
+
+def test_parser_key_split_across_chunks():
+    parser, completed = feed_all(['{"sum', 'mary"', ' :  "摘', '要"', ', "senti', 'ment": "正面"}'])
+    assert completed == [{}, {}, {}, {"summary": "摘要"}, {}, {"sentiment": "正面"}]
+
+
+def test_parser_escaped_quote_split_across_chunks():
+    parser, _ = feed_all(['{"summary": "他說\\', '"好\\', '"，再見\\\\', '", "ner": "無"}'])
+    assert parser.values == {"summary": '他說"好"，再見\\', "ner": "無"}
+
+
+def test_parser_unicode_escapes_and_surrogate_pairs():
+    parser, _ = feed_all(['{"summary": "\\u53f0\\u7a4d\\u96fb \\ud83d', '\\ude00", "ner": "\\u', '4e2d"}'])
+    assert parser.values == {"summary": "台積電 😀", "ner": "中"}
+
+
+def test_parser_every_chunk_boundary_matches_full_parse():
+    text = '```json\n{ "summary": "營收\\"創新高\\"", "sentiment":"正面",\n "ner": "台積電, 魏哲家"}\n```'
+    expected = {"summary": '營收"創新高"', "sentiment": "正面", "ner": "台積電, 魏哲家"}
+    for cut in range(1, len(text)):
+        parser, _ = feed_all([text[:cut], text[cut:]])
+        assert parser.values == expected, cut
+    parser, _ = feed_all(list(text))
+    assert parser.values == expected
+
+
+def test_parser_reports_field_only_once_and_final_chunk_flushes():
+    parser, completed = feed_all(['{"summary": "a", "summary": "b", "ner": "x', '"}'])
+    assert completed == [{"summary": "a"}, {"ner": "x"}]
+    assert parser.values == {"summary": "a", "ner": "x"}
+
+
+def test_parser_ignores_unclosed_field():
+    parser, completed = feed_all(['{"summary": "寫到一半'])
+    assert completed == [{}]
+    assert parser.values == {}